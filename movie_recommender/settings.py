@@ -42,6 +42,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'recommender.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -103,6 +104,33 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+#
+# 'recommendations' holds each user's ranked candidate list. TIMEOUT is the
+# TTL in seconds and MAX_ENTRIES bounds the number of users kept; the
+# local-memory backend evicts the least recently used users first. With
+# several worker processes, a shared backend such as
+# 'django.core.cache.backends.filebased.FileBasedCache' lets invalidations
+# reach every worker.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'recommendations': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recommendations',
+        'TIMEOUT': 600,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+RECOMMENDER_CACHE_ALIAS = 'recommendations'
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/4.2/topics/i18n/
 
@@ -128,3 +156,109 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_CREDENTIALS = True
 
+
+# Recommender
+# 'hybrid' scores the whole catalogue with the correlation model, 'neighbors'
+# reads the item-neighbor index built by `manage.py build_neighbor_index`,
+# 'lsh' the user LSH index built by `manage.py build_lsh_index` and 'mf' the
+# latent-factor model trained by `manage.py train_mf_model`.
+
+RECOMMENDER_ENGINE = 'hybrid'
+
+# MovieLens directory with movies.csv, ratings.csv and links.csv, read on first use.
+RECOMMENDER_DATASET_DIR = BASE_DIR / 'ml-latest-small'
+
+# Binary cache written by `manage.py ingest_movielens`, used when newer than the CSV files.
+RECOMMENDER_DATASET_CACHE = RECOMMENDER_DATASET_DIR / 'movielens.npz'
+
+# Set to a number of rows to stream ratings.csv in chunks instead of parsing
+# it at once, e.g. 1_000_000 for ml-25m; peak memory then grows with the chunk
+# size and the final rating arrays rather than with a whole-file DataFrame.
+RECOMMENDER_DATASET_CHUNK_SIZE = None
+
+# Seconds between two reads of the RatingEvent log, which apply the ratings
+# other worker processes recorded through /api/ratings. None turns it off; the
+# log is still replayed whenever the dataset is loaded.
+RECOMMENDER_RATINGS_SYNC_INTERVAL = 5.0
+
+# How far above the largest known user ID a new user's ID may be. The rating
+# matrix indexes users by ID, so this bounds the memory a new ID costs.
+RECOMMENDER_NEW_USER_ID_HEADROOM = 100_000
+
+# Warm up (load the data and models, rank a few users) in a background thread
+# when a gunicorn, uvicorn or runserver process starts, or under another server
+# on the first /api/ready check; /api/ready answers 503 until it is done.
+# 'always' warms up when every process starts. Turn off with gunicorn --preload and call
+# recommender.warmup.run_warm_up from a post_fork hook instead.
+RECOMMENDER_WARM_UP = True
+
+RECOMMENDER_WARM_UP_USERS = 8
+
+# Directory (ideally on a tmpfs, e.g. /dev/shm/movie_recommender) where
+# `manage.py publish_dataset` writes the rating arrays once for all worker
+# processes, which then memory-map them read-only instead of each loading its
+# own copy. None loads the dataset in every process.
+RECOMMENDER_SHARED_DATASET_DIR = None
+
+RECOMMENDER_NEIGHBOR_INDEX_DIR = BASE_DIR / 'models' / 'neighbor_index'
+
+# User LSH index built by `manage.py build_lsh_index` for the 'lsh' engine, and
+# the number of approximate nearest users its candidates are drawn from.
+RECOMMENDER_LSH_INDEX_DIR = BASE_DIR / 'models' / 'lsh_index'
+
+RECOMMENDER_LSH_NEIGHBORS = 50
+
+# Latent-factor model trained by `manage.py train_mf_model` for the 'mf' engine.
+RECOMMENDER_MF_MODEL_PATH = BASE_DIR / 'models' / 'mf_model'
+
+# Weight of the genre/tag content scores blended into the 'hybrid' engine's
+# correlation scores, e.g. 0.2. At 0 the correlation ranking is kept; users
+# without any correlation are ranked by content alone either way.
+RECOMMENDER_CONTENT_WEIGHT = 0.0
+
+# Candidate pool of the 'hybrid' engine, applied before scoring: movies need
+# RECOMMENDER_MIN_MOVIE_RATINGS ratings and, when genres are listed, one of
+# those genres; movies sharing fewer than RECOMMENDER_MIN_COMMON_RATINGS
+# entries with the user score 0. The defaults score every movie, as before;
+# e.g. 3 and 2 skip the mostly degenerate correlations of rarely rated movies
+# (4980 of the 9724 movies of ml-latest-small have 3 ratings or more).
+RECOMMENDER_MIN_MOVIE_RATINGS = 1
+
+RECOMMENDER_MIN_COMMON_RATINGS = 1
+
+RECOMMENDER_CANDIDATE_GENRES = None
+
+# Users with fewer ratings than this, and unknown users, are served from the
+# Bayesian-average popularity ranking (per genre for users with a few ratings).
+# The prior is the number of phantom ratings at the global mean added to every
+# movie; None uses the 90th percentile of the movies' rating counts.
+RECOMMENDER_MIN_USER_RATINGS = 5
+
+RECOMMENDER_POPULARITY_PRIOR = None
+
+# Largest number of users accepted by POST /api/recommend/batch, and the
+# number of users scored together in one sparse product.
+RECOMMENDER_BATCH_MAX_USERS = 10000
+
+RECOMMENDER_BATCH_BLOCK_SIZE = 8
+
+# Thread pool of GET /api/recommend/async: requests beyond the running and
+# queued ones get a 503, and a request waits at most RECOMMENDER_REQUEST_TIMEOUT
+# seconds for its recommendations before getting a 504.
+RECOMMENDER_EXECUTOR_WORKERS = 4
+
+RECOMMENDER_EXECUTOR_QUEUE = 16
+
+RECOMMENDER_REQUEST_TIMEOUT = 10.0
+
+# Rows written by `manage.py precompute_recommendations` are served while their
+# model version matches and, if set, they are at most this many seconds old.
+RECOMMENDER_USE_PRECOMPUTED = True
+
+RECOMMENDER_PRECOMPUTED_MAX_AGE = None
+
+# Profiling of single /api/recommend/ requests, asked for with ?profile=1 or an
+# 'X-Profile: 1' header. Keep it off in production unless you are investigating.
+RECOMMENDER_PROFILING = False
+
+RECOMMENDER_PROFILE_DIR = BASE_DIR / 'profiles'
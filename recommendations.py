@@ -1,9 +1,40 @@
-import joblib
-import pandas as pd
+import hashlib
+import logging
+import os
+import threading
+import time
+
 import numpy as np
-import random
 
-random = random.Random()
+from recommender.artifacts import ArtifactError, dataset_hash
+from recommender.cache import get_ranked_movies, invalidate_user
+from recommender.candidates import candidate_columns, genre_columns
+from recommender.conf import get_setting
+from recommender.content import build_content_features, content_hash, read_tags
+from recommender.dataset import MovieLensDataset
+from recommender.events import read_rating_events, store_rating_events
+from recommender.factorization import FactorModel
+from recommender.hybrid_model import HybridModel
+from recommender.lsh import UserLSHIndex, similar_users
+from recommender.metrics import CANDIDATE_MOVIES, FALLBACK_REQUESTS, STAGE_SECONDS
+from recommender.neighbors import NeighborIndex
+from recommender.popularity import build_popularity_ranking, favorite_genres
+from recommender.precompute import discard_precomputed_movies, get_precomputed_movies
+from recommender.rating_matrix import as_rating_matrix
+from recommender.registry import ModelRegistry
+from recommender.shared import CURRENT_FILE, attach_dataset, current_generation
+
+logger = logging.getLogger(__name__)
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+MODEL_DIR = os.path.join(BASE_DIR, 'models', 'hybrid_model')
+NEIGHBOR_INDEX_DIR = os.path.join(BASE_DIR, 'models', 'neighbor_index')
+LSH_INDEX_DIR = os.path.join(BASE_DIR, 'models', 'lsh_index')
+FACTOR_MODEL_PATH = os.path.join(BASE_DIR, 'models', 'mf_model')
+DATASET_DIR = os.path.join(BASE_DIR, 'ml-latest-small')
+
+MIN_RATING = 0.5
+MAX_RATING = 5.0
 
 
 def hybrid_recommendation_score(user_id, movie_id, user_item_matrix):
@@ -44,80 +75,1077 @@ def hybrid_recommendation_score(user_id, movie_id, user_item_matrix):
     return hybrid_score
 
 
-def hybrid_recommend_movies(user_id, user_item_matrix, N=20):
+def hybrid_recommendation_scores(user_id, user_item_matrix):
+    """
+    Calculate the hybrid recommendation scores for a user against every movie.
+
+    This is the batched equivalent of calling hybrid_recommendation_score once
+    per column of the matrix, and the single-user case of
+    hybrid_recommendation_score_matrix.
+
+    As in hybrid_recommendation_score, the common entries are the ids that
+    appear both among the movies rated by the user and among the users who
+    rated the movie, so both functions return the same numbers.
+
+    Parameters:
+    user_id (int): The ID of the user for whom the scores are being calculated.
+    user_item_matrix (RatingMatrix or pandas.DataFrame): The ratings, either as a
+                                         RatingMatrix or as a dense pivot table.
+
+    Returns:
+    numpy.ndarray: The hybrid recommendation score of every movie, aligned with
+                   the matrix columns. Movies with no common entries score 0.0.
+    """
+    return hybrid_recommendation_score_matrix([user_id], user_item_matrix)[0]
+
+
+def hybrid_recommendation_score_matrix(user_ids, user_item_matrix, candidates=None, min_common=1):
+    """
+    Calculate the hybrid recommendation scores of several users against every movie.
+
+    The users' mean-centered ratings on the shared ids form a sparse matrix A
+    (users x shared ids) and the movie-centered ratings of the shared rows form
+    a sparse matrix C (shared ids x movies). The numerators, common counts and
+    both denominators are sparse matrix products of these two, computed
+    together: every (user, shared id) entry of A is expanded with the ratings
+    of its row of C, and the products are summed per (user, movie) with
+    np.bincount. No per-user or per-movie Python loop is involved, and the
+    means are the running means maintained by RatingMatrix rather than being
+    recomputed from whole rows and columns.
+
+    With candidates, the entries of other movies are dropped before any
+    product is summed, so the cost of the sums and the size of the result
+    scale with the candidate pool rather than with the catalogue.
+
+    Parameters:
+    user_ids (array-like): The IDs of the users, all of which must be in the matrix.
+    user_item_matrix (RatingMatrix or pandas.DataFrame): The ratings.
+    candidates (numpy.ndarray, optional): Sorted column positions of the movies to score.
+                                          Defaults to every movie.
+    min_common (int, optional): Movies with fewer common entries than this score 0.0. Defaults to 1.
+
+    Returns:
+    numpy.ndarray: A (len(user_ids), number of movies or candidates) array of scores.
+    """
+    matrix = as_rating_matrix(user_item_matrix)
+    n_movies = matrix.shape[1] if candidates is None else len(candidates)
+    user_rows = np.array([matrix.user_row(user_id) for user_id in user_ids], dtype=np.int64)
+    size = len(user_rows) * n_movies
+
+    # A: the users' ratings of movies whose ids are also user ids (rows of the matrix)
+    owner, cols, values = matrix.gather_rows(user_rows)
+    shared_rows = matrix.user_rows(matrix.movie_ids[cols])
+    shared = shared_rows >= 0
+    owner, shared_rows = owner[shared], shared_rows[shared]
+    user_deviation = values[shared].astype(np.float64) - matrix.user_means[user_rows[owner]]
+
+    # A @ C: expand every entry of A with the ratings of its shared row
+    entry, cols, values = matrix.gather_rows(shared_rows)
+    if candidates is not None:
+        candidate_of = np.full(matrix.shape[1], -1, dtype=np.int64)
+        candidate_of[candidates] = np.arange(len(candidates))
+        candidate = candidate_of[cols]
+        kept = candidate >= 0
+        entry, cols, values, candidate = entry[kept], cols[kept], values[kept], candidate[kept]
+    else:
+        candidate = cols
+    keys = owner[entry] * n_movies + candidate
+    a = user_deviation[entry]
+    u = values.astype(np.float64) - matrix.movie_means[cols]
+
+    common_counts = np.bincount(keys, minlength=size)
+    numerator = np.bincount(keys, weights=a * u, minlength=size)
+    denominator_a = np.sqrt(np.bincount(keys, weights=a ** 2, minlength=size))
+    denominator_u = np.sqrt(np.bincount(keys, weights=u ** 2, minlength=size))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        scores = numerator / (denominator_a * denominator_u)
+
+    scores[common_counts < max(min_common, 1)] = 0.0
+    return scores.reshape(len(user_rows), n_movies)
+
+
+def hybrid_recommend_movies(user_id, user_item_matrix, N=20, seed=None):
     """
     Recommends top N movies for a user using a hybrid recommendation algorithm.
 
     This function calculates hybrid recommendation scores for all movies,
-    sorts them, excludes movies the user has already rated, and then
-    randomly selects 10 movies from the top N recommendations.
+    selects the N best-scoring movies the user has not rated yet, in score
+    order, and then randomly selects 10 movies from those top N.
 
     Parameters:
     user_id (int): The ID of the user for whom recommendations are being made.
-    user_item_matrix (pandas.DataFrame): A matrix of user ratings for movies,
-                                         where rows represent users and columns
-                                         represent movies.
+    user_item_matrix (RatingMatrix or pandas.DataFrame): The ratings, either as a
+                                         RatingMatrix or as a dense pivot table.
     N (int, optional): The number of top recommendations to consider before
                        random selection. Defaults to 20.
+    seed (int, optional): Seed of the random selection, for reproducible results.
 
     Returns:
-    list: A list of 10 randomly selected movie titles from the top N
-          recommendations, based on the hybrid recommendation algorithm.
+    list: Up to 10 randomly selected movie titles from the top N
+          recommendations, in ranking order.
     """
+    top_N_recommendations = hybrid_rank_movies(user_id, user_item_matrix, N)
+
+    return sample_titles(top_N_recommendations, seed=seed)
+
+
+def hybrid_rank_movies(user_id, user_item_matrix, N=20, content=None, content_weight=0.0, candidates=None,
+                       min_common=1):
+    """
+    Rank the movies a user has not rated by hybrid recommendation score.
+
+    When none of the movieIds the user rated is also a userId, every
+    correlation is 0.0 (see hybrid_recommendation_score), so the scan is
+    skipped. With content features, the scores are blended with the
+    content scores (see blend_content_scores). With candidates, only those
+    movies are scored and ranked (see recommender.candidates).
+
+    Parameters:
+    user_id (int): The ID of the user for whom recommendations are being made.
+    user_item_matrix (RatingMatrix or pandas.DataFrame): The ratings.
+    N (int, optional): The number of movies to return. Defaults to 20.
+    content (ContentFeatures or callable, optional): Genre and tag vectors of the movies, or a
+                                                    function returning them, called only when
+                                                    they are blended (see blend_content_scores).
+    content_weight (float, optional): Weight of the content scores in the blend. Defaults to 0.0.
+    candidates (numpy.ndarray, optional): Sorted column positions of the movies to rank.
+                                          Defaults to every movie.
+    min_common (int, optional): Movies with fewer common entries than this score 0.0. Defaults to 1.
+
+    Returns:
+    numpy.ndarray: The movieIds of the N best unrated movies, best first.
+    """
+    matrix = as_rating_matrix(user_item_matrix)
+    columns = np.arange(matrix.shape[1]) if candidates is None else candidates
+
     # Calculate hybrid recommendation scores for all movies
-    movie_ids = user_item_matrix.columns
-    hybrid_scores = [hybrid_recommendation_score(user_id, movie_id, user_item_matrix) for movie_id in movie_ids]
-    # Sort movie IDs based on hybrid scores in descending order
-    sorted_movie_ids = [x for _, x in sorted(zip(hybrid_scores, movie_ids), reverse=True)]
+    with STAGE_SECONDS.time(stage='scoring'):
+        if has_common_entries(user_id, matrix):
+            hybrid_scores = hybrid_recommendation_score_matrix([user_id], matrix, candidates, min_common)[0]
+        else:
+            hybrid_scores = np.zeros(len(columns))
+        if content is not None:
+            hybrid_scores = blend_content_scores(user_id, matrix, hybrid_scores, content, content_weight,
+                                                 candidates)
 
     # Exclude movies that the user has already rated
-    user_ratings = user_item_matrix.loc[user_id].dropna().index
-    unrated_movies = set(sorted_movie_ids) - set(user_ratings)
+    with STAGE_SECONDS.time(stage='ranking'):
+        rated = np.zeros(matrix.shape[1], dtype=bool)
+        rated[matrix.row(user_id)[0]] = True
+
+        return top_n_movies(hybrid_scores, matrix.movie_ids[columns], N, exclude=rated[columns])
+
+
+def has_common_entries(user_id, user_item_matrix):
+    """
+    Tell whether any movie can get a non-zero hybrid score for a user, i.e.
+    whether any movieId the user rated is also a userId.
+    """
+    matrix = as_rating_matrix(user_item_matrix)
+    cols, _ = matrix.row(user_id)
+    return bool((matrix.user_rows(matrix.movie_ids[cols]) >= 0).any())
+
+
+def content_scores(user_id, user_item_matrix, content):
+    """
+    Score every movie for a user by the similarity of its genres and tags to the user's taste.
+
+    The user's profile is the sum of the feature vectors of the movies they
+    rated, weighted by their rating minus their mean rating (or equally when
+    all their ratings are the same), and every movie scores its cosine
+    similarity to that profile.
+
+    Parameters:
+    user_id (int): The ID of the user for whom the scores are being calculated.
+    user_item_matrix (RatingMatrix or pandas.DataFrame): The ratings.
+    content (ContentFeatures): Genre and tag vectors of the movies.
+
+    Returns:
+    numpy.ndarray: The content score of every movie, aligned with the matrix
+                   columns, between -1.0 and 1.0. Movies without features score 0.0.
+    """
+    matrix = as_rating_matrix(user_item_matrix)
+    cols, values = matrix.row(user_id)
+    weights = values - matrix.user_means[matrix.user_row(user_id)]
+    if not np.any(np.abs(weights) > 1e-9):
+        weights = np.ones(len(values))
+
+    rated = content.positions(matrix.movie_ids[cols])
+    profile = content.profile(rated[rated >= 0], weights[rated >= 0])
+    scores = content.scores(profile)
+
+    columns = content.positions(matrix.movie_ids)
+    return np.where(columns >= 0, scores[columns], 0.0)
+
 
-    # Return the top N unrated movies as recommendations
-    top_N_recommendations = list(unrated_movies)[:N]
+def blend_content_scores(user_id, user_item_matrix, scores, content, content_weight, candidates=None):
+    """
+    Blend collaborative scores of a user with content scores.
 
-    movies = []
-    for movie_id in top_N_recommendations:
-        movie_data = movies_data[movies_data['movieId'] == movie_id]
-        if not movie_data.empty:
-            movies.append(movie_data['title'].values[0])
+    The result is (1 - content_weight) * scores + content_weight * content
+    score, both being similarities between -1.0 and 1.0. When every
+    collaborative score is 0.0, e.g. for a user without common entries, the
+    content scores are used alone, so such users still get a meaningful
+    ranking. With candidates, scores is aligned with those columns. content
+    may be a function returning the features, which is only called when the
+    content scores are needed.
+    """
+    if not content_weight and scores.any():
+        return scores
+    if callable(content):
+        content = content()
+    with STAGE_SECONDS.time(stage='content_scoring'):
+        similarities = content_scores(user_id, user_item_matrix, content)
+        if candidates is not None:
+            similarities = similarities[candidates]
+    if not scores.any():
+        return similarities
+    return (1 - content_weight) * scores + content_weight * similarities
 
-    top_N_movies = []
-    for i in range(10):
-        movie = random.choice(movies)
-        top_N_movies.append(movie)
-        movies.remove(movie)
 
-    return top_N_movies
+def neighbor_recommend_movies(user_id, user_item_matrix, neighbor_index, N=20, seed=None):
+    """
+    Recommends top N movies for a user from a precomputed item-neighbor index.
 
+    Instead of scoring the whole catalogue, this function only reads the
+    neighbor lists of the movies the user has rated (see
+    recommender.neighbors.NeighborIndex.score_user), keeps the N candidates
+    with the highest aggregated score, and randomly selects 10 of them.
+
+    Parameters:
+    user_id (int): The ID of the user for whom recommendations are being made.
+    user_item_matrix (RatingMatrix): The ratings.
+    neighbor_index (NeighborIndex): The item-neighbor index, usually memory-mapped.
+    N (int, optional): The number of top recommendations to consider before
+                       random selection. Defaults to 20.
+    seed (int, optional): Seed of the random selection, for reproducible results.
 
-def make_hybrid_recommendations(user_id):
+    Returns:
+    list: Up to 10 randomly selected movie titles from the top N candidates, in ranking order.
+    """
+    top_N_recommendations = neighbor_rank_movies(user_id, user_item_matrix, neighbor_index, N)
+
+    return sample_titles(top_N_recommendations, seed=seed)
+
+
+def neighbor_rank_movies(user_id, user_item_matrix, neighbor_index, N=20):
+    """
+    Rank the neighbors of the movies a user has rated by aggregated similarity.
+
+    Parameters:
+    user_id (int): The ID of the user for whom recommendations are being made.
+    user_item_matrix (RatingMatrix): The ratings.
+    neighbor_index (NeighborIndex): The item-neighbor index.
+    N (int, optional): The number of movies to return. Defaults to 20.
+
+    Returns:
+    numpy.ndarray: The movieIds of the N best unrated candidates, best first.
+    """
+    matrix = as_rating_matrix(user_item_matrix)
+    user_cols, user_values = matrix.row(user_id)
+    deviations = user_values - matrix.user_means[matrix.user_row(user_id)]
+
+    with STAGE_SECONDS.time(stage='scoring'):
+        candidate_ids, scores = neighbor_index.score_user(matrix.movie_ids[user_cols], deviations)
+
+    with STAGE_SECONDS.time(stage='ranking'):
+        return top_n_movies(scores, candidate_ids, N)
+
+
+def lsh_rank_movies(user_id, user_item_matrix, lsh_index, N=20, K=50):
+    """
+    Rank movies for a user from the ratings of their approximate nearest users.
+
+    The K users most similar to the user are looked up in the LSH index (see
+    recommender.lsh.similar_users), and only the movies they rated are
+    candidates: each scores the sum, over those neighbors, of the neighbor's
+    similarity times their mean-centered rating of the movie.
+
+    Parameters:
+    user_id (int): The ID of the user for whom recommendations are being made.
+    user_item_matrix (RatingMatrix): The ratings.
+    lsh_index (UserLSHIndex): The user LSH index.
+    N (int, optional): The number of movies to return. Defaults to 20.
+    K (int, optional): The number of neighbors to draw candidates from. Defaults to 50.
+
+    Returns:
+    numpy.ndarray: The movieIds of the N best unrated candidates, best first.
+    """
+    matrix = as_rating_matrix(user_item_matrix)
+
+    with STAGE_SECONDS.time(stage='scoring'):
+        neighbors, similarities = similar_users(user_id, matrix, lsh_index, K=K)
+        owner, cols, values = matrix.gather_rows(neighbors)
+        deviations = values - matrix.user_means[neighbors[owner]]
+        candidates, inverse = np.unique(cols, return_inverse=True)
+        scores = np.bincount(inverse, weights=similarities[owner] * deviations, minlength=len(candidates))
+
+    with STAGE_SECONDS.time(stage='ranking'):
+        rated = np.isin(candidates, matrix.row(user_id)[0])
+        return top_n_movies(scores, matrix.movie_ids[candidates], N, exclude=rated)
+
+
+def mf_rank_movies(user_id, user_item_matrix, factor_model, N=20):
+    """
+    Rank movies for a user with the latent-factor model.
+
+    Scoring the whole catalogue is a single matrix-vector product of the
+    movie factors with the user's factors (see FactorModel.score_user).
+    Users the model was not trained on are folded in from their current
+    ratings.
+
+    Parameters:
+    user_id (int): The ID of the user for whom recommendations are being made.
+    user_item_matrix (RatingMatrix): The ratings.
+    factor_model (FactorModel): The trained latent-factor model.
+    N (int, optional): The number of movies to return. Defaults to 20.
+
+    Returns:
+    numpy.ndarray: The movieIds of the N best unrated movies, best first.
+    """
+    matrix = as_rating_matrix(user_item_matrix)
+
+    with STAGE_SECONDS.time(stage='scoring'):
+        cols, values = matrix.row(user_id)
+        rated_ids = matrix.movie_ids[cols]
+        factors, _ = factor_model.user_vector(user_id, rated_ids, values)
+        scores = factor_model.score_user(factors)
+
+    with STAGE_SECONDS.time(stage='ranking'):
+        rated = np.isin(factor_model.movie_ids, rated_ids)
+        return top_n_movies(scores, factor_model.movie_ids, N, exclude=rated)
+
+
+def top_n_movies(scores, movie_ids, N, exclude=None):
+    """
+    Select the N highest-scoring movies, in decreasing score order.
+
+    The N-th best score is found with a partial partition of the candidates,
+    and only the N selected movies are sorted, so the cost is linear in the
+    catalogue size. NaN scores rank below every other score; ties, including
+    ties at the cut-off, are broken by movieId.
+
+    Parameters:
+    scores (numpy.ndarray): The score of every movie.
+    movie_ids (numpy.ndarray): The movieIds aligned with scores.
+    N (int): The number of movies to return.
+    exclude (numpy.ndarray, optional): Boolean mask of movies that must not be returned.
+
+    Returns:
+    numpy.ndarray: Up to N movieIds, best first.
+    """
+    scores = np.where(np.isnan(scores), -np.inf, scores)
+    candidates = np.flatnonzero(~exclude) if exclude is not None else np.arange(len(scores))
+
+    if len(candidates) > N:
+        if N <= 0:
+            return movie_ids[:0]
+        threshold = -np.partition(-scores[candidates], N - 1)[N - 1]
+        above = candidates[scores[candidates] > threshold]
+        tied = candidates[scores[candidates] == threshold]
+        tied = tied[np.argsort(movie_ids[tied], kind='stable')[:N - len(above)]]
+        candidates = np.concatenate([above, tied])
+
+    order = np.lexsort((movie_ids[candidates], -scores[candidates]))
+    return movie_ids[candidates[order]]
+
+
+def sample_titles(top_N_recommendations, k=10, seed=None):
+    """
+    Look up the titles of the top N movie IDs and randomly select k of them.
+
+    The selection uses its own NumPy generator, so passing a seed makes it
+    reproducible without touching any global random state. The selected
+    titles keep their ranking order, and fewer than k titles are returned
+    when fewer are available.
+
+    Parameters:
+    top_N_recommendations (array-like): The movieIds to choose from, best first.
+    k (int, optional): The number of titles to return. Defaults to 10.
+    seed (int or numpy.random.SeedSequence, optional): Seed of the random generator.
+
+    Returns:
+    list: The selected movie titles.
+    """
+    catalog = get_dataset().catalog
+    with STAGE_SECONDS.time(stage='title_lookup'):
+        movies = catalog.titles_for(top_N_recommendations)
+
+        rng = np.random.default_rng(seed)
+        picks = np.sort(rng.choice(len(movies), size=min(k, len(movies)), replace=False))
+
+        return [movies[i] for i in picks]
+
+
+def make_hybrid_recommendations(user_id, seed=None):
     """
     Generate hybrid movie recommendations for a given user.
 
-    This function loads a pre-trained hybrid recommendation model,
-    and uses it to generate movie recommendations for the specified user.
+    The user's top 20 movies are ranked by the engine selected with the
+    RECOMMENDER_ENGINE setting: 'hybrid' scores the whole catalogue with the
+    correlation model, 'neighbors' aggregates the memory-mapped item-neighbor
+    index, 'lsh' draws candidates from the approximate nearest users and 'mf'
+    scores the catalogue with one product of the latent-factor model. The
+    ranked list is kept in the recommendation cache (see recommender.cache)
+    until it expires, the user's ratings change or the model version
+    reported by the model registry changes. On a cache miss, a fresh list
+    written by `manage.py precompute_recommendations` is used when there is
+    one, and the list is only computed otherwise. The random selection of 10
+    movies runs on every call.
+
+    Users who are not in the dataset, or have fewer ratings than the
+    RECOMMENDER_MIN_USER_RATINGS setting, are served from the popularity
+    ranking instead (see popular_movies), without loading any model.
 
     Parameters:
     user_id (int): The ID of the user for whom recommendations are being generated.
+    seed (int, optional): Seed of the random selection among the top 20 movies.
 
     Returns:
-    list: A list of movie titles recommended for the user. The list contains
-          the top 20 recommendations based on the hybrid recommendation model.
+    list: A list of movie titles recommended for the user, randomly selected
+          from the top 20 recommendations based on the hybrid recommendation model.
 
     Note:
-    This function assumes that the 'user_item_matrix' is available in the global scope,
-    and that the hybrid model file 'hybrid_model.joblib' exists in the 'models' directory.
+    This function loads the dataset on first use (see get_dataset), and assumes
+    that the hybrid model built by `manage.py build_hybrid_model` exists in the
+    'models/hybrid_model' directory.
+    """
+    fallback = fallback_reason(user_id)
+    if fallback is not None:
+        FALLBACK_REQUESTS.inc(reason=fallback)
+        return sample_titles(popular_movies(user_id), seed=seed)
+
+    engine = get_setting('RECOMMENDER_ENGINE', 'hybrid')
+    with STAGE_SECONDS.time(stage='model_load'):
+        version = model_version(engine)
+
+    def compute():
+        precomputed = get_precomputed_movies(user_id, version)
+        return precomputed if precomputed is not None else rank_movies(user_id, engine, N=20)
+
+    top_N_recommendations = get_ranked_movies(user_id, version, compute)
+
+    return sample_titles(top_N_recommendations, seed=seed)
+
+
+def fallback_reason(user_id):
+    """
+    Tell whether a user must be served from the popularity ranking.
+
+    Returns:
+    str or None: 'unknown_user' for a user without ratings, 'cold_start' for
+                 one with fewer than RECOMMENDER_MIN_USER_RATINGS ratings, and
+                 None when the recommender engines can serve the user.
     """
-    # Load the hybrid model
-    loaded_model = joblib.load('models/hybrid_model.joblib')
-    hybrid_recommendation_score_loaded, hybrid_recommend_movies_loaded = loaded_model
-    top_recommendations = hybrid_recommend_movies_loaded(user_id, user_item_matrix, N=20)
-    return top_recommendations
+    matrix = get_dataset().matrix
+    if not matrix.has_user(user_id):
+        return 'unknown_user'
+    if matrix.user_counts[matrix.user_row(user_id)] < get_setting('RECOMMENDER_MIN_USER_RATINGS', 5):
+        return 'cold_start'
+    return None
+
+
+def popular_movies(user_id, N=20):
+    """
+    Rank movies for a user from the precomputed popularity ranking.
+
+    Unknown users get the best-rated movies of the catalogue. Users with a
+    few ratings get the best-rated movies of the genres they rated above
+    their own mean (see recommender.popularity.favorite_genres), excluding
+    the movies they already rated.
+
+    Parameters:
+    user_id (int): The ID of the user for whom recommendations are being made.
+    N (int, optional): The number of movies to return. Defaults to 20.
+
+    Returns:
+    numpy.ndarray: Up to N movieIds, best first.
+    """
+    dataset = get_dataset()
+    ranking = popularity_ranking()
+    with STAGE_SECONDS.time(stage='fallback'):
+        if not dataset.matrix.has_user(user_id):
+            return ranking.top(N)
+        cols, values = dataset.matrix.row(user_id)
+        rated_ids = dataset.matrix.movie_ids[cols]
+        genres = favorite_genres(dataset.catalog, rated_ids, values)
+        return ranking.top(N, genres=genres, exclude=rated_ids)
+
+
+def popularity_ranking():
+    """
+    Return the popularity ranking of the loaded dataset, building it on first use.
+
+    The ranking is rebuilt after add_ratings changes the ratings. The
+    Bayesian-average prior is the RECOMMENDER_POPULARITY_PRIOR setting, in
+    ratings (None picks it from the rating counts).
+    """
+    global _popularity
+    dataset = get_dataset()
+    popularity = _popularity
+    if popularity is None or popularity[0] is not dataset:
+        ranking = build_popularity_ranking(dataset.matrix, dataset.catalog,
+                                           get_setting('RECOMMENDER_POPULARITY_PRIOR', None))
+        popularity = _popularity = dataset, ranking
+    return popularity[1]
+
+
+def content_features():
+    """
+    Return the genre and tag vectors of the loaded dataset.
+
+    The genres come from movies.csv and the tags from the tags.csv file of
+    the RECOMMENDER_DATASET_DIR directory, when there is one. The vectors
+    are read from the hybrid model when it was built from the same movies
+    and tags (see recommender.content.content_hash), and otherwise built on
+    first use, including when the model is missing or of another schema
+    version.
+    """
+    global _content
+    dataset = get_dataset()
+    try:
+        model = model_registry.get()
+    except (FileNotFoundError, ArtifactError):
+        model = None
+    content = _content
+    if content is None or content[0] is not dataset or content[1] is not model:
+        tags = read_tags(str(get_setting('RECOMMENDER_DATASET_DIR', DATASET_DIR)))
+        if model is not None and model.content_hash == content_hash(dataset.movies, tags):
+            features = model.content
+        else:
+            logger.warning("No up-to-date hybrid model in %s, building the content features", model_registry.path)
+            features = build_content_features(dataset.catalog, tags)
+        content = _content = dataset, model, features
+    return content[2]
+
+
+def candidate_pool():
+    """
+    Return the movies the hybrid engine scores, as sorted matrix column positions.
+
+    A candidate has at least RECOMMENDER_MIN_MOVIE_RATINGS ratings and, when
+    the RECOMMENDER_CANDIDATE_GENRES setting lists genres, one of them (see
+    recommender.candidates). The genre mask is computed once per dataset;
+    the rating counts are read live, so ingested ratings are taken into
+    account.
+
+    Returns:
+    numpy.ndarray or None: The candidate columns, or None when every movie is a candidate.
+    """
+    global _genre_mask
+    dataset = get_dataset()
+    matrix = dataset.matrix
+    min_ratings = get_setting('RECOMMENDER_MIN_MOVIE_RATINGS', 1)
+    genres = get_setting('RECOMMENDER_CANDIDATE_GENRES', None)
+    if min_ratings <= 1 and not genres:
+        return None
+
+    mask = None
+    if genres:
+        key = dataset, tuple(genres), matrix.shape[1]
+        cached = _genre_mask
+        if cached is None or cached[0] is not dataset or cached[1:3] != key[1:]:
+            cached = _genre_mask = key + (genre_columns(matrix, dataset.catalog, genres),)
+        mask = cached[3]
+    return candidate_columns(matrix, min_ratings, mask)
+
+
+def report_candidates(user_id, user_item_matrix, candidates):
+    """
+    Record the number of movies scored for a user in the candidate metric and the debug log.
+    """
+    matrix = as_rating_matrix(user_item_matrix)
+    count = matrix.shape[1] if candidates is None else len(candidates)
+    CANDIDATE_MOVIES.observe(count)
+    logger.debug("Scoring %d of %d movies for user %s", count, matrix.shape[1], user_id)
+
+
+def rank_movies(user_id, engine='hybrid', N=20):
+    """
+    Rank the top N movies for a user with the given engine, without caching.
+
+    Parameters:
+    user_id (int): The ID of the user for whom recommendations are being made.
+    engine (str, optional): 'hybrid', 'neighbors', 'lsh' or 'mf'. Defaults to 'hybrid'.
+    N (int, optional): The number of movies to return. Defaults to 20.
+
+    Returns:
+    numpy.ndarray: The movieIds of the N best movies, best first.
+    """
+    if engine == 'neighbors':
+        return neighbor_rank_movies(user_id, get_dataset().matrix, neighbor_index_registry().get(), N)
+    if engine == 'lsh':
+        return lsh_rank_movies(user_id, get_dataset().matrix, lsh_index_registry().get(), N,
+                               K=get_setting('RECOMMENDER_LSH_NEIGHBORS', 50))
+    if engine == 'mf':
+        return mf_rank_movies(user_id, get_dataset().matrix, factor_model_registry().get(), N)
+    if engine == 'hybrid':
+        matrix = get_dataset().matrix
+        candidates = candidate_pool()
+        report_candidates(user_id, matrix, candidates)
+        return hybrid_rank_movies(user_id, matrix, N, content=content_features,
+                                  content_weight=get_setting('RECOMMENDER_CONTENT_WEIGHT', 0.0),
+                                  candidates=candidates, min_common=get_setting('RECOMMENDER_MIN_COMMON_RATINGS', 1))
+    raise ValueError(f"Unknown recommender engine: {engine!r}")
+
+
+def model_version(engine='hybrid', N=20):
+    """
+    Return a token identifying everything a ranked list depends on.
+
+    The token is made of the engine, the version of the model artifact it
+    uses and a fingerprint of the ranking settings, of N and of the files the
+    dataset was loaded from (see dataset_version), so cached and precomputed
+    lists are not served after a configuration change or a new dataset. New
+    ratings invalidate the lists of the users who gave them (see
+    add_ratings). The hybrid engine can do without its model (see
+    content_features), so a missing hybrid model, or one of another schema
+    version, is versioned 'none' rather than failing every request.
+    """
+    if engine == 'neighbors':
+        registry = neighbor_index_registry()
+    elif engine == 'lsh':
+        registry = lsh_index_registry()
+    elif engine == 'mf':
+        registry = factor_model_registry()
+    else:
+        registry = model_registry
+    try:
+        version = registry.version
+    except (FileNotFoundError, ArtifactError):
+        if engine != 'hybrid':
+            raise
+        version = 'none'
+    return f'{engine}:{version}/{ranking_fingerprint(engine, N)}'
+
+
+def ranking_fingerprint(engine='hybrid', N=20):
+    """
+    Return a short hash of the settings of an engine, of N and of the loaded dataset's source.
+    """
+    if engine == 'hybrid':
+        names = ('RECOMMENDER_CONTENT_WEIGHT', 'RECOMMENDER_MIN_MOVIE_RATINGS', 'RECOMMENDER_MIN_COMMON_RATINGS',
+                 'RECOMMENDER_CANDIDATE_GENRES')
+    elif engine == 'lsh':
+        names = ('RECOMMENDER_LSH_NEIGHBORS',)
+    else:
+        names = ()
+    parts = [repr(N), dataset_version()] + [f'{name}={get_setting(name, None)!r}' for name in names]
+    return hashlib.sha256('\n'.join(parts).encode('utf-8')).hexdigest()[:16]
+
+
+def dataset_version():
+    """
+    Return a token of the loaded dataset: the files or shared generation it was loaded from.
+
+    It does not follow the ratings recorded since, which only affect the
+    lists of the users who gave them. A dataset built in memory, without a
+    source, is identified by its dataset_hash when it is first seen.
+    """
+    global _dataset_fingerprint
+    dataset = get_dataset()
+    cached = _dataset_fingerprint
+    if cached is None or cached[0] is not dataset:
+        token = dataset.source if dataset.source is not None else dataset_hash(dataset)
+        cached = _dataset_fingerprint = dataset, token
+    return cached[1]
+
+
+def make_batch_recommendations(user_ids, seed=None, N=20):
+    """
+    Generate movie recommendations for many users at once.
+
+    The users the recommender engines can serve are ranked together with
+    rank_users, which scores blocks of users with one sparse product each
+    instead of running make_hybrid_recommendations once per user. As in
+    make_hybrid_recommendations, unknown and cold-start users (see
+    fallback_reason) are served from the popularity ranking.
+
+    Parameters:
+    user_ids (list): The IDs of the users for whom recommendations are being generated.
+    seed (int, optional): Seed of the random selection among the users' top N movies. Every
+                          user gets its own seed derived from it (see user_seed), so users with
+                          the same top N do not get the same selection.
+    N (int, optional): The number of top recommendations to consider before
+                       random selection. Defaults to 20.
+
+    Returns:
+    dict: Every distinct user ID, in the order of user_ids, mapped to its list of movie titles.
+    """
+    user_ids = list(dict.fromkeys(user_ids))
+    engine = get_setting('RECOMMENDER_ENGINE', 'hybrid')
+
+    recommendations, ranked = {}, []
+    for user_id in user_ids:
+        fallback = fallback_reason(user_id)
+        if fallback is None:
+            ranked.append(user_id)
+            continue
+        FALLBACK_REQUESTS.inc(reason=fallback)
+        recommendations[user_id] = sample_titles(popular_movies(user_id, N), seed=user_seed(seed, user_id))
+
+    for user_id, top_N_recommendations in rank_users(ranked, engine, N):
+        recommendations[user_id] = sample_titles(top_N_recommendations, seed=user_seed(seed, user_id))
+
+    return {user_id: recommendations[user_id] for user_id in user_ids}
+
+
+def user_seed(seed, user_id):
+    """
+    Derive the seed of one user's random selection from a request seed.
+
+    Parameters:
+    seed (int or None): The seed of the request, non-negative.
+    user_id (int): The ID of the user, non-negative.
+
+    Returns:
+    numpy.random.SeedSequence or None: The user's seed, or None without a request seed.
+    """
+    return None if seed is None else np.random.SeedSequence([seed, user_id])
+
+
+def rank_users(user_ids, engine='hybrid', N=20):
+    """
+    Rank the top N movies of many users, without caching.
+
+    With the hybrid engine, users are scored against the whole catalogue with
+    hybrid_recommendation_score_matrix, one sparse product per block of
+    RECOMMENDER_BATCH_BLOCK_SIZE users. The neighbors, lsh and mf engines are run per user.
+
+    Parameters:
+    user_ids (list): The IDs of the users, all of which must be in the matrix.
+    engine (str, optional): 'hybrid', 'neighbors', 'lsh' or 'mf'. Defaults to 'hybrid'.
+    N (int, optional): The number of movies to rank per user. Defaults to 20.
+
+    Yields:
+    tuple: (user_id, movieIds of the N best movies, best first), in the order of user_ids.
+    """
+    matrix = get_dataset().matrix
+
+    if engine in ('neighbors', 'lsh', 'mf'):
+        for user_id in user_ids:
+            yield user_id, rank_movies(user_id, engine, N)
+        return
+    if engine != 'hybrid':
+        raise ValueError(f"Unknown recommender engine: {engine!r}")
+
+    # The per-block (users x movies) accumulators should stay cache-sized:
+    # larger blocks save Python overhead but make np.bincount memory-bound.
+    batch_size = get_setting('RECOMMENDER_BATCH_BLOCK_SIZE', 8)
+    content = content_features
+    content_weight = get_setting('RECOMMENDER_CONTENT_WEIGHT', 0.0)
+    candidates = candidate_pool()
+    min_common = get_setting('RECOMMENDER_MIN_COMMON_RATINGS', 1)
+    columns = np.arange(matrix.shape[1]) if candidates is None else candidates
+    for start in range(0, len(user_ids), batch_size):
+        block = user_ids[start:start + batch_size]
+        with STAGE_SECONDS.time(stage='scoring'):
+            scores = hybrid_recommendation_score_matrix(block, matrix, candidates, min_common)
+        for user_id, user_scores in zip(block, scores):
+            report_candidates(user_id, matrix, candidates)
+            user_scores = blend_content_scores(user_id, matrix, user_scores, content, content_weight, candidates)
+            with STAGE_SECONDS.time(stage='ranking'):
+                rated = np.zeros(matrix.shape[1], dtype=bool)
+                rated[matrix.row(user_id)[0]] = True
+                ranked = top_n_movies(user_scores, matrix.movie_ids[columns], N, exclude=rated[columns])
+            yield user_id, ranked
+
+
+def add_ratings(events):
+    """
+    Record new ratings.
+
+    The events are validated, appended to the RatingEvent log, and applied to
+    the loaded rating matrix with RatingMatrix.add_rating, which updates the
+    per-user and per-movie counts, means and squared-deviation sums in place
+    instead of rebuilding the matrix; unknown users get a new row. Other
+    processes pick the events up from the log within
+    RECOMMENDER_RATINGS_SYNC_INTERVAL seconds (see sync_ratings), and every
+    process replays them when it loads the dataset, so they survive restarts.
+    The precomputed lists of the users who rated are deleted, their cached
+    lists dropped in every process as it syncs, and the popularity ranking
+    is rebuilt. The events are validated before any of
+    them is stored (see rating_event_error), so a bad event leaves the
+    dataset and the log unchanged.
+
+    Parameters:
+    events (iterable): (user_id, movie_id, rating) tuples.
+
+    Returns:
+    int: The number of ratings recorded.
+
+    Raises:
+    ValueError: If a user ID is out of range, a rating is outside MIN_RATING..MAX_RATING
+                or a movie is not in the catalogue.
+    """
+    dataset = get_dataset()
+    events = [(int(user_id), int(movie_id), float(rating)) for user_id, movie_id, rating in events]
+    for user_id, movie_id, rating in events:
+        error = rating_event_error(dataset, user_id, movie_id, rating)
+        if error is not None:
+            raise ValueError(error)
+
+    if store_rating_events(events):
+        discard_precomputed_movies({user_id for user_id, _, _ in events})
+        sync_ratings(dataset)
+    else:
+        apply_ratings(dataset, events)
+    return len(events)
+
+
+def rating_event_error(dataset, user_id, movie_id, rating):
+    """
+    Check one (user_id, movie_id, rating) event against the dataset.
+
+    The rating matrix finds a user's row in a table indexed by user ID, so a
+    new user ID may be at most RECOMMENDER_NEW_USER_ID_HEADROOM above the
+    largest known one (and within the int32 range): a huge ID would otherwise
+    allocate gigabytes in every worker.
+
+    Returns:
+    str or None: Why the event cannot be applied, or None if it can.
+    """
+    matrix = dataset.matrix
+    if not matrix.has_user(user_id):
+        largest = int(matrix.user_ids.max()) if len(matrix.user_ids) else 0
+        limit = min(largest + get_setting('RECOMMENDER_NEW_USER_ID_HEADROOM', 100_000), np.iinfo(np.int32).max)
+        if not 1 <= user_id <= limit:
+            return f"Invalid user ID: {user_id}"
+    if movie_id not in dataset.catalog:
+        return f"Unknown movie ID: {movie_id}"
+    if not MIN_RATING <= rating <= MAX_RATING:
+        return f"Rating must be between {MIN_RATING} and {MAX_RATING}, got {rating}"
+    return None
+
+
+def sync_ratings(dataset, invalidate=True):
+    """
+    Apply the logged ratings the dataset has not seen yet, and return how many were applied.
+
+    With invalidate, the cached lists of the users who rated are dropped too
+    (see apply_ratings); the replay of the log when a dataset is loaded does
+    not, as lists cached or precomputed since already include those ratings.
+    """
+    global _ratings_checked_at
+    with _ratings_lock:
+        _ratings_checked_at = time.monotonic()
+        events = read_rating_events(dataset.rating_event_id)
+        if events:
+            apply_ratings(dataset, [(user_id, movie_id, rating) for _, user_id, movie_id, rating in events],
+                          invalidate)
+            dataset.rating_event_id = events[-1][0]
+    return len(events)
+
+
+def apply_ratings(dataset, events, invalidate=True):
+    """
+    Apply (user_id, movie_id, rating) events to the dataset's matrix, in order,
+    and with invalidate drop the cached ranked lists of their users.
+
+    Events that cannot be applied (see rating_event_error), e.g. logged by an
+    older version of the code or for a movie no longer in the catalogue, are
+    logged and skipped, so one bad row of the log never stops a worker from
+    loading the dataset.
+    """
+    global _popularity
+    for user_id, movie_id, rating in events:
+        error = rating_event_error(dataset, user_id, movie_id, rating)
+        if error is not None:
+            logger.warning("Skipping rating event (%s, %s, %s): %s", user_id, movie_id, rating, error)
+            continue
+        dataset.matrix.add_rating(user_id, movie_id, rating)
+        if invalidate:
+            invalidate_user(user_id)
+    _popularity = None
+
+
+def neighbor_index_registry():
+    """
+    Return the registry holding the memory-mapped item-neighbor index.
+
+    The registry is created on first use, so the RECOMMENDER_NEIGHBOR_INDEX_DIR
+    setting is read once Django is configured. The index is built offline with
+    `manage.py build_neighbor_index`.
+    """
+    global _neighbor_index_registry
+    if _neighbor_index_registry is None:
+        directory = get_setting('RECOMMENDER_NEIGHBOR_INDEX_DIR', NEIGHBOR_INDEX_DIR)
+        _neighbor_index_registry = ModelRegistry(str(directory), loader=NeighborIndex.load)
+    return _neighbor_index_registry
+
+
+def lsh_index_registry():
+    """
+    Return the registry holding the memory-mapped user LSH index.
+
+    The index is built offline with `manage.py build_lsh_index` into the
+    RECOMMENDER_LSH_INDEX_DIR directory.
+    """
+    global _lsh_index_registry
+    if _lsh_index_registry is None:
+        directory = get_setting('RECOMMENDER_LSH_INDEX_DIR', LSH_INDEX_DIR)
+        _lsh_index_registry = ModelRegistry(str(directory), loader=UserLSHIndex.load)
+    return _lsh_index_registry
+
+
+def factor_model_registry():
+    """
+    Return the registry holding the latent-factor model.
+
+    The model is trained offline with `manage.py train_mf_model` into the
+    RECOMMENDER_MF_MODEL_PATH directory.
+    """
+    global _factor_model_registry
+    if _factor_model_registry is None:
+        path = get_setting('RECOMMENDER_MF_MODEL_PATH', FACTOR_MODEL_PATH)
+        _factor_model_registry = ModelRegistry(str(path), loader=FactorModel.load)
+    return _factor_model_registry
+
+
+def get_dataset():
+    """
+    Return the MovieLens dataset, loading it on first use.
+
+    Importing this module does no I/O: the CSV files are read, and the rating
+    matrix and movie catalogue built, the first time a recommendation needs
+    them (see load_dataset). Loading happens once per process, even when
+    several threads ask for the dataset at the same time.
+
+    When the RECOMMENDER_SHARED_DATASET_DIR setting names a directory that
+    `manage.py publish_dataset` wrote to, the dataset is instead attached
+    from its current generation: the rating arrays are memory-mapped
+    read-only, so every worker process shares one copy of them, and a newly
+    published generation is picked up by the next call after it appears.
+
+    At most every RECOMMENDER_RATINGS_SYNC_INTERVAL seconds, the ratings other
+    processes recorded since are applied as well (see sync_ratings).
+
+    Returns:
+    MovieLensDataset: The loaded dataset.
+    """
+    global _dataset
+    dataset = _dataset
+    if dataset is None:
+        registry = shared_dataset_registry()
+        if registry is not None:
+            dataset = registry.get().dataset
+        else:
+            with _dataset_lock:
+                if _dataset is None:
+                    _dataset = load_dataset()
+                dataset = _dataset
+
+    interval = get_setting('RECOMMENDER_RATINGS_SYNC_INTERVAL', 5.0)
+    if interval is not None and time.monotonic() - _ratings_checked_at >= interval:
+        sync_ratings(dataset)
+    return dataset
+
+
+def load_dataset():
+    """
+    Load the dataset of this process from the MovieLens directory.
+
+    The directory is taken from the RECOMMENDER_DATASET_DIR setting, and the
+    binary cache written by `manage.py ingest_movielens` is used instead of
+    the CSV files when it is newer than them. When the
+    RECOMMENDER_DATASET_CHUNK_SIZE setting is set, ratings.csv is streamed
+    in chunks of that many rows, for dumps too large to parse at once.
+    The ratings recorded through add_ratings are then replayed.
+
+    Returns:
+    MovieLensDataset: The loaded dataset.
+    """
+    directory = str(get_setting('RECOMMENDER_DATASET_DIR', DATASET_DIR))
+    cache_path = get_setting('RECOMMENDER_DATASET_CACHE', None)
+    chunk_size = get_setting('RECOMMENDER_DATASET_CHUNK_SIZE', None)
+    with STAGE_SECONDS.time(stage='dataset_load'):
+        dataset = MovieLensDataset.load(directory, cache_path and str(cache_path), chunk_size)
+        sync_ratings(dataset, invalidate=False)
+    return dataset
+
+
+def shared_dataset_registry():
+    """
+    Return the registry holding the attached shared dataset, or None when no shared dataset is in use.
+
+    A shared dataset is in use when the RECOMMENDER_SHARED_DATASET_DIR setting
+    is set and a generation was published there. The registry watches the
+    directory's CURRENT file, so publishing a new generation swaps it in.
+    """
+    global _shared_dataset_registry
+    if _shared_dataset_registry is None:
+        root = get_setting('RECOMMENDER_SHARED_DATASET_DIR', None)
+        if root is None or current_generation(str(root)) is None:
+            return None
+        with _dataset_lock:
+            if _shared_dataset_registry is None:
+                _shared_dataset_registry = ModelRegistry(
+                    os.path.join(str(root), CURRENT_FILE),
+                    loader=lambda path: attach_dataset(os.path.dirname(path)))
+    return _shared_dataset_registry
+
+
+def warm_up(sample_size=8):
+    """
+    Load everything the recommendations need now instead of on the first requests.
+
+    The dataset, the model of the RECOMMENDER_ENGINE engine and the
+    popularity ranking are loaded, as are the content features of the hybrid
+    engine when RECOMMENDER_CONTENT_WEIGHT blends them into every ranking.
+    Then the top movies of sample_size users spread over the matrix are
+    ranked, which also builds the candidate pool of the hybrid engine and
+    runs every code path a request takes once. The rankings themselves are not cached. Call this
+    from a worker start-up hook, or let recommender.warmup run it in the
+    background when the app starts.
+
+    Parameters:
+    sample_size (int, optional): Number of users ranked. Defaults to 8.
+
+    Returns:
+    int: The number of users ranked.
+    """
+    matrix = get_dataset().matrix
+    engine = get_setting('RECOMMENDER_ENGINE', 'hybrid')
+    model_version(engine)
+    popularity_ranking()
+    if engine == 'hybrid' and get_setting('RECOMMENDER_CONTENT_WEIGHT', 0.0):
+        content_features()
+
+    positions = np.unique(np.linspace(0, matrix.shape[0] - 1, num=min(sample_size, matrix.shape[0])).astype(np.int64))
+    user_ids = [user_id for user_id in matrix.user_ids[positions].tolist() if fallback_reason(user_id) is None]
+    for user_id in user_ids:
+        rank_movies(user_id, engine)
+    return len(user_ids)
+
+
+_DATASET_ATTRIBUTES = {
+    'movies_data': 'movies',
+    'data': 'ratings',
+    'links_data': 'links',
+    'movie_catalog': 'catalog',
+    'user_item_matrix': 'matrix',
+}
+
+
+def __getattr__(name):
+    # The module-level dataset names are kept for existing callers; they load lazily.
+    if name in _DATASET_ATTRIBUTES:
+        return getattr(get_dataset(), _DATASET_ATTRIBUTES[name])
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-movies_data = pd.read_csv('ml-latest-small/movies.csv')
-data = pd.read_csv('ml-latest-small/ratings.csv')
+model_registry = ModelRegistry(MODEL_DIR, loader=HybridModel.load)
+_neighbor_index_registry = None
+_lsh_index_registry = None
+_factor_model_registry = None
+_shared_dataset_registry = None
+_popularity = None
+_content = None
+_genre_mask = None
+_dataset_fingerprint = None
 
-user_item_matrix = data.pivot(index='userId', columns='movieId', values='rating')
+_dataset = None
+_dataset_lock = threading.Lock()
+_ratings_lock = threading.Lock()
+_ratings_checked_at = 0.0
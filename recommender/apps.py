@@ -5,4 +5,8 @@ class RecommenderConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'recommender'
 
-
+    def ready(self):
+        # Load the data and models in the background so the first requests to a new worker are not slow
+        from recommender.warmup import should_warm_up, start_warm_up
+        if should_warm_up():
+            start_warm_up()
@@ -0,0 +1,165 @@
+# recommender/artifacts.py
+
+import hashlib
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+
+import numpy as np
+
+MANIFEST_FILE = 'manifest.json'
+
+Artifact = namedtuple('Artifact', ['manifest', 'arrays'])
+
+
+class ArtifactError(ValueError):
+    """Raised when a model artifact is incomplete or was written by an incompatible version of the code."""
+
+
+def replace_directory(directory, write):
+    """
+    Replace a directory atomically with the files written by a callback.
+
+    write is called with an empty temporary directory next to the target;
+    the target, if it exists, is then moved aside, the temporary directory
+    renamed into its place and the old one deleted. A reader therefore sees
+    either the old files or the new ones, never a mix or a partial write.
+
+    Parameters:
+    directory (str): The directory to replace.
+    write (callable): Called with the path of the temporary directory to fill.
+
+    Returns:
+    int: The total size of the files in the new directory, in bytes.
+    """
+    directory = os.path.normpath(directory)
+    temporary = f'{directory}.tmp-{os.getpid()}'
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+    write(temporary)
+
+    previous = f'{directory}.old-{os.getpid()}'
+    if os.path.exists(directory):
+        os.replace(directory, previous)
+    os.replace(temporary, directory)
+    shutil.rmtree(previous, ignore_errors=True)
+
+    return sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+
+
+def save_artifact(directory, kind, schema_version, arrays, dataset_hash, metadata=None):
+    """
+    Write a model artifact: one .npy file per array plus a manifest.json.
+
+    The manifest records the kind of model, the schema version of the code
+    that wrote it, the hash of the dataset it was built from, the build time
+    and the dtype and shape of every array. The files are written to a
+    temporary directory that is then moved into place, so a reader never
+    opens a half-written artifact.
+
+    Parameters:
+    directory (str): Directory of the artifact, replaced if it exists.
+    kind (str): Name of the model, e.g. 'hybrid'.
+    schema_version (int): Version of the array layout, checked by load_artifact.
+    arrays (dict): The arrays, by name.
+    dataset_hash (str): Fingerprint of the training data, see dataset_hash.
+    metadata (dict, optional): Extra JSON-serializable fields, e.g. build parameters.
+
+    Returns:
+    int: The total size of the written files in bytes.
+    """
+    manifest = {
+        'kind': kind,
+        'schema_version': schema_version,
+        'dataset_hash': dataset_hash,
+        'built_at': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'arrays': {name: {'dtype': np.asarray(array).dtype.str, 'shape': list(np.shape(array))}
+                   for name, array in arrays.items()},
+        'metadata': metadata or {},
+    }
+
+    def write(temporary):
+        for name, array in arrays.items():
+            np.save(os.path.join(temporary, f'{name}.npy'), array)
+        with open(os.path.join(temporary, MANIFEST_FILE), 'w') as file:
+            json.dump(manifest, file, indent=2)
+
+    return replace_directory(directory, write)
+
+
+def load_artifact(directory, kind, schema_version, mmap_mode='r'):
+    """
+    Open an artifact written by save_artifact, memory-mapped read-only by default.
+
+    Opening reads the manifest and the .npy headers only, so it takes
+    milliseconds whatever the size of the arrays.
+
+    Returns:
+    Artifact: The manifest (dict) and the arrays (dict of numpy.ndarray).
+
+    Raises:
+    ArtifactError: If the artifact is of another kind or schema version, or an array
+                   is missing or does not match the manifest.
+    """
+    manifest = read_manifest(directory)
+    if manifest.get('kind') != kind:
+        raise ArtifactError(f"{directory} holds a {manifest.get('kind')!r} model, expected {kind!r}")
+    if manifest.get('schema_version') != schema_version:
+        raise ArtifactError(f"{directory} has schema version {manifest.get('schema_version')}, "
+                            f"this code reads version {schema_version}; rebuild the model")
+
+    arrays = {}
+    for name, spec in manifest['arrays'].items():
+        try:
+            array = np.load(os.path.join(directory, f'{name}.npy'), mmap_mode=mmap_mode, allow_pickle=False)
+        except FileNotFoundError:
+            raise ArtifactError(f"{directory} is missing {name}.npy") from None
+        if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ArtifactError(f"{directory}/{name}.npy does not match the manifest")
+        arrays[name] = array
+    return Artifact(manifest, arrays)
+
+
+def read_manifest(directory):
+    """
+    Return the manifest of an artifact written by save_artifact, without opening its arrays.
+
+    Raises:
+    ArtifactError: If the directory has no manifest.
+    """
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE)) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        raise ArtifactError(f"{directory} has no {MANIFEST_FILE}") from None
+
+
+def dataset_hash(dataset):
+    """
+    Return a fingerprint of a dataset: a SHA-256 of its movieIds, userIds and per-id rating counts.
+
+    It only reads arrays of one entry per user or movie, so it is cheap to
+    compute at load time, and it changes whenever movies or users are added
+    or ratings are added or removed.
+    """
+    matrix = dataset.matrix
+    digest = hashlib.sha256()
+    for array in (dataset.catalog.movie_ids, matrix.user_ids, matrix.movie_ids, matrix.user_counts,
+                  matrix.movie_counts):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+def matrix_hash(matrix):
+    """
+    Return a fingerprint of a RatingMatrix: a SHA-256 of its userIds, movieIds and per-id rating counts.
+
+    It is the part of dataset_hash that models trained on the ratings alone
+    (neighbors, LSH, latent factors) depend on.
+    """
+    digest = hashlib.sha256()
+    for array in (matrix.user_ids, matrix.movie_ids, matrix.user_counts, matrix.movie_counts):
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
@@ -0,0 +1,223 @@
+# recommender/benchmarks.py
+
+import contextlib
+import platform
+import statistics
+import time
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+import recommendations
+from recommender import views
+from recommender.dataset import MovieLensDataset
+
+BENCHMARK_CASES = (
+    'hybrid_recommendation_score',
+    'hybrid_recommendation_scores',
+    'hybrid_recommend_movies',
+    'make_hybrid_recommendations',
+    'recommend_view',
+)
+
+# Largest users x movies pivot table the dense pandas reference is run on (~80 MB of float64)
+MAX_DENSE_CELLS = 10_000_000
+
+
+def synthetic_dataset(base, scale, seed=0):
+    """
+    Generate a MovieLens-like dataset scale times larger than base.
+
+    The number of users grows with scale and the number of movies with its
+    square root, as in the larger MovieLens releases. Every synthetic user
+    gets the number of ratings of a randomly drawn real user, and movies are
+    drawn with the long-tailed popularity profile of the real catalogue, so
+    the ratings per user, ratings per movie and overall density stay
+    realistic. Ratings are a global mean plus user and movie biases and
+    noise, rounded to half stars.
+
+    Parameters:
+    base (MovieLensDataset): The dataset whose shape is imitated.
+    scale (float): Ratio between the number of synthetic and real users.
+    seed (int, optional): Seed of the random generator. Defaults to 0.
+
+    Returns:
+    MovieLensDataset: The synthetic dataset, with ids starting at 1.
+    """
+    rng = np.random.default_rng(seed)
+    matrix = base.matrix
+    n_users = int(round(matrix.shape[0] * scale))
+    n_movies = int(round(matrix.shape[1] * np.sqrt(scale)))
+
+    user_counts = np.minimum(rng.choice(matrix.user_counts, size=n_users), n_movies)
+    popularity = np.sort(matrix.movie_counts)[::-1].astype(np.float64)
+    popularity = popularity[(np.arange(n_movies) * len(popularity)) // n_movies]
+    popularity = rng.permutation(popularity * rng.uniform(0.5, 1.5, size=n_movies))
+
+    users = np.repeat(np.arange(n_users), user_counts)
+    movies = rng.choice(n_movies, size=len(users), p=popularity / popularity.sum())
+    pairs = np.unique(users.astype(np.int64) * n_movies + movies)
+    users, movies = pairs // n_movies, pairs % n_movies
+
+    base_ratings = matrix.data.astype(np.float64)
+    spread = base_ratings.std()
+    values = (base_ratings.mean() + rng.normal(0, spread / 2, n_users)[users]
+              + rng.normal(0, spread / 2, n_movies)[movies] + rng.normal(0, spread / 2, len(users)))
+    values = np.clip(np.round(values * 2) / 2, 0.5, 5.0)
+
+    ratings = pd.DataFrame({
+        'userId': (users + 1).astype(np.int32),
+        'movieId': (movies + 1).astype(np.int32),
+        'rating': values.astype(np.float32),
+        'timestamp': rng.integers(828_000_000, 1_540_000_000, size=len(users)),
+    })
+    movie_frame = pd.DataFrame({
+        'movieId': np.arange(1, n_movies + 1, dtype=np.int32),
+        'title': [f'Synthetic movie {movie_id}' for movie_id in range(1, n_movies + 1)],
+        'genres': rng.choice(base.movies['genres'].to_numpy(), size=n_movies),
+    })
+    return MovieLensDataset(movie_frame, ratings)
+
+
+def run_benchmarks(datasets, cases=BENCHMARK_CASES, repeat=5, seed=0, max_dense_cells=MAX_DENSE_CELLS):
+    """
+    Time the recommendation hot paths on several datasets.
+
+    Every case is called once to warm up and then repeat times, each time
+    for a different randomly drawn user. The recommendation cache and the
+    precomputed table are bypassed, so every call does the full work. The
+    dense pandas reference, hybrid_recommendation_score, is skipped on
+    datasets whose pivot table would exceed max_dense_cells cells.
+
+    Parameters:
+    datasets (dict): MovieLensDataset per name, e.g. {'ml-latest-small': ..., 'synthetic-10x': ...}.
+    cases (iterable, optional): Names of the cases to run, from BENCHMARK_CASES.
+    repeat (int, optional): Number of timed calls per case. Defaults to 5.
+    seed (int, optional): Seed of the user sampling. Defaults to 0.
+    max_dense_cells (int, optional): Size limit of the dense reference. Defaults to MAX_DENSE_CELLS.
+
+    Returns:
+    dict: A JSON-serializable report with the environment and, per dataset,
+          its size and the timings of every case in milliseconds.
+    """
+    report = {
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'machine': platform.machine(),
+        'repeat': repeat,
+        'datasets': {},
+    }
+    for name, dataset in datasets.items():
+        matrix = dataset.matrix
+        rng = np.random.default_rng(seed)
+        user_ids = rng.choice(matrix.user_ids, size=repeat + 1).tolist()
+        results = {}
+        with _serving(dataset):
+            for case in cases:
+                results[case] = _run_case(case, dataset, user_ids, rng, max_dense_cells)
+        report['datasets'][name] = {
+            'users': matrix.shape[0],
+            'movies': matrix.shape[1],
+            'ratings': matrix.nnz,
+            'density': matrix.nnz / (matrix.shape[0] * matrix.shape[1]),
+            'cases': results,
+        }
+    return report
+
+
+def compare_reports(report, baseline, tolerance=0.2):
+    """
+    Compare a benchmark report with a baseline report.
+
+    Parameters:
+    report (dict): The current report, as returned by run_benchmarks.
+    baseline (dict): An earlier report.
+    tolerance (float, optional): Allowed relative slowdown of the median. Defaults to 0.2.
+
+    Returns:
+    list: One dict per (dataset, case) measured in both reports, with the
+          baseline and current medians, their ratio and a 'regression' flag.
+    """
+    comparisons = []
+    for name, dataset in report['datasets'].items():
+        baseline_cases = baseline.get('datasets', {}).get(name, {}).get('cases', {})
+        for case, result in dataset['cases'].items():
+            previous = baseline_cases.get(case)
+            if not previous or 'median_ms' not in previous or 'median_ms' not in result:
+                continue
+            ratio = result['median_ms'] / previous['median_ms']
+            comparisons.append({
+                'dataset': name,
+                'case': case,
+                'baseline_ms': previous['median_ms'],
+                'current_ms': result['median_ms'],
+                'ratio': ratio,
+                'regression': ratio > 1 + tolerance,
+            })
+    return comparisons
+
+
+def _run_case(case, dataset, user_ids, rng, max_dense_cells):
+    matrix = dataset.matrix
+    context = contextlib.nullcontext()
+    if case == 'hybrid_recommendation_score':
+        if matrix.shape[0] * matrix.shape[1] > max_dense_cells:
+            return {'skipped': f'pivot table larger than {max_dense_cells} cells'}
+        pivot = matrix.to_frame()
+        movie_ids = rng.choice(matrix.movie_ids, size=len(user_ids)).tolist()
+        calls = [lambda u=u, m=m: recommendations.hybrid_recommendation_score(u, m, pivot)
+                 for u, m in zip(user_ids, movie_ids)]
+    elif case == 'hybrid_recommendation_scores':
+        calls = [lambda u=u: recommendations.hybrid_recommendation_scores(u, matrix) for u in user_ids]
+    elif case == 'hybrid_recommend_movies':
+        calls = [lambda u=u: recommendations.hybrid_recommend_movies(u, matrix, seed=0) for u in user_ids]
+    elif case == 'make_hybrid_recommendations':
+        calls = [lambda u=u: recommendations.make_hybrid_recommendations(u, seed=0) for u in user_ids]
+    elif case == 'recommend_view':
+        # The view draws its own user between 1 and 1000; make it request the sampled users in turn
+        users = iter(user_ids)
+        context = patch.object(views.random, 'randint', side_effect=lambda low, high: next(users))
+        client = Client()
+        url = reverse('recommend_movies')
+        calls = [lambda: client.get(url, {'seed': 0}) for _ in user_ids]
+    else:
+        raise ValueError(f"Unknown benchmark case: {case!r}")
+
+    timings = []
+    # The reference scorer divides 0 by 0 for pairs without variance
+    with np.errstate(divide='ignore', invalid='ignore'), context:
+        calls[0]()
+        for call in calls[1:]:
+            started = time.perf_counter()
+            call()
+            timings.append((time.perf_counter() - started) * 1000)
+    return _summary(timings)
+
+
+def _summary(timings):
+    ordered = sorted(timings)
+    return {
+        'calls': len(ordered),
+        'min_ms': ordered[0],
+        'median_ms': statistics.median(ordered),
+        'mean_ms': statistics.fmean(ordered),
+        'p95_ms': ordered[min(len(ordered) - 1, int(np.ceil(0.95 * len(ordered))) - 1)],
+        'max_ms': ordered[-1],
+    }
+
+
+@contextlib.contextmanager
+def _serving(dataset):
+    # Serve recommendations from the given dataset, without cache or precomputed table
+    previous = recommendations._dataset
+    recommendations._dataset = dataset
+    try:
+        with override_settings(RECOMMENDER_CACHE_ALIAS='benchmark-no-cache', RECOMMENDER_USE_PRECOMPUTED=False):
+            yield
+    finally:
+        recommendations._dataset = previous
@@ -0,0 +1,69 @@
+# recommender/cache.py
+
+from django.core.cache import InvalidCacheBackendError, caches
+
+from recommender.conf import get_setting, settings_available
+from recommender.metrics import CACHE_REQUESTS
+
+CACHE_KEY_PREFIX = 'ranked-movies'
+
+
+def get_ranked_movies(user_id, model_version, compute):
+    """
+    Return a user's ranked candidate list from the cache, computing it on a miss.
+
+    The cache is the Django cache named by the RECOMMENDER_CACHE_ALIAS setting
+    ('recommendations' by default), so its backend, TTL (TIMEOUT) and size
+    bound (OPTIONS['MAX_ENTRIES']) are configured in CACHES. The local-memory
+    backend evicts the least recently used entries first.
+
+    An entry is only used if it was computed with the same model version, so
+    a new model artifact, new settings or a new dataset (see
+    recommendations.model_version) invalidate every entry without flushing
+    the cache. invalidate_user drops a single user's entry, e.g. when the
+    user rates a movie (see recommendations.add_ratings).
+
+    Parameters:
+    user_id (int): The ID of the user.
+    model_version (str): Token identifying the engine and model that produce the list.
+    compute (callable): Called without arguments on a miss; returns the ranked movieIds.
+
+    Returns:
+    list: The ranked movieIds, best first.
+    """
+    cache = _recommendation_cache()
+    if cache is None:
+        return list(compute())
+
+    key = _cache_key(user_id)
+    entry = cache.get(key)
+    if entry is not None and entry['model_version'] == model_version:
+        CACHE_REQUESTS.inc(result='hit')
+        return entry['movie_ids']
+
+    CACHE_REQUESTS.inc(result='miss')
+    movie_ids = [int(movie_id) for movie_id in compute()]
+    cache.set(key, {'model_version': model_version, 'movie_ids': movie_ids})
+    return movie_ids
+
+
+def invalidate_user(user_id):
+    """
+    Drop the cached ranked list of a user, e.g. after their ratings changed.
+    """
+    cache = _recommendation_cache()
+    if cache is not None:
+        cache.delete(_cache_key(user_id))
+
+
+def _recommendation_cache():
+    if not settings_available():
+        return None
+    try:
+        return caches[get_setting('RECOMMENDER_CACHE_ALIAS', 'recommendations')]
+    except InvalidCacheBackendError:
+        return None
+
+
+def _cache_key(user_id):
+    return f'{CACHE_KEY_PREFIX}:{int(user_id)}'
@@ -0,0 +1,37 @@
+# recommender/candidates.py
+
+import numpy as np
+
+
+def candidate_columns(matrix, min_ratings=1, genre_mask=None):
+    """
+    Select the movies worth scoring, before any score is computed.
+
+    Most movies of a MovieLens catalogue have one or two ratings, and their
+    correlations are degenerate (a single common entry always correlates
+    at exactly +1 or -1) while costing as much to score as any other.
+
+    Parameters:
+    matrix (RatingMatrix): The ratings.
+    min_ratings (int, optional): Minimum number of ratings of a candidate. Defaults to 1.
+    genre_mask (numpy.ndarray, optional): Boolean mask of the allowed columns, see genre_columns.
+
+    Returns:
+    numpy.ndarray: The sorted column positions of the candidates.
+    """
+    keep = matrix.movie_counts >= min_ratings
+    if genre_mask is not None:
+        keep &= genre_mask[:len(keep)]
+    return np.flatnonzero(keep)
+
+
+def genre_columns(matrix, catalog, genres):
+    """
+    Return the boolean mask of the matrix columns whose movie has at least one of the given genres.
+    """
+    genres = set(genres)
+    positions = catalog.positions(matrix.movie_ids)
+    if catalog.genres is None:
+        return np.zeros(len(positions), dtype=bool)
+    return np.array([position >= 0 and not genres.isdisjoint(str(catalog.genres[position]).split('|'))
+                     for position in positions], dtype=bool)
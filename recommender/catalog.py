@@ -0,0 +1,91 @@
+# recommender/catalog.py
+
+import numpy as np
+
+
+class MovieCatalog:
+    """
+    Array-backed movieId lookup table for titles, genres and external ids.
+
+    A dense position table indexed by movieId maps every id to its row in
+    the attribute arrays, so looking up one id is O(1) and a whole result
+    list is resolved with a single vectorized gather.
+
+    Attributes:
+    movie_ids (numpy.ndarray): The movieIds in the catalogue (int32).
+    titles (numpy.ndarray): Title of every movie (object array of str).
+    genres (numpy.ndarray or None): Pipe-separated genres of every movie.
+    imdb_ids (numpy.ndarray or None): IMDb id of every movie, -1 when unknown (int32).
+    tmdb_ids (numpy.ndarray or None): TMDb id of every movie, -1 when unknown (int32).
+    """
+
+    def __init__(self, movie_ids, titles, genres=None, imdb_ids=None, tmdb_ids=None):
+        self.movie_ids = np.asarray(movie_ids, dtype=np.int32)
+        self.titles = np.asarray(titles, dtype=object)
+        self.genres = None if genres is None else np.asarray(genres, dtype=object)
+        self.imdb_ids = None if imdb_ids is None else np.asarray(imdb_ids, dtype=np.int32)
+        self.tmdb_ids = None if tmdb_ids is None else np.asarray(tmdb_ids, dtype=np.int32)
+
+        size = int(self.movie_ids.max()) + 1 if len(self.movie_ids) else 0
+        self._positions = np.full(size, -1, dtype=np.int32)
+        self._positions[self.movie_ids] = np.arange(len(self.movie_ids), dtype=np.int32)
+
+    @classmethod
+    def from_frames(cls, movies, links=None):
+        """
+        Build the catalogue from the movies.csv DataFrame and, optionally, the links.csv DataFrame.
+        """
+        movie_ids = movies['movieId'].to_numpy()
+        genres = movies['genres'].to_numpy() if 'genres' in movies else None
+
+        imdb_ids = tmdb_ids = None
+        if links is not None:
+            links = links.set_index('movieId').reindex(movie_ids)
+            imdb_ids = links['imdbId'].fillna(-1).to_numpy(dtype=np.int64)
+            tmdb_ids = links['tmdbId'].fillna(-1).to_numpy(dtype=np.int64)
+
+        return cls(movie_ids, movies['title'].to_numpy(), genres, imdb_ids, tmdb_ids)
+
+    def __len__(self):
+        return len(self.movie_ids)
+
+    def __contains__(self, movie_id):
+        return 0 <= movie_id < len(self._positions) and self._positions[movie_id] >= 0
+
+    def positions(self, movie_ids):
+        """
+        Map movieIds to rows of the attribute arrays. Unknown ids map to -1.
+        """
+        movie_ids = np.asarray(movie_ids, dtype=np.int64)
+        inside = (movie_ids >= 0) & (movie_ids < len(self._positions))
+        positions = np.full(movie_ids.shape, -1, dtype=np.int32)
+        positions[inside] = self._positions[movie_ids[inside]]
+        return positions
+
+    def title(self, movie_id):
+        """Return the title of a movie, raising KeyError if the id is unknown."""
+        if movie_id not in self:
+            raise KeyError(movie_id)
+        return self.titles[self._positions[movie_id]]
+
+    def titles_for(self, movie_ids):
+        """
+        Return the titles of several movies, in order, skipping unknown ids.
+        """
+        positions = self.positions(movie_ids)
+        return self.titles[positions[positions >= 0]].tolist()
+
+    def records_for(self, movie_ids):
+        """
+        Return a dict per known movie with its id, title and, when loaded,
+        its genres and IMDb/TMDb ids.
+        """
+        positions = self.positions(movie_ids)
+        positions = positions[positions >= 0]
+        columns = {'movieId': self.movie_ids[positions].tolist(), 'title': self.titles[positions].tolist()}
+        if self.genres is not None:
+            columns['genres'] = self.genres[positions].tolist()
+        if self.imdb_ids is not None:
+            columns['imdbId'] = self.imdb_ids[positions].tolist()
+            columns['tmdbId'] = self.tmdb_ids[positions].tolist()
+        return [dict(zip(columns, values)) for values in zip(*columns.values())]
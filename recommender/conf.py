@@ -0,0 +1,32 @@
+# recommender/conf.py
+
+import os
+
+from django.conf import ENVIRONMENT_VARIABLE, settings
+
+
+def settings_available():
+    """
+    Return True when Django settings are configured or can be loaded on first access.
+    """
+    return settings.configured or bool(os.environ.get(ENVIRONMENT_VARIABLE))
+
+
+def get_setting(name, default=None):
+    """
+    Read a recommender setting from the Django settings.
+
+    recommendations.py is also used outside of Django (scripts, notebooks,
+    the test helpers), so when no settings module is available the default
+    is returned instead of raising ImproperlyConfigured.
+
+    Parameters:
+    name (str): The name of the setting.
+    default (optional): The value returned when the setting is not defined.
+
+    Returns:
+    The value of the setting, or default.
+    """
+    if not settings_available():
+        return default
+    return getattr(settings, name, default)
@@ -0,0 +1,178 @@
+# recommender/content.py
+
+import hashlib
+import os
+
+import numpy as np
+import pandas as pd
+
+from recommender.popularity import NO_GENRES
+
+TAGS_FILE = 'tags.csv'
+
+
+class ContentFeatures:
+    """
+    Sparse TF-IDF vectors of the movies' genres and tags.
+
+    Every movie is a row of a CSR matrix over the features 'genre:<name>'
+    and 'tag:<name>', L2-normalized, so the dot product of two rows is their
+    cosine similarity. A user's profile is the sum of the rows of the movies
+    they rated, weighted by how much they liked each one, and scoring the
+    whole catalogue against it is one sparse matrix-vector product.
+
+    Attributes:
+    movie_ids (numpy.ndarray): The movieIds of the rows (int32), in catalogue order.
+    feature_names (numpy.ndarray): Name of every feature (object array of str).
+    indptr (numpy.ndarray): CSR row pointers (int64, movies + 1).
+    indices (numpy.ndarray): Feature index of every entry (int32).
+    data (numpy.ndarray): TF-IDF weight of every entry (float32).
+    """
+
+    def __init__(self, movie_ids, feature_names, indptr, indices, data):
+        self.movie_ids = movie_ids
+        self.feature_names = feature_names
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self._rows = np.repeat(np.arange(len(movie_ids)), np.diff(indptr))
+        self._order = np.argsort(movie_ids, kind='stable')
+
+    @property
+    def shape(self):
+        return len(self.movie_ids), len(self.feature_names)
+
+    def positions(self, movie_ids):
+        """
+        Map movieIds to rows. Unknown ids map to -1.
+        """
+        movie_ids = np.asarray(movie_ids)
+        if not len(self._order):
+            return np.full(len(movie_ids), -1, dtype=np.int64)
+        found = np.minimum(np.searchsorted(self.movie_ids, movie_ids, sorter=self._order), len(self._order) - 1)
+        rows = self._order[found]
+        return np.where(self.movie_ids[rows] == movie_ids, rows, -1)
+
+    def profile(self, positions, weights):
+        """
+        Return the unit-length weighted sum of some rows.
+
+        Parameters:
+        positions (numpy.ndarray): Rows of the movies, as positions into movie_ids.
+        weights (numpy.ndarray): Weight of every row, e.g. the user's mean-centered ratings.
+
+        Returns:
+        numpy.ndarray: A dense vector over the features; zero when the rows have no features.
+        """
+        positions = np.asarray(positions, dtype=np.int64)
+        lengths = self.indptr[positions + 1] - self.indptr[positions]
+        owner = np.repeat(np.arange(len(positions)), lengths)
+        entries = np.repeat(self.indptr[positions], lengths) + (
+            np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths))
+
+        vector = np.bincount(self.indices[entries], weights=self.data[entries] * np.asarray(weights)[owner],
+                             minlength=self.shape[1])
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def scores(self, profile):
+        """
+        Return the cosine similarity of every movie to a unit-length profile.
+        """
+        return np.bincount(self._rows, weights=self.data * profile[self.indices], minlength=self.shape[0])
+
+
+def build_content_features(catalog, tags=None, min_tag_movies=2):
+    """
+    Build the TF-IDF vectors of the movies of a catalogue.
+
+    The term frequency of a genre is 1 and that of a tag 1 + log(number of
+    times it was applied to the movie); tags are lowercased, and tags
+    applied to fewer than min_tag_movies movies are dropped since they
+    cannot relate two movies. The inverse document frequency is
+    log(movies / movies with the feature).
+
+    Parameters:
+    catalog (MovieCatalog): The movies, with their genres when loaded.
+    tags (pandas.DataFrame, optional): tags.csv, with movieId and tag columns.
+    min_tag_movies (int, optional): Minimum number of movies of a tag. Defaults to 2.
+
+    Returns:
+    ContentFeatures: The feature matrix.
+    """
+    positions, names, frequencies = [], [], []
+    if catalog.genres is not None:
+        for position, genres in enumerate(catalog.genres):
+            for genre in str(genres).split('|'):
+                if genre and genre != NO_GENRES:
+                    positions.append(position)
+                    names.append(f'genre:{genre}')
+                    frequencies.append(1.0)
+
+    if tags is not None and len(tags):
+        tag_positions = catalog.positions(tags['movieId'].to_numpy())
+        applied = pd.DataFrame({
+            'position': tag_positions,
+            'name': 'tag:' + tags['tag'].astype(str).str.strip().str.lower(),
+        })[tag_positions >= 0]
+        counts = applied.groupby(['position', 'name']).size().reset_index(name='count')
+        movies_per_tag = counts.groupby('name')['position'].transform('size')
+        counts = counts[movies_per_tag >= min_tag_movies]
+        positions.extend(counts['position'].tolist())
+        names.extend(counts['name'].tolist())
+        frequencies.extend((1.0 + np.log(counts['count'].to_numpy())).tolist())
+
+    feature_names, indices = np.unique(np.array(names, dtype=object), return_inverse=True)
+    positions = np.asarray(positions, dtype=np.int64)
+    frequencies = np.asarray(frequencies)
+
+    n_movies = len(catalog)
+    document_frequency = np.bincount(indices, minlength=len(feature_names))
+    weights = frequencies * np.log(n_movies / np.maximum(document_frequency, 1))[indices]
+
+    order = np.lexsort((indices, positions))
+    positions, indices, weights = positions[order], indices[order], weights[order]
+    norms = np.sqrt(np.bincount(positions, weights=weights ** 2, minlength=n_movies))
+    # A movie whose only features appear in every movie has an all-zero row
+    weights = weights / np.where(norms > 0, norms, 1.0)[positions]
+
+    indptr = np.zeros(n_movies + 1, dtype=np.int64)
+    np.cumsum(np.bincount(positions, minlength=n_movies), out=indptr[1:])
+    return ContentFeatures(catalog.movie_ids, feature_names, indptr, indices.astype(np.int32),
+                           weights.astype(np.float32))
+
+
+def read_tags(directory):
+    """
+    Read the movieId and tag columns of a dataset's tags.csv, or return None if it has none.
+    """
+    path = os.path.join(directory, TAGS_FILE)
+    if not os.path.exists(path):
+        return None
+    return pd.read_csv(path, usecols=['movieId', 'tag'], dtype={'movieId': np.int32, 'tag': str},
+                       keep_default_na=False)
+
+
+def content_hash(movies, tags=None):
+    """
+    Return a fingerprint of what the content features are built from.
+
+    It covers the movieIds and genres of movies.csv and the movieId and tag
+    columns of tags.csv, and nothing about the ratings, so new ratings do not
+    make a hybrid model stale.
+
+    Parameters:
+    movies (pandas.DataFrame): movies.csv.
+    tags (pandas.DataFrame, optional): tags.csv, see read_tags.
+
+    Returns:
+    str: A SHA-256 hex digest.
+    """
+    digest = hashlib.sha256()
+    digest.update(movies['movieId'].to_numpy(dtype=np.int64).tobytes())
+    digest.update('\n'.join(movies['genres'].astype(str)).encode('utf-8'))
+    if tags is not None:
+        digest.update(b'\0tags')
+        digest.update(tags['movieId'].to_numpy(dtype=np.int64).tobytes())
+        digest.update('\n'.join(tags['tag'].astype(str)).encode('utf-8'))
+    return digest.hexdigest()
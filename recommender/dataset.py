@@ -0,0 +1,304 @@
+# recommender/dataset.py
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from recommender.catalog import MovieCatalog
+from recommender.rating_matrix import RatingMatrix
+
+MOVIES_FILE = 'movies.csv'
+RATINGS_FILE = 'ratings.csv'
+LINKS_FILE = 'links.csv'
+CACHE_FILE = 'movielens.npz'
+
+
+class MovieLensDataset:
+    """
+    A MovieLens dataset with the structures the recommenders are built on.
+
+    Attributes:
+    movies (pandas.DataFrame): movies.csv.
+    ratings (pandas.DataFrame or None): ratings.csv, or None when the ratings
+                                        were streamed straight into the matrix.
+    links (pandas.DataFrame or None): links.csv, when present.
+    catalog (MovieCatalog): movieId to title/genres/links lookup table.
+    matrix (RatingMatrix): The sparse user-movie rating matrix.
+    rating_event_id (int): Id of the last RatingEvent applied to the matrix (0 for none).
+    source (str or None): Identifies the files the dataset was loaded from (see load), or
+                          None for a dataset built in memory.
+    """
+
+    def __init__(self, movies, ratings, links=None, matrix=None):
+        self.movies = movies
+        self.ratings = ratings
+        self.links = links
+        self.catalog = MovieCatalog.from_frames(movies, links)
+        self.matrix = matrix if matrix is not None else RatingMatrix.from_frame(ratings)
+        self.rating_event_id = 0
+        self.source = None
+
+    @classmethod
+    def from_csv(cls, directory, chunk_size=None):
+        """
+        Read movies.csv, ratings.csv and, if it exists, links.csv from a MovieLens directory.
+
+        With a chunk_size, ratings.csv is streamed into the rating matrix
+        chunk_size rows at a time (see read_rating_matrix) and no ratings
+        DataFrame is kept, which is what makes the larger MovieLens dumps fit
+        in memory.
+        """
+        movies = pd.read_csv(os.path.join(directory, MOVIES_FILE))
+        links_path = os.path.join(directory, LINKS_FILE)
+        links = pd.read_csv(links_path) if os.path.exists(links_path) else None
+        if chunk_size:
+            matrix = read_rating_matrix(os.path.join(directory, RATINGS_FILE), chunk_size)
+            return cls(movies, None, links, matrix=matrix)
+        ratings = pd.read_csv(os.path.join(directory, RATINGS_FILE),
+                              dtype={'userId': np.int32, 'movieId': np.int32, 'rating': np.float32})
+        return cls(movies, ratings, links)
+
+    @classmethod
+    def from_cache(cls, path):
+        """
+        Read a dataset written by save_cache.
+        """
+        with np.load(path, allow_pickle=False) as arrays:
+            ratings = pd.DataFrame({
+                'userId': arrays['ratings_user_id'],
+                'movieId': arrays['ratings_movie_id'],
+                'rating': arrays['ratings_rating'],
+            })
+            if 'ratings_timestamp' in arrays:
+                ratings['timestamp'] = arrays['ratings_timestamp']
+            movies, links = decode_movie_arrays(arrays)
+        return cls(movies, ratings, links)
+
+    @classmethod
+    def load(cls, directory, cache_path=None, chunk_size=None):
+        """
+        Load a MovieLens directory, from its binary cache when it is up to date.
+
+        The cache (movielens.npz in the directory unless cache_path is given)
+        is used only if it is newer than every CSV file; otherwise the CSV
+        files are parsed, in chunks of chunk_size ratings if it is given.
+        Run `manage.py ingest_movielens` to (re)build the cache. The dataset's
+        source records the name, modification time and size of the files read.
+        """
+        cache_path = cache_path or os.path.join(directory, CACHE_FILE)
+        if cache_is_fresh(directory, cache_path):
+            dataset = cls.from_cache(cache_path)
+            paths = [cache_path]
+        else:
+            dataset = cls.from_csv(directory, chunk_size=chunk_size)
+            paths = [os.path.join(directory, name) for name in (MOVIES_FILE, RATINGS_FILE, LINKS_FILE)]
+        dataset.source = _file_token(path for path in paths if os.path.exists(path))
+        return dataset
+
+    def save_cache(self, path):
+        """
+        Write the dataset as a compact .npz file: int32 ids, float32 ratings,
+        UTF-8 titles and genres stored as categorical codes. The ratings are
+        always written from the rating matrix, so those added with add_rating
+        are kept. Timestamps are written when the ratings DataFrame has them
+        and no rating was added since it was loaded.
+
+        Returns:
+        int: The size of the written file in bytes.
+        """
+        arrays = encode_movie_arrays(self.movies, self.links)
+        rows, cols, ratings = self.matrix.gather_rows(np.arange(self.matrix.shape[0]))
+        user_ids, movie_ids = self.matrix.user_ids[rows], self.matrix.movie_ids[cols]
+        arrays.update({
+            'ratings_user_id': user_ids.astype(np.int32),
+            'ratings_movie_id': movie_ids.astype(np.int32),
+            'ratings_rating': ratings.astype(np.float32),
+        })
+        if self.ratings is not None and 'timestamp' in self.ratings and self.matrix.revision == 0:
+            timestamps = pd.DataFrame({'userId': user_ids, 'movieId': movie_ids}).merge(
+                self.ratings[['userId', 'movieId', 'timestamp']].drop_duplicates(['userId', 'movieId'], keep='last'),
+                how='left', on=['userId', 'movieId'])['timestamp']
+            if timestamps.notna().all():
+                arrays['ratings_timestamp'] = timestamps.to_numpy(dtype=np.int64)
+
+        # np.savez appends .npz to names without it, so keep the suffix on the temporary file
+        temporary = f'{path}.tmp-{os.getpid()}.npz'
+        np.savez(temporary, **arrays)
+        os.replace(temporary, path)
+        return os.path.getsize(path)
+
+
+def read_rating_matrix(path, chunk_size=1_000_000, dtype=np.float32):
+    """
+    Stream a ratings CSV file into a RatingMatrix, chunk_size rows at a time.
+
+    The file is read as a pipeline of generators: iter_rating_chunks parses
+    one chunk of (userId, movieId, rating) columns, the ids are mapped to
+    dense positions on the fly, and the positions and ratings are copied into
+    preallocated buffers sized from a line count of the file. Peak memory
+    is one parsed chunk plus the final int32/float32 coordinate arrays (and
+    the sort done by the RatingMatrix constructor), instead of a DataFrame
+    of the whole file.
+
+    The file must hold at most one rating per (userId, movieId) pair, as
+    the MovieLens dumps do.
+
+    Parameters:
+    path (str): Path of ratings.csv.
+    chunk_size (int, optional): Number of rows parsed at once. Defaults to 1,000,000.
+    dtype (numpy.dtype, optional): Storage dtype of the ratings. Defaults to float32.
+
+    Returns:
+    RatingMatrix: The rating matrix.
+    """
+    capacity = _count_lines(path)
+    rows = np.empty(capacity, dtype=np.int32)
+    cols = np.empty(capacity, dtype=np.int32)
+    values = np.empty(capacity, dtype=dtype)
+    users, movies = _DenseIds(), _DenseIds()
+
+    size = 0
+    for user_ids, movie_ids, ratings in iter_rating_chunks(path, chunk_size):
+        end = size + len(ratings)
+        rows[size:end] = users.positions(user_ids)
+        cols[size:end] = movies.positions(movie_ids)
+        values[size:end] = ratings
+        size = end
+
+    # Positions were handed out in order of appearance; RatingMatrix wants sorted ids
+    user_ids, user_ranks = users.sorted()
+    movie_ids, movie_ranks = movies.sorted()
+    rows, cols, values = rows[:size], cols[:size], values[:size]
+    np.take(user_ranks, rows, out=rows)
+    np.take(movie_ranks, cols, out=cols)
+    return RatingMatrix(user_ids, movie_ids, rows, cols, values, dtype=dtype)
+
+
+def iter_rating_chunks(path, chunk_size):
+    """
+    Yield the (userId, movieId, rating) columns of a ratings CSV file as NumPy arrays, chunk by chunk.
+    """
+    reader = pd.read_csv(path, usecols=['userId', 'movieId', 'rating'], chunksize=chunk_size,
+                         dtype={'userId': np.int32, 'movieId': np.int32, 'rating': np.float32})
+    with reader:
+        for chunk in reader:
+            yield chunk['userId'].to_numpy(), chunk['movieId'].to_numpy(), chunk['rating'].to_numpy()
+
+
+class _DenseIds:
+    # Maps ids to dense positions, handing out a new position to every unseen id
+
+    def __init__(self):
+        self.table = np.full(0, -1, dtype=np.int32)
+        self.count = 0
+
+    def positions(self, ids):
+        if len(ids) and ids.max() >= len(self.table):
+            grown = np.full(max(int(ids.max()) + 1, 2 * len(self.table)), -1, dtype=np.int32)
+            grown[:len(self.table)] = self.table
+            self.table = grown
+        new = np.unique(ids[self.table[ids] < 0])
+        self.table[new] = np.arange(self.count, self.count + len(new), dtype=np.int32)
+        self.count += len(new)
+        return self.table[ids]
+
+    def sorted(self):
+        ids = np.flatnonzero(self.table >= 0).astype(np.int32)
+        ranks = np.empty(self.count, dtype=np.int32)
+        ranks[self.table[ids]] = np.arange(len(ids), dtype=np.int32)
+        return ids, ranks
+
+
+def _count_lines(path, block_size=2 ** 20):
+    with open(path, 'rb') as file:
+        return sum(block.count(b'\n') for block in iter(lambda: file.read(block_size), b''))
+
+
+def cache_is_fresh(directory, cache_path):
+    """
+    Return True if the binary cache exists and is newer than every CSV file of the dataset.
+    """
+    if not os.path.exists(cache_path):
+        return False
+    cache_mtime = os.path.getmtime(cache_path)
+    for name in (MOVIES_FILE, RATINGS_FILE, LINKS_FILE):
+        path = os.path.join(directory, name)
+        if os.path.exists(path) and os.path.getmtime(path) >= cache_mtime:
+            return False
+    return True
+
+
+def encode_movie_arrays(movies, links=None):
+    """
+    Encode movies.csv and links.csv as plain arrays: int32 ids, UTF-8 titles
+    with their offsets, and genres as categorical codes; a missing tmdbId is
+    stored as -1.
+
+    Returns:
+    dict: The arrays by name, as written by save_cache and shared.publish_dataset.
+    """
+    title_data, title_offsets = _encode_strings(movies['title'])
+    genres = pd.Categorical(movies['genres'])
+    genre_data, genre_offsets = _encode_strings(genres.categories)
+    arrays = {
+        'movies_movie_id': movies['movieId'].to_numpy(dtype=np.int32),
+        'movies_title_data': title_data,
+        'movies_title_offsets': title_offsets,
+        'movies_genre_codes': genres.codes.astype(np.int16 if len(genres.categories) < 2 ** 15 else np.int32),
+        'genre_data': genre_data,
+        'genre_offsets': genre_offsets,
+    }
+    if links is not None:
+        arrays.update({
+            'links_movie_id': links['movieId'].to_numpy(dtype=np.int32),
+            'links_imdb_id': links['imdbId'].to_numpy(dtype=np.int32),
+            'links_tmdb_id': links['tmdbId'].fillna(-1).to_numpy(dtype=np.int32),
+        })
+    return arrays
+
+
+def decode_movie_arrays(arrays):
+    """
+    Rebuild the movies and links DataFrames from arrays written by encode_movie_arrays.
+
+    Parameters:
+    arrays (mapping): The arrays by name, e.g. an open .npz file; they are copied into the process.
+
+    Returns:
+    tuple: (movies, links); links is None if it was not encoded.
+    """
+    movies = pd.DataFrame({
+        'movieId': np.array(arrays['movies_movie_id']),
+        'title': _decode_strings(arrays['movies_title_data'], arrays['movies_title_offsets']),
+        'genres': pd.Categorical.from_codes(np.array(arrays['movies_genre_codes']),
+                                            _decode_strings(arrays['genre_data'], arrays['genre_offsets'])),
+    })
+    links = None
+    if 'links_movie_id' in arrays:
+        links = pd.DataFrame({
+            'movieId': np.array(arrays['links_movie_id']),
+            'imdbId': np.array(arrays['links_imdb_id']),
+            'tmdbId': pd.Series(np.array(arrays['links_tmdb_id'])).replace(-1, np.nan),
+        })
+    return movies, links
+
+
+def _file_token(paths):
+    parts = []
+    for path in paths:
+        stat = os.stat(path)
+        parts.append(f'{os.path.basename(path)}:{stat.st_mtime_ns:x}-{stat.st_size:x}')
+    return '|'.join(parts)
+
+
+def _encode_strings(strings):
+    encoded = [string.encode('utf-8') for string in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(string) for string in encoded], out=offsets[1:])
+    return np.frombuffer(b''.join(encoded), dtype=np.uint8), offsets
+
+
+def _decode_strings(data, offsets):
+    buffer = data.tobytes()
+    return [buffer[start:end].decode('utf-8') for start, end in zip(offsets[:-1].tolist(), offsets[1:].tolist())]
@@ -0,0 +1,50 @@
+# recommender/events.py
+
+import logging
+
+from django.db import DatabaseError
+
+from recommender.conf import settings_available
+
+logger = logging.getLogger(__name__)
+
+
+def store_rating_events(events):
+    """
+    Append ratings to the RatingEvent log.
+
+    Parameters:
+    events (list): (user_id, movie_id, rating) tuples, already validated.
+
+    Returns:
+    bool: True if the events were stored, False when Django is not configured
+          (scripts and notebooks), in which case the ratings are only kept in memory.
+    """
+    if not settings_available():
+        return False
+    from recommender.models import RatingEvent
+
+    RatingEvent.objects.bulk_create([RatingEvent(user_id=user_id, movie_id=movie_id, rating=rating)
+                                     for user_id, movie_id, rating in events])
+    return True
+
+
+def read_rating_events(after_id=0):
+    """
+    Return the logged ratings with an id above after_id, in id order.
+
+    Returns:
+    list: (id, user_id, movie_id, rating) tuples; empty when Django is not
+          configured or the log cannot be read.
+    """
+    if not settings_available():
+        return []
+    from recommender.models import RatingEvent
+
+    try:
+        return list(RatingEvent.objects.filter(id__gt=after_id).order_by('id')
+                    .values_list('id', 'user_id', 'movie_id', 'rating'))
+    except DatabaseError:
+        # e.g. the migrations have not been applied; serve the ratings loaded so far
+        logger.warning("Could not read the rating events", exc_info=True)
+        return []
@@ -0,0 +1,106 @@
+# recommender/executor.py
+
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.db import close_old_connections
+
+from recommender.conf import get_setting
+
+
+class ExecutorBusy(Exception):
+    """Raised when a BoundedExecutor has no free slot for a new task."""
+
+
+class BoundedExecutor:
+    """
+    A thread pool with a bounded queue.
+
+    At most max_workers tasks run at the same time and at most max_queue more
+    wait for a worker; submitting beyond that raises ExecutorBusy instead of
+    queueing without limit, so a burst of requests is turned away early
+    rather than making every queued request slow. A task keeps its slot until
+    it finishes, even if the caller stopped waiting for it.
+
+    The scoring code spends most of its time in NumPy, which releases the GIL
+    in its inner loops, and threads share the loaded dataset, so a thread pool
+    is used rather than a process pool. Tasks may use the ORM: as Django does
+    around a request, stale or broken database connections of the worker
+    thread are closed before and after each task.
+
+    Parameters:
+    max_workers (int): Number of worker threads.
+    max_queue (int): Number of tasks allowed to wait for a worker.
+    """
+
+    def __init__(self, max_workers, max_queue):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._slots = threading.BoundedSemaphore(max_workers + max_queue)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='recommender')
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Schedule fn(*args, **kwargs) and return its concurrent.futures.Future.
+
+        Raises:
+        ExecutorBusy: If all workers are busy and the queue is full.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise ExecutorBusy()
+        try:
+            future = self._executor.submit(_with_fresh_connections, fn, *args, **kwargs)
+        except BaseException:
+            self._slots.release()
+            raise
+        future.add_done_callback(lambda _: self._slots.release())
+        return future
+
+    async def run(self, fn, *args, timeout=None, **kwargs):
+        """
+        Run fn(*args, **kwargs) in the pool and await its result.
+
+        Parameters:
+        fn (callable): The function to run.
+        timeout (float, optional): Seconds to wait for the result before raising
+                                   asyncio.TimeoutError. A task still waiting in the
+                                   queue is then cancelled; a running one runs to completion.
+
+        Raises:
+        ExecutorBusy: If all workers are busy and the queue is full.
+        asyncio.TimeoutError: If the result is not ready within timeout seconds.
+        """
+        future = asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+        return await asyncio.wait_for(future, timeout)
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
+
+
+def _with_fresh_connections(fn, *args, **kwargs):
+    close_old_connections()
+    try:
+        return fn(*args, **kwargs)
+    finally:
+        close_old_connections()
+
+
+def get_executor():
+    """
+    Return the process-wide executor of the async views, creating it on first use.
+
+    Its size is read from the RECOMMENDER_EXECUTOR_WORKERS and
+    RECOMMENDER_EXECUTOR_QUEUE settings.
+    """
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = BoundedExecutor(get_setting('RECOMMENDER_EXECUTOR_WORKERS', 4),
+                                            get_setting('RECOMMENDER_EXECUTOR_QUEUE', 16))
+    return _executor
+
+
+_executor = None
+_executor_lock = threading.Lock()
@@ -0,0 +1,233 @@
+# recommender/factorization.py
+
+import numpy as np
+
+from recommender.artifacts import load_artifact, save_artifact
+
+FACTOR_MODEL_ARRAYS = ('user_ids', 'movie_ids', 'user_factors', 'item_factors', 'user_bias', 'item_bias')
+FACTOR_MODEL_KIND = 'mf'
+# Bump when the arrays written by FactorModel.save change
+FACTOR_MODEL_SCHEMA = 1
+
+
+class FactorModel:
+    """
+    A biased latent-factor model of the ratings.
+
+    A rating is predicted as global_mean + user_bias[u] + item_bias[i] +
+    user_factors[u] . item_factors[i], so ranking the whole catalogue for a
+    user is a single (movies x k) matrix-vector product.
+
+    Attributes:
+    user_ids (numpy.ndarray): userIds of the factor rows (int32, sorted).
+    movie_ids (numpy.ndarray): movieIds of the factor rows (int32, sorted).
+    user_factors (numpy.ndarray): User factors (float32, users x k).
+    item_factors (numpy.ndarray): Movie factors (float32, movies x k).
+    user_bias (numpy.ndarray): User biases (float32).
+    item_bias (numpy.ndarray): Movie biases (float32).
+    global_mean (float): Mean of the training ratings.
+    regularization (float): The L2 penalty the model was trained with, reused by fold_in.
+    """
+
+    def __init__(self, user_ids, movie_ids, user_factors, item_factors, user_bias, item_bias, global_mean,
+                 regularization):
+        self.user_ids = user_ids
+        self.movie_ids = movie_ids
+        self.user_factors = user_factors
+        self.item_factors = item_factors
+        self.user_bias = user_bias
+        self.item_bias = item_bias
+        self.global_mean = float(global_mean)
+        self.regularization = float(regularization)
+
+    @property
+    def k(self):
+        return self.item_factors.shape[1]
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Open a model written by save, memory-mapped read-only by default.
+
+        Raises:
+        ArtifactError: If the directory is not a factor model of the current schema version.
+        """
+        _, arrays = load_artifact(directory, FACTOR_MODEL_KIND, FACTOR_MODEL_SCHEMA, mmap_mode)
+        return cls(**{name: arrays[name] for name in FACTOR_MODEL_ARRAYS},
+                   global_mean=arrays['global_mean'][()], regularization=arrays['regularization'][()])
+
+    def save(self, directory, dataset_hash=None, metadata=None):
+        """
+        Write the model as an artifact directory (see recommender.artifacts.save_artifact).
+
+        Parameters:
+        directory (str): Directory of the model, replaced if it exists.
+        dataset_hash (str, optional): Fingerprint of the training ratings, see matrix_hash.
+        metadata (dict, optional): Training parameters recorded in the manifest.
+
+        Returns:
+        int: The total size of the written files in bytes.
+        """
+        arrays = {name: getattr(self, name) for name in FACTOR_MODEL_ARRAYS}
+        arrays['global_mean'] = np.float64(self.global_mean)
+        arrays['regularization'] = np.float64(self.regularization)
+        return save_artifact(directory, FACTOR_MODEL_KIND, FACTOR_MODEL_SCHEMA, arrays, dataset_hash, metadata)
+
+    def user_vector(self, user_id, movie_ids=None, ratings=None):
+        """
+        Return a user's (factors, bias).
+
+        Users seen in training use their trained factors. Other users, e.g.
+        ones who only rated through the ingestion API, are folded in from
+        the given ratings: their factors are solved against the fixed movie
+        factors, as one step of ALS would.
+        """
+        position = np.searchsorted(self.user_ids, user_id)
+        if position < len(self.user_ids) and self.user_ids[position] == user_id:
+            return self.user_factors[position], self.user_bias[position]
+        return self.fold_in(movie_ids, ratings)
+
+    def fold_in(self, movie_ids, ratings):
+        """
+        Solve the factors and bias of a user from their ratings, with the movie factors fixed.
+
+        Returns:
+        tuple: (factors, bias). A user without known movies gets zeros.
+        """
+        if movie_ids is None or len(movie_ids) == 0:
+            return np.zeros(self.k, dtype=np.float32), np.float32(0.0)
+        positions = np.searchsorted(self.movie_ids, movie_ids)
+        positions = np.minimum(positions, len(self.movie_ids) - 1)
+        known = self.movie_ids[positions] == movie_ids
+        positions = positions[known]
+        residuals = np.asarray(ratings, dtype=np.float64)[known] - self.global_mean - self.item_bias[positions]
+        if len(positions) == 0:
+            return np.zeros(self.k, dtype=np.float32), np.float32(0.0)
+
+        bias = residuals.sum() / (len(residuals) + self.regularization)
+        factors = self.item_factors[positions].astype(np.float64)
+        gram = factors.T @ factors + self.regularization * len(positions) * np.eye(self.k)
+        solution = np.linalg.solve(gram, factors.T @ (residuals - bias))
+        return solution.astype(np.float32), np.float32(bias)
+
+    def score_user(self, factors):
+        """
+        Score every movie for a user: item_bias + item_factors @ factors.
+
+        The global mean and the user's bias are the same for every movie, so
+        they are left out of the ranking score.
+        """
+        return self.item_bias + self.item_factors @ factors
+
+
+def train_factor_model(matrix, k=32, iterations=15, regularization=0.2, seed=0, block_size=1024):
+    """
+    Fit a FactorModel to a RatingMatrix with alternating least squares.
+
+    The biases are first fitted as regularized means (global mean, then
+    movie and user deviations from it), and the factors are then fitted to
+    the remaining residuals by ALS: with the movie factors fixed, every
+    user's factors are the solution of a k x k ridge regression on the
+    movies they rated, and vice versa. The regularization is weighted by
+    the number of ratings of each user or movie. The normal equations of a
+    block of users (or movies) are assembled from the CSR (or CSC) arrays
+    and solved together with one batched np.linalg.solve call.
+
+    Parameters:
+    matrix (RatingMatrix): The ratings.
+    k (int, optional): Number of latent factors. Defaults to 32.
+    iterations (int, optional): Number of ALS sweeps. Defaults to 15.
+    regularization (float, optional): L2 penalty. Defaults to 0.2.
+    seed (int, optional): Seed of the initial factors. Defaults to 0.
+    block_size (int, optional): Number of users or movies solved at once. Defaults to 1024.
+
+    Returns:
+    FactorModel: The trained model.
+    """
+    matrix = matrix.compacted()
+    n_users, n_movies = matrix.shape
+    rows = np.repeat(np.arange(n_users), matrix.user_counts)
+    ratings = matrix.data.astype(np.float64)
+
+    global_mean = ratings.mean() if len(ratings) else 0.0
+    item_bias = (np.bincount(matrix.indices, weights=ratings - global_mean, minlength=n_movies)
+                 / (matrix.movie_counts + regularization * 10))
+    user_bias = (np.bincount(rows, weights=ratings - global_mean - item_bias[matrix.indices], minlength=n_users)
+                 / (matrix.user_counts + regularization * 10))
+    residuals = ratings - global_mean - user_bias[rows] - item_bias[matrix.indices]
+
+    # The same residuals in CSC order, for the movie half-steps
+    csc_order = np.lexsort((rows, matrix.indices))
+    csc_residuals = residuals[csc_order]
+
+    # The first half-step solves the user factors, so only the movie factors need a random start;
+    # with iterations=0 the model predicts with the biases alone
+    rng = np.random.default_rng(seed)
+    user_factors = np.zeros((n_users, k))
+    item_factors = rng.normal(0, 0.1, (n_movies, k))
+
+    for _ in range(iterations):
+        user_factors = _solve_factors(matrix.indptr, matrix.indices, residuals, item_factors,
+                                      regularization, block_size)
+        item_factors = _solve_factors(matrix.csc_indptr, matrix.csc_indices, csc_residuals, user_factors,
+                                      regularization, block_size)
+
+    # Ratings ingested after the matrix was built append their ids unsorted; the model looks ids up by bisection
+    users = np.argsort(matrix.user_ids, kind='stable')
+    movies = np.argsort(matrix.movie_ids, kind='stable')
+    return FactorModel(matrix.user_ids[users], matrix.movie_ids[movies], user_factors[users].astype(np.float32),
+                       item_factors[movies].astype(np.float32), user_bias[users].astype(np.float32),
+                       item_bias[movies].astype(np.float32), global_mean, regularization)
+
+
+def rmse(model, user_ids, movie_ids, ratings):
+    """
+    Root mean squared error of the model's predictions, with unknown users or movies predicted by the biases.
+    """
+    user_positions = np.searchsorted(model.user_ids, user_ids).clip(0, len(model.user_ids) - 1)
+    movie_positions = np.searchsorted(model.movie_ids, movie_ids).clip(0, len(model.movie_ids) - 1)
+    known_users = model.user_ids[user_positions] == user_ids
+    known_movies = model.movie_ids[movie_positions] == movie_ids
+
+    predictions = np.full(len(ratings), model.global_mean)
+    predictions += np.where(known_users, model.user_bias[user_positions], 0.0)
+    predictions += np.where(known_movies, model.item_bias[movie_positions], 0.0)
+    both = known_users & known_movies
+    predictions[both] += np.einsum('ij,ij->i', model.user_factors[user_positions[both]],
+                                   model.item_factors[movie_positions[both]])
+    return float(np.sqrt(np.mean((np.clip(predictions, 0.5, 5.0) - ratings) ** 2)))
+
+
+def _solve_factors(indptr, indices, values, fixed, regularization, block_size, max_entries=1 << 18):
+    # One ALS half-step: every row of the compressed matrix gets the ridge solution against the fixed factors.
+    # Rows are taken in order of their count and padded with zeros to the longest row of their block, so each
+    # block's normal equations are one batched matmul; a block holds at most max_entries padded ratings.
+    n_rows, k = len(indptr) - 1, fixed.shape[1]
+    counts = np.diff(indptr)
+    order = np.argsort(counts, kind='stable')
+    order = order[counts[order] > 0]
+    solved = np.zeros((n_rows, k), dtype=np.float32)
+    # The products run in float32, which halves their cost; the k x k systems are solved in float64
+    fixed = fixed.astype(np.float32)
+    values = values.astype(np.float32)
+    identity = np.eye(k)
+
+    start = 0
+    while start < len(order):
+        longest = counts[order[min(start + block_size, len(order)) - 1]]
+        end = start + int(np.clip(max_entries // longest, 1, block_size))
+        rows = order[start:end]
+        length = counts[rows[-1]]
+
+        offsets = np.arange(length)
+        mask = offsets < counts[rows][:, None]
+        positions = np.where(mask, indptr[rows][:, None] + offsets, 0)
+        factors = fixed[indices[positions]] * mask[:, :, None]
+        targets = np.where(mask, values[positions], np.float32(0))
+
+        transposed = factors.transpose(0, 2, 1)
+        gram = (transposed @ factors) + regularization * counts[rows][:, None, None] * identity
+        rhs = (transposed @ targets[:, :, None]).astype(np.float64)
+        solved[rows] = np.linalg.solve(gram, rhs)[:, :, 0]
+        start = end
+    return solved
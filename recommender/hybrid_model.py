@@ -0,0 +1,83 @@
+# recommender/hybrid_model.py
+
+import numpy as np
+
+from recommender.artifacts import load_artifact, save_artifact
+from recommender.content import ContentFeatures, build_content_features, content_hash
+from recommender.dataset import _decode_strings, _encode_strings
+
+HYBRID_MODEL_KIND = 'hybrid'
+# Bump when the arrays written by HybridModel.save change
+HYBRID_MODEL_SCHEMA = 1
+
+
+class HybridModel:
+    """
+    The learned state of the 'hybrid' engine.
+
+    The correlation part of the engine reads the rating matrix directly,
+    whose means and squared deviations are maintained as ratings arrive, so
+    the state worth building offline is the genre/tag TF-IDF model of
+    recommender.content: its inverse document frequencies come from the
+    whole catalogue and its tags from tags.csv.
+
+    Attributes:
+    content (ContentFeatures): The movies' TF-IDF vectors.
+    content_hash (str): Fingerprint of the movies and tags the model was built from (see
+                        recommender.content.content_hash), stored as the artifact's dataset hash.
+    built_at (str): UTC build time, in ISO 8601 format.
+    """
+
+    def __init__(self, content, content_hash, built_at=None):
+        self.content = content
+        self.content_hash = content_hash
+        self.built_at = built_at
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Open a model written by save, memory-mapped read-only by default.
+
+        Raises:
+        ArtifactError: If the directory is not a hybrid model of the current schema version.
+        """
+        manifest, arrays = load_artifact(directory, HYBRID_MODEL_KIND, HYBRID_MODEL_SCHEMA, mmap_mode)
+        feature_names = np.array(_decode_strings(arrays['feature_name_data'], arrays['feature_name_offsets']),
+                                 dtype=object)
+        content = ContentFeatures(arrays['movie_ids'], feature_names, arrays['indptr'], arrays['indices'],
+                                  arrays['data'])
+        return cls(content, manifest['dataset_hash'], manifest['built_at'])
+
+    def save(self, directory, metadata=None):
+        """
+        Write the model as an artifact directory (see recommender.artifacts.save_artifact).
+
+        Returns:
+        int: The total size of the written files in bytes.
+        """
+        name_data, name_offsets = _encode_strings(self.content.feature_names)
+        arrays = {
+            'movie_ids': self.content.movie_ids,
+            'feature_name_data': name_data,
+            'feature_name_offsets': name_offsets,
+            'indptr': self.content.indptr,
+            'indices': self.content.indices,
+            'data': self.content.data,
+        }
+        return save_artifact(directory, HYBRID_MODEL_KIND, HYBRID_MODEL_SCHEMA, arrays, self.content_hash, metadata)
+
+
+def build_hybrid_model(dataset, tags=None, min_tag_movies=2):
+    """
+    Build the hybrid model of a dataset.
+
+    Parameters:
+    dataset (MovieLensDataset): The dataset.
+    tags (pandas.DataFrame, optional): tags.csv, see recommender.content.read_tags.
+    min_tag_movies (int, optional): See build_content_features. Defaults to 2.
+
+    Returns:
+    HybridModel: The model.
+    """
+    content = build_content_features(dataset.catalog, tags, min_tag_movies)
+    return HybridModel(content, content_hash(dataset.movies, tags))
@@ -0,0 +1,273 @@
+# recommender/lsh.py
+
+import time
+
+import numpy as np
+
+from recommender.artifacts import load_artifact, save_artifact
+
+LSH_INDEX_FILES = ('user_ids', 'movie_ids', 'planes', 'keys', 'order')
+LSH_INDEX_KIND = 'lsh'
+# Bump when the arrays written by UserLSHIndex.save change
+LSH_INDEX_SCHEMA = 1
+
+
+class UserLSHIndex:
+    """
+    Random-hyperplane locality-sensitive hashing of users.
+
+    Every user is represented by the vector of their mean-centered ratings.
+    Each of n_tables hash tables projects it on bits random hyperplanes and
+    keeps the signs as a bits-wide key, so two users land in the same bucket
+    with a probability that grows with the cosine similarity of their
+    vectors. A query only reads the buckets of its own keys (and, when they
+    are too small, the buckets one bit away), then ranks that candidate set
+    by exact cosine similarity.
+
+    The buckets are stored as flat arrays: keys[t] holds the keys of table t
+    in sorted order and order[t] the user positions in the same order, so a
+    bucket is found with a binary search.
+
+    Attributes:
+    user_ids (numpy.ndarray): userIds covered by the index (int32).
+    movie_ids (numpy.ndarray): Sorted movieIds spanning the vector space (int32).
+    planes (numpy.ndarray): Hyperplane normals, one row per movie (float32, movies x n_tables * bits).
+    keys (numpy.ndarray): Sorted bucket keys per table (uint64, n_tables x users).
+    order (numpy.ndarray): User positions in key order per table (int32, n_tables x users).
+    """
+
+    def __init__(self, user_ids, movie_ids, planes, keys, order):
+        self.user_ids = user_ids
+        self.movie_ids = movie_ids
+        self.planes = planes
+        self.keys = keys
+        self.order = order
+
+    @property
+    def n_tables(self):
+        return self.keys.shape[0]
+
+    @property
+    def bits(self):
+        return self.planes.shape[1] // self.keys.shape[0]
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Open an index written by save, memory-mapped read-only by default.
+
+        Raises:
+        ArtifactError: If the directory is not an LSH index of the current schema version.
+        """
+        _, arrays = load_artifact(directory, LSH_INDEX_KIND, LSH_INDEX_SCHEMA, mmap_mode)
+        return cls(**{name: arrays[name] for name in LSH_INDEX_FILES})
+
+    def save(self, directory, dataset_hash=None, metadata=None):
+        """
+        Write the index as an artifact directory (see recommender.artifacts.save_artifact).
+
+        Parameters:
+        directory (str): Directory of the index, replaced if it exists.
+        dataset_hash (str, optional): Fingerprint of the ratings the index was built from, see matrix_hash.
+        metadata (dict, optional): Build parameters recorded in the manifest.
+
+        Returns:
+        int: The total size of the written files in bytes.
+        """
+        arrays = {name: getattr(self, name) for name in LSH_INDEX_FILES}
+        return save_artifact(directory, LSH_INDEX_KIND, LSH_INDEX_SCHEMA, arrays, dataset_hash, metadata)
+
+    def signature(self, movie_ids, deviations):
+        """
+        Hash one mean-centered rating vector.
+
+        Parameters:
+        movie_ids (array-like): The movieIds the user rated.
+        deviations (array-like): The user's ratings of those movies minus their mean.
+
+        Returns:
+        numpy.ndarray: The user's key in every table (uint64, n_tables).
+        """
+        positions = _positions(self.movie_ids, np.asarray(movie_ids))
+        known = positions >= 0
+        projection = np.asarray(deviations, dtype=np.float32)[known] @ self.planes[positions[known]]
+        return _pack_keys((projection > 0)[None, :], self.n_tables, self.bits)[:, 0]
+
+    def candidates(self, keys, min_candidates=0):
+        """
+        Return the positions of the users sharing a bucket with the given keys.
+
+        When the exact buckets hold fewer than min_candidates users, the
+        buckets whose key differs by one bit are read too (multi-probe).
+
+        Parameters:
+        keys (numpy.ndarray): The query's key in every table, as returned by signature.
+        min_candidates (int, optional): Probe neighboring buckets below this many candidates.
+
+        Returns:
+        numpy.ndarray: Unique user positions into user_ids.
+        """
+        found = self._bucket_members(np.arange(self.n_tables), keys)
+        if len(found) < min_candidates:
+            flips = np.uint64(1) << np.arange(self.bits, dtype=np.uint64)
+            tables = np.repeat(np.arange(self.n_tables), self.bits)
+            probes = np.repeat(keys, self.bits) ^ np.tile(flips, self.n_tables)
+            found = np.union1d(found, self._bucket_members(tables, probes))
+        return found
+
+    def _bucket_members(self, tables, keys):
+        members = []
+        for table, key in zip(tables.tolist(), keys):
+            sorted_keys = self.keys[table]
+            start = np.searchsorted(sorted_keys, key, side='left')
+            end = np.searchsorted(sorted_keys, key, side='right')
+            if end > start:
+                members.append(self.order[table, start:end])
+        return np.unique(np.concatenate(members)) if members else np.zeros(0, dtype=np.int32)
+
+
+def build_lsh_index(matrix, n_tables=16, bits=6, seed=0, block_size=1024):
+    """
+    Hash every user of a RatingMatrix into a UserLSHIndex.
+
+    The projections are computed block by block straight from the CSR
+    arrays (every rating adds its deviation times its movie's hyperplane row
+    to its user's projection), so no dense user x movie matrix is built.
+
+    Parameters:
+    matrix (RatingMatrix): The ratings.
+    n_tables (int, optional): Number of hash tables. More tables raise recall and query cost. Defaults to 16.
+    bits (int, optional): Bits per key (at most 64). More bits make smaller,
+                          more precise buckets. Defaults to 6.
+    seed (int, optional): Seed of the random hyperplanes. Defaults to 0.
+    block_size (int, optional): Number of users projected at once. Defaults to 1024.
+
+    Returns:
+    UserLSHIndex: The in-memory index.
+    """
+    if not 1 <= bits <= 64:
+        raise ValueError("bits must be between 1 and 64")
+    matrix = matrix.compacted()
+    n_users, n_movies = matrix.shape
+    movie_order = np.argsort(matrix.movie_ids, kind='stable')
+    rng = np.random.default_rng(seed)
+    planes = rng.standard_normal((n_movies, n_tables * bits), dtype=np.float32)
+
+    keys = np.empty((n_tables, n_users), dtype=np.uint64)
+    for start in range(0, n_users, block_size):
+        end = min(start + block_size, n_users)
+        owner, cols, values = matrix.gather_rows(np.arange(start, end))
+        deviations = (values - matrix.user_means[start + owner]).astype(np.float32)
+        projections = np.zeros((end - start, n_tables * bits), dtype=np.float32)
+        # The ratings are grouped by user, so every user's projection is one segment sum
+        rated = np.flatnonzero(matrix.user_counts[start:end])
+        if len(rated):
+            segment_starts = matrix.indptr[start + rated] - matrix.indptr[start]
+            projections[rated] = np.add.reduceat(deviations[:, None] * planes[cols], segment_starts, axis=0)
+        keys[:, start:end] = _pack_keys(projections > 0, n_tables, bits)
+
+    order = np.argsort(keys, axis=1, kind='stable').astype(np.int32)
+    sorted_keys = np.take_along_axis(keys, order, axis=1)
+
+    # Store the hyperplanes in movieId order so queries can binary-search them
+    return UserLSHIndex(matrix.user_ids.copy(), matrix.movie_ids[movie_order].copy(), planes[movie_order],
+                        sorted_keys, order)
+
+
+def similar_users(user_id, matrix, index=None, K=50, min_candidates=None):
+    """
+    Find the K users whose mean-centered ratings have the highest cosine similarity to a user's.
+
+    With an index, only the users sharing an LSH bucket with the user are
+    compared (see UserLSHIndex.candidates); without one, every user is, which
+    is the exact reference used to measure recall.
+
+    Parameters:
+    user_id (int): The ID of the user.
+    matrix (RatingMatrix): The ratings.
+    index (UserLSHIndex, optional): The LSH index. Defaults to None (exact search).
+    K (int, optional): Number of neighbors. Defaults to 50.
+    min_candidates (int, optional): Multi-probe threshold of the index. Defaults to 4 * K.
+
+    Returns:
+    tuple: (matrix row positions, similarities) of up to K users with a
+           positive similarity, most similar first.
+    """
+    row = matrix.user_row(user_id)
+    cols, values = matrix.row(user_id)
+    deviations = values - matrix.user_means[row]
+
+    if index is None:
+        candidates = np.arange(matrix.shape[0])
+    else:
+        keys = index.signature(matrix.movie_ids[cols], deviations)
+        found = index.candidates(keys, 4 * K if min_candidates is None else min_candidates)
+        candidates = matrix.user_rows(index.user_ids[found])
+        candidates = candidates[candidates >= 0]
+    candidates = candidates[candidates != row]
+
+    query = np.zeros(matrix.shape[1])
+    query[cols] = deviations
+    owner, candidate_cols, candidate_values = matrix.gather_rows(candidates)
+    candidate_deviations = candidate_values - matrix.user_means[candidates[owner]]
+    dots = np.bincount(owner, weights=candidate_deviations * query[candidate_cols], minlength=len(candidates))
+
+    # The norms of the centered vectors are the running sums of squared deviations
+    norms = np.sqrt(matrix.user_squared_deviations[candidates] * matrix.user_squared_deviations[row])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarities = np.where(norms > 0, dots / norms, 0.0)
+
+    positive = similarities > 0
+    candidates, similarities = candidates[positive], similarities[positive]
+    top = np.lexsort((candidates, -similarities))[:K]
+    return candidates[top], similarities[top]
+
+
+def recall_at_k(matrix, index, user_ids, K=50, min_candidates=None):
+    """
+    Measure how many of the exact K nearest users the LSH index finds.
+
+    Parameters:
+    matrix (RatingMatrix): The ratings.
+    index (UserLSHIndex): The LSH index.
+    user_ids (iterable): The users to query.
+    K (int, optional): Number of neighbors. Defaults to 50.
+    min_candidates (int, optional): Multi-probe threshold of the index. Defaults to 4 * K.
+
+    Returns:
+    dict: 'recall' (mean fraction of the exact neighbors found), and the mean
+          query time of the 'exact_ms' and 'approximate_ms' searches.
+    """
+    recalls, exact_seconds, approximate_seconds = [], 0.0, 0.0
+    for user_id in user_ids:
+        started = time.perf_counter()
+        exact, _ = similar_users(user_id, matrix, K=K)
+        exact_seconds += time.perf_counter() - started
+
+        started = time.perf_counter()
+        approximate, _ = similar_users(user_id, matrix, index, K=K, min_candidates=min_candidates)
+        approximate_seconds += time.perf_counter() - started
+
+        if len(exact):
+            recalls.append(len(np.intersect1d(exact, approximate)) / len(exact))
+
+    count = max(len(recalls), 1)
+    return {
+        'recall': float(np.mean(recalls)) if recalls else 1.0,
+        'exact_ms': exact_seconds * 1000 / count,
+        'approximate_ms': approximate_seconds * 1000 / count,
+    }
+
+
+def _pack_keys(signs, n_tables, bits):
+    # (users x n_tables * bits) booleans -> (n_tables x users) uint64 keys
+    signs = signs.reshape(len(signs), n_tables, bits).astype(np.uint64)
+    weights = np.uint64(1) << np.arange(bits, dtype=np.uint64)
+    return (signs * weights).sum(axis=2, dtype=np.uint64).T
+
+
+def _positions(sorted_ids, ids):
+    if len(sorted_ids) == 0:
+        return np.full(len(ids), -1, dtype=np.int64)
+    positions = np.minimum(np.searchsorted(sorted_ids, ids), len(sorted_ids) - 1)
+    return np.where(sorted_ids[positions] == ids, positions, -1)
@@ -0,0 +1,74 @@
+# recommender/management/commands/benchmark.py
+
+import json
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+import recommendations
+from recommender.benchmarks import BENCHMARK_CASES, compare_reports, run_benchmarks, synthetic_dataset
+
+
+class Command(BaseCommand):
+    help = ("Time the recommendation hot paths on ml-latest-small and on synthetic datasets, "
+            "write the results as JSON and compare them with a baseline.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scales', type=float, nargs='+', default=[1, 10, 100],
+                            help="Dataset scales; 1 is the real dataset, larger scales are synthetic.")
+        parser.add_argument('--cases', nargs='+', choices=BENCHMARK_CASES, default=list(BENCHMARK_CASES),
+                            help="Cases to run.")
+        parser.add_argument('--repeat', type=int, default=5, help="Number of timed calls per case.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the synthetic data and user sampling.")
+        parser.add_argument('--output', default=None, help="Path of the JSON report.")
+        parser.add_argument('--baseline', default=None, help="JSON report to compare the results with.")
+        parser.add_argument('--tolerance', type=float, default=0.2,
+                            help="Allowed relative slowdown of a median before it is flagged as a regression.")
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError("--repeat must be positive")
+        base = recommendations.get_dataset()
+
+        datasets = {}
+        for scale in options['scales']:
+            if scale == 1:
+                datasets['ml-latest-small'] = base
+                continue
+            started = time.perf_counter()
+            name = f'synthetic-{scale:g}x'
+            datasets[name] = synthetic_dataset(base, scale, seed=options['seed'])
+            self.stdout.write(f"Generated {name}: {datasets[name].matrix.nnz} ratings "
+                              f"in {time.perf_counter() - started:.1f}s")
+
+        report = run_benchmarks(datasets, cases=options['cases'], repeat=options['repeat'], seed=options['seed'])
+
+        for name, dataset in report['datasets'].items():
+            self.stdout.write(f"{name}: {dataset['users']} users, {dataset['movies']} movies, "
+                              f"{dataset['ratings']} ratings (density {dataset['density']:.4%})")
+            for case, result in dataset['cases'].items():
+                if 'skipped' in result:
+                    self.stdout.write(f"  {case:<30} skipped: {result['skipped']}")
+                else:
+                    self.stdout.write(f"  {case:<30} median {result['median_ms']:9.2f} ms  "
+                                      f"p95 {result['p95_ms']:9.2f} ms")
+
+        if options['output']:
+            with open(options['output'], 'w') as file:
+                json.dump(report, file, indent=2)
+            self.stdout.write(f"Wrote {options['output']}")
+
+        if options['baseline']:
+            with open(options['baseline']) as file:
+                baseline = json.load(file)
+            comparisons = compare_reports(report, baseline, tolerance=options['tolerance'])
+            regressions = [comparison for comparison in comparisons if comparison['regression']]
+            for comparison in comparisons:
+                style = self.style.ERROR if comparison['regression'] else self.style.SUCCESS
+                self.stdout.write(style(
+                    f"{comparison['dataset']} {comparison['case']}: {comparison['baseline_ms']:.2f} ms -> "
+                    f"{comparison['current_ms']:.2f} ms ({comparison['ratio']:.2f}x)"
+                ))
+            if regressions:
+                raise CommandError(f"{len(regressions)} benchmark(s) slower than the baseline by more than "
+                                   f"{options['tolerance']:.0%}")
@@ -0,0 +1,36 @@
+# recommender/management/commands/build_hybrid_model.py
+
+import time
+
+from django.core.management.base import BaseCommand
+
+from recommendations import DATASET_DIR, MODEL_DIR, get_dataset
+from recommender.conf import get_setting
+from recommender.content import read_tags
+from recommender.hybrid_model import HybridModel, build_hybrid_model
+
+
+class Command(BaseCommand):
+    help = "Build the model of the 'hybrid' engine and write it as .npy arrays with a manifest.json."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help="Directory the model is written to.")
+        parser.add_argument('--min-tag-movies', type=int, default=2,
+                            help="Minimum number of movies a tag must be applied to.")
+
+    def handle(self, *args, **options):
+        output = options['output'] or MODEL_DIR
+        started = time.perf_counter()
+        dataset = get_dataset()
+        tags = read_tags(str(get_setting('RECOMMENDER_DATASET_DIR', DATASET_DIR)))
+        model = build_hybrid_model(dataset, tags, min_tag_movies=options['min_tag_movies'])
+        size = model.save(output, metadata={'min_tag_movies': options['min_tag_movies']})
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {model.content.shape[1]} features for {model.content.shape[0]} movies to {output} "
+            f"({size / 2 ** 20:.1f} MiB) in {time.perf_counter() - started:.1f}s"
+        ))
+
+        started = time.perf_counter()
+        HybridModel.load(output)
+        elapsed = time.perf_counter() - started
+        self.stdout.write(f"Content hash {model.content_hash[:12]}, model loads in {elapsed * 1000:.1f} ms")
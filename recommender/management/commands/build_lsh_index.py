@@ -0,0 +1,48 @@
+# recommender/management/commands/build_lsh_index.py
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand
+
+from recommendations import LSH_INDEX_DIR, get_dataset
+from recommender.artifacts import matrix_hash
+from recommender.conf import get_setting
+from recommender.lsh import build_lsh_index, recall_at_k
+
+
+class Command(BaseCommand):
+    help = ("Hash every user's mean-centered ratings into a random-hyperplane LSH index for the 'lsh' engine, "
+            "and report its recall@K against exact neighbor search.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help="Directory the index is written to.")
+        parser.add_argument('--tables', type=int, default=16, help="Number of hash tables.")
+        parser.add_argument('--bits', type=int, default=6, help="Bits per hash key.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the random hyperplanes.")
+        parser.add_argument('-k', '--neighbors', type=int, default=None,
+                            help="K of the recall@K evaluation; defaults to RECOMMENDER_LSH_NEIGHBORS.")
+        parser.add_argument('--evaluate', type=int, default=100,
+                            help="Number of random users the recall is measured on (0 to skip).")
+
+    def handle(self, *args, **options):
+        output = options['output'] or get_setting('RECOMMENDER_LSH_INDEX_DIR', LSH_INDEX_DIR)
+        matrix = get_dataset().matrix
+
+        started = time.perf_counter()
+        index = build_lsh_index(matrix, n_tables=options['tables'], bits=options['bits'], seed=options['seed'])
+        size = index.save(str(output), matrix_hash(matrix), metadata={
+            'tables': options['tables'], 'bits': options['bits'], 'seed': options['seed'],
+        })
+        self.stdout.write(self.style.SUCCESS(
+            f"Hashed {len(index.user_ids)} users into {index.n_tables} tables of {index.bits} bits, "
+            f"wrote {output} ({size / 2 ** 20:.1f} MiB) in {time.perf_counter() - started:.1f}s"
+        ))
+
+        if options['evaluate']:
+            K = options['neighbors'] or get_setting('RECOMMENDER_LSH_NEIGHBORS', 50)
+            rng = np.random.default_rng(options['seed'])
+            users = rng.choice(matrix.user_ids, size=min(options['evaluate'], matrix.shape[0]), replace=False)
+            result = recall_at_k(matrix, index, users.tolist(), K=K)
+            self.stdout.write(f"recall@{K}: {result['recall']:.3f} on {len(users)} users, "
+                              f"{result['approximate_ms']:.2f} ms per query vs {result['exact_ms']:.2f} ms exact")
@@ -0,0 +1,52 @@
+# recommender/management/commands/build_neighbor_index.py
+
+import os
+import time
+
+import numpy as np
+import pandas as pd
+from django.core.management.base import BaseCommand
+
+from recommendations import DATASET_DIR, NEIGHBOR_INDEX_DIR
+from recommender.artifacts import matrix_hash
+from recommender.conf import get_setting
+from recommender.dataset import RATINGS_FILE
+from recommender.neighbors import build_neighbor_index
+from recommender.rating_matrix import RatingMatrix
+
+
+class Command(BaseCommand):
+    help = "Compute the top-K item-item neighbors from ratings.csv and write them as memory-mappable .npy arrays."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ratings', default=None, help="Path of the ratings CSV file.")
+        parser.add_argument('--output', default=None, help="Directory the index is written to.")
+        parser.add_argument('-k', '--neighbors', type=int, default=50, help="Number of neighbors kept per movie.")
+        parser.add_argument('--block-size', type=int, default=512, help="Number of movies per similarity block.")
+        parser.add_argument('--chunk-size', type=int, default=2 ** 22,
+                            help="Number of rating pairs accumulated at once.")
+        parser.add_argument('--shrinkage', type=float, default=10.0, help="Damping of similarities with little support.")
+
+    def handle(self, *args, **options):
+        output = options['output'] or get_setting('RECOMMENDER_NEIGHBOR_INDEX_DIR', NEIGHBOR_INDEX_DIR)
+        ratings_path = options['ratings'] or os.path.join(get_setting('RECOMMENDER_DATASET_DIR', DATASET_DIR),
+                                                          RATINGS_FILE)
+        started = time.perf_counter()
+
+        ratings = pd.read_csv(ratings_path, usecols=['userId', 'movieId', 'rating'],
+                              dtype={'userId': np.int32, 'movieId': np.int32, 'rating': np.float32})
+        matrix = RatingMatrix.from_frame(ratings)
+        del ratings
+        self.stdout.write(f"Loaded {matrix.nnz} ratings for {matrix.shape[0]} users and {matrix.shape[1]} movies")
+
+        index = build_neighbor_index(matrix, k=options['neighbors'], block_size=options['block_size'],
+                                     chunk_size=options['chunk_size'], shrinkage=options['shrinkage'])
+        size = index.save(output, matrix_hash(matrix), metadata={
+            'k': options['neighbors'], 'shrinkage': options['shrinkage'], 'ratings': str(ratings_path),
+        })
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {len(index.neighbors)} neighbors for {len(index.movie_ids)} movies to {output} "
+            f"({size / 2 ** 20:.1f} MiB) in {elapsed:.1f}s"
+        ))
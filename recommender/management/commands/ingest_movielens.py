@@ -0,0 +1,48 @@
+# recommender/management/commands/ingest_movielens.py
+
+import os
+import time
+
+from django.core.management.base import BaseCommand
+
+from recommendations import DATASET_DIR
+from recommender.conf import get_setting
+from recommender.dataset import CACHE_FILE, LINKS_FILE, MOVIES_FILE, RATINGS_FILE, MovieLensDataset
+
+
+class Command(BaseCommand):
+    help = "Convert the MovieLens CSV files once into the compact binary cache loaded at start-up."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dataset-dir', default=None, help="MovieLens directory with the CSV files.")
+        parser.add_argument('--output', default=None, help="Path of the .npz cache file.")
+        parser.add_argument('--chunk-size', type=int, default=None,
+                            help="Stream ratings.csv in chunks of this many rows; "
+                                 "defaults to RECOMMENDER_DATASET_CHUNK_SIZE.")
+
+    def handle(self, *args, **options):
+        directory = str(options['dataset_dir'] or get_setting('RECOMMENDER_DATASET_DIR', DATASET_DIR))
+        output = str(options['output'] or get_setting('RECOMMENDER_DATASET_CACHE', None)
+                     or os.path.join(directory, CACHE_FILE))
+
+        started = time.perf_counter()
+        chunk_size = options['chunk_size'] or get_setting('RECOMMENDER_DATASET_CHUNK_SIZE', None)
+        dataset = MovieLensDataset.from_csv(directory, chunk_size=chunk_size)
+        csv_seconds = time.perf_counter() - started
+
+        size = dataset.save_cache(output)
+
+        started = time.perf_counter()
+        MovieLensDataset.from_cache(output)
+        cache_seconds = time.perf_counter() - started
+
+        csv_size = sum(os.path.getsize(os.path.join(directory, name))
+                       for name in (MOVIES_FILE, RATINGS_FILE, LINKS_FILE)
+                       if os.path.exists(os.path.join(directory, name)))
+
+        self.stdout.write(f"Ratings: {dataset.matrix.nnz}, movies: {len(dataset.movies)}")
+        self.stdout.write(f"CSV files:    {csv_size / 2 ** 20:.1f} MiB, cold load {csv_seconds * 1000:.0f} ms")
+        self.stdout.write(f"Binary cache: {size / 2 ** 20:.1f} MiB, cold load {cache_seconds * 1000:.0f} ms")
+        self.stdout.write(self.style.SUCCESS(
+            f"Wrote {output} ({csv_seconds / cache_seconds:.1f}x faster to load)"
+        ))
@@ -0,0 +1,61 @@
+# recommender/management/commands/precompute_recommendations.py
+
+import multiprocessing
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+import recommendations
+from recommender.conf import get_setting
+from recommender.precompute import store_precomputed_movies
+
+
+def rank_chunk(task):
+    """Rank one chunk of users; runs in the worker processes."""
+    user_ids, engine, N = task
+    return [(user_id, movie_ids.tolist()) for user_id, movie_ids in recommendations.rank_users(user_ids, engine, N)]
+
+
+class Command(BaseCommand):
+    help = ("Rank the top movies of every user in parallel and store them in the PrecomputedRecommendation "
+            "table, from which /api/recommend/ serves them.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=1, help="Number of worker processes.")
+        parser.add_argument('--chunk-size', type=int, default=64, help="Number of users per task.")
+        parser.add_argument('-n', '--top', type=int, default=20, help="Number of movies ranked per user.")
+        parser.add_argument('--engine', default=None, help="Recommender engine; defaults to RECOMMENDER_ENGINE.")
+
+    def handle(self, *args, **options):
+        if options['workers'] < 1 or options['chunk_size'] < 1:
+            raise CommandError("--workers and --chunk-size must be positive")
+        engine = options['engine'] or get_setting('RECOMMENDER_ENGINE', 'hybrid')
+        version = recommendations.model_version(engine, N=options['top'])
+        started = time.perf_counter()
+
+        # Load the ratings once, before forking: the workers inherit them as
+        # read-only copy-on-write pages instead of each reading the dataset.
+        user_ids = recommendations.get_dataset().matrix.user_ids.tolist()
+        chunks = [user_ids[start:start + options['chunk_size']]
+                  for start in range(0, len(user_ids), options['chunk_size'])]
+        tasks = [(chunk, engine, options['top']) for chunk in chunks]
+
+        written = 0
+        if options['workers'] == 1:
+            for task in tasks:
+                written += store_precomputed_movies(dict(rank_chunk(task)), version)
+        else:
+            # Forked children must not reuse the parent's database connections
+            connections.close_all()
+            methods = multiprocessing.get_all_start_methods()
+            context = multiprocessing.get_context('fork' if 'fork' in methods else None)
+            with context.Pool(options['workers']) as pool:
+                for rankings in pool.imap_unordered(rank_chunk, tasks):
+                    written += store_precomputed_movies(dict(rankings), version)
+
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Stored recommendations for {written} users ({version}) in {elapsed:.1f}s "
+            f"with {options['workers']} worker(s)"
+        ))
@@ -0,0 +1,34 @@
+# recommender/management/commands/publish_dataset.py
+
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations import load_dataset
+from recommender.conf import get_setting
+from recommender.shared import publish_dataset
+
+
+class Command(BaseCommand):
+    help = ("Publish the dataset as a new generation of memory-mapped arrays that every worker process "
+            "attaches to read-only, instead of loading its own copy.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None,
+                            help="Directory of the generations; defaults to RECOMMENDER_SHARED_DATASET_DIR.")
+        parser.add_argument('--keep', type=int, default=2, help="Number of generations kept on disk.")
+
+    def handle(self, *args, **options):
+        root = options['output'] or get_setting('RECOMMENDER_SHARED_DATASET_DIR', None)
+        if root is None:
+            raise CommandError("Pass --output or set RECOMMENDER_SHARED_DATASET_DIR")
+        if options['keep'] < 1:
+            raise CommandError("--keep must be at least 1")
+
+        started = time.perf_counter()
+        dataset = load_dataset()
+        generation = publish_dataset(dataset, str(root), keep=options['keep'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Published generation {generation} ({dataset.matrix.nnz} ratings, "
+            f"{dataset.matrix.nbytes / 2 ** 20:.1f} MiB) to {root} in {time.perf_counter() - started:.1f}s"
+        ))
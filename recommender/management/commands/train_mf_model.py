@@ -0,0 +1,57 @@
+# recommender/management/commands/train_mf_model.py
+
+import time
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+
+from recommendations import FACTOR_MODEL_PATH, get_dataset
+from recommender.artifacts import matrix_hash
+from recommender.conf import get_setting
+from recommender.factorization import rmse, train_factor_model
+from recommender.rating_matrix import RatingMatrix
+
+
+class Command(BaseCommand):
+    help = ("Train the latent-factor model of the 'mf' engine with alternating least squares, "
+            "optionally reporting its RMSE on held-out ratings.")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--output', default=None, help="Directory the model is written to.")
+        parser.add_argument('--factors', type=int, default=32, help="Number of latent factors.")
+        parser.add_argument('--iterations', type=int, default=15, help="Number of ALS sweeps.")
+        parser.add_argument('--regularization', type=float, default=0.2, help="L2 penalty.")
+        parser.add_argument('--seed', type=int, default=0, help="Seed of the initial factors and the holdout.")
+        parser.add_argument('--holdout', type=float, default=0.0,
+                            help="Fraction of the ratings left out of training to measure RMSE on (e.g. 0.1).")
+
+    def handle(self, *args, **options):
+        if not 0 <= options['holdout'] < 1:
+            raise CommandError("--holdout must be in [0, 1)")
+        output = options['output'] or get_setting('RECOMMENDER_MF_MODEL_PATH', FACTOR_MODEL_PATH)
+        matrix = get_dataset().matrix.compacted()
+
+        held_out = None
+        if options['holdout']:
+            rows = np.repeat(np.arange(matrix.shape[0]), matrix.user_counts)
+            user_ids, movie_ids = matrix.user_ids[rows], matrix.movie_ids[matrix.indices]
+            test = np.random.default_rng(options['seed']).random(matrix.nnz) < options['holdout']
+            held_out = user_ids[test], movie_ids[test], matrix.data[test]
+            matrix = RatingMatrix.from_ratings(user_ids[~test], movie_ids[~test], matrix.data[~test])
+
+        started = time.perf_counter()
+        model = train_factor_model(matrix, k=options['factors'], iterations=options['iterations'],
+                                   regularization=options['regularization'], seed=options['seed'])
+        size = model.save(str(output), matrix_hash(matrix), metadata={
+            'iterations': options['iterations'], 'seed': options['seed'], 'holdout': options['holdout'],
+        })
+        self.stdout.write(self.style.SUCCESS(
+            f"Trained {model.k} factors for {len(model.user_ids)} users and {len(model.movie_ids)} movies, "
+            f"wrote {output} ({size / 2 ** 20:.1f} MiB) in {time.perf_counter() - started:.1f}s"
+        ))
+
+        if held_out is not None:
+            baseline = train_factor_model(matrix, k=model.k, iterations=0,
+                                          regularization=options['regularization'])
+            self.stdout.write(f"Held-out RMSE on {len(held_out[2])} ratings: {rmse(model, *held_out):.4f} "
+                              f"(biases only: {rmse(baseline, *held_out):.4f})")
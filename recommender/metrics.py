@@ -0,0 +1,153 @@
+# recommender/metrics.py
+
+import contextlib
+import math
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    """
+    A monotonically increasing count, optionally split by labels.
+
+    Parameters:
+    name (str): The metric name, e.g. 'recommender_cache_requests_total'.
+    documentation (str): The HELP text.
+    labelnames (tuple, optional): Names of the labels passed to inc.
+    """
+
+    type = 'counter'
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = _label_values(self, labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(_label_values(self, labels), 0)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield self.name, dict(zip(self.labelnames, key)), value
+
+
+class Histogram:
+    """
+    Observations counted into cumulative buckets, optionally split by labels.
+
+    Parameters:
+    name (str): The metric name, e.g. 'recommender_stage_seconds'.
+    documentation (str): The HELP text.
+    labelnames (tuple, optional): Names of the labels passed to observe.
+    buckets (tuple, optional): Upper bounds of the buckets. Defaults to DEFAULT_BUCKETS.
+    """
+
+    type = 'histogram'
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._lock = threading.Lock()
+        self._values = {}
+        REGISTRY.append(self)
+
+    def observe(self, value, **labels):
+        key = _label_values(self, labels)
+        index = next(i for i, bound in enumerate(self.buckets) if value <= bound)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            counts[index] += 1
+            self._values[key] = counts, total + value
+
+    @contextlib.contextmanager
+    def time(self, **labels):
+        """Observe the number of seconds spent in the with block."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, **labels)
+
+    def count(self, **labels):
+        counts, _ = self._values.get(_label_values(self, labels), ((), 0.0))
+        return sum(counts)
+
+    def samples(self):
+        with self._lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self._values.items()}
+        for key, (counts, total) in sorted(values.items()):
+            labels = dict(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield f'{self.name}_bucket', {**labels, 'le': _format_value(bound)}, cumulative
+            yield f'{self.name}_sum', labels, total
+            yield f'{self.name}_count', labels, cumulative
+
+
+def render():
+    """
+    Return every metric of this process in the Prometheus text exposition format.
+    """
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f'# HELP {metric.name} {metric.documentation}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        for name, labels, value in metric.samples():
+            if labels:
+                label_text = ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+                name = f'{name}{{{label_text}}}'
+            lines.append(f'{name} {_format_value(value)}')
+    return '\n'.join(lines) + '\n'
+
+
+def _label_values(metric, labels):
+    if set(labels) != set(metric.labelnames):
+        raise ValueError(f"{metric.name} expects labels {metric.labelnames}, got {tuple(labels)}")
+    return tuple(str(labels[name]) for name in metric.labelnames)
+
+
+def _escape(value):
+    return str(value).replace('\\', r'\\').replace('\n', r'\n').replace('"', r'\"')
+
+
+def _format_value(value):
+    if value == math.inf:
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+REGISTRY = []
+
+STAGE_SECONDS = Histogram(
+    'recommender_stage_seconds', 'Time spent in each stage of computing recommendations.', ['stage'])
+CANDIDATE_MOVIES = Histogram(
+    'recommender_candidate_movies', 'Number of candidate movies scored per recommendation.',
+    buckets=(10, 100, 500, 1000, 2500, 5000, 10000, 25000, 50000, 100000))
+REQUEST_SECONDS = Histogram(
+    'recommender_request_seconds', 'Time spent handling API requests.', ['view'])
+REQUESTS = Counter(
+    'recommender_requests_total', 'API requests by view and status code.', ['view', 'status'])
+CACHE_REQUESTS = Counter(
+    'recommender_cache_requests_total', 'Ranked-list cache lookups by result.', ['result'])
+PRECOMPUTED_REQUESTS = Counter(
+    'recommender_precomputed_requests_total', 'Precomputed-table lookups by result.', ['result'])
+FALLBACK_REQUESTS = Counter(
+    'recommender_fallback_requests_total', 'Recommendations served from the popularity ranking, by reason.',
+    ['reason'])
+USERS_NOT_FOUND = Counter(
+    'recommender_user_not_found_total', "Recommendation requests answered with 404 'User not found'.", ['view'])
@@ -0,0 +1,24 @@
+# Generated by Django 4.2.5 on 2026-10-17 06:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrecomputedRecommendation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.PositiveIntegerField(unique=True)),
+                ('movie_ids', models.JSONField()),
+                ('model_version', models.CharField(max_length=64)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+    ]
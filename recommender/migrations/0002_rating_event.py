@@ -0,0 +1,23 @@
+# Generated by Django 4.2.5 on 2026-10-17 06:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recommender', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RatingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('user_id', models.PositiveIntegerField()),
+                ('movie_id', models.PositiveIntegerField()),
+                ('rating', models.FloatField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+    ]
@@ -1 +1,39 @@
 # recommender/models.py
+
+from django.db import models
+
+
+class PrecomputedRecommendation(models.Model):
+    """
+    A user's ranked candidate movies, computed offline by `manage.py precompute_recommendations`.
+
+    A row is only served while its model_version matches the version of the
+    engine in use (see recommendations.model_version).
+    """
+
+    user_id = models.PositiveIntegerField(unique=True)
+    movie_ids = models.JSONField()
+    model_version = models.CharField(max_length=64)
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f'Recommendations for user {self.user_id} ({self.model_version})'
+
+
+class RatingEvent(models.Model):
+    """
+    A rating recorded through the API (see recommendations.add_ratings).
+
+    The events are the durable log of the ratings added after the dataset
+    was loaded: every process replays them, in id order, on top of the
+    MovieLens files when it loads the dataset, and picks up the events
+    written by other processes as it runs.
+    """
+
+    user_id = models.PositiveIntegerField()
+    movie_id = models.PositiveIntegerField()
+    rating = models.FloatField()
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f'User {self.user_id} rated movie {self.movie_id} {self.rating}'
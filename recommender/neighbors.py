@@ -0,0 +1,187 @@
+# recommender/neighbors.py
+
+import numpy as np
+
+from recommender.artifacts import load_artifact, save_artifact
+from recommender.rating_matrix import _gather
+
+NEIGHBOR_INDEX_FILES = ('movie_ids', 'offsets', 'neighbors', 'scores')
+NEIGHBOR_INDEX_KIND = 'neighbors'
+# Bump when the arrays written by NeighborIndex.save change
+NEIGHBOR_INDEX_SCHEMA = 1
+
+
+class NeighborIndex:
+    """
+    Top-K item-item neighbors stored as flat arrays.
+
+    The neighbors of the movie at position i are neighbors[offsets[i]:offsets[i + 1]],
+    with their similarities in the same slice of scores. Neighbors are stored
+    as positions into movie_ids, sorted by decreasing similarity.
+
+    Attributes:
+    movie_ids (numpy.ndarray): Sorted movieIds covered by the index (int32).
+    offsets (numpy.ndarray): Start of every movie's neighbor list (int64, len(movie_ids) + 1).
+    neighbors (numpy.ndarray): Positions of the neighbor movies (int32).
+    scores (numpy.ndarray): Similarity of every neighbor (float32).
+    """
+
+    def __init__(self, movie_ids, offsets, neighbors, scores):
+        self.movie_ids = movie_ids
+        self.offsets = offsets
+        self.neighbors = neighbors
+        self.scores = scores
+
+    @classmethod
+    def load(cls, directory, mmap_mode='r'):
+        """
+        Open an index written by save. By default the arrays are memory-mapped
+        read-only, so opening is cheap and the pages are shared between processes.
+
+        Raises:
+        ArtifactError: If the directory is not a neighbor index of the current schema version.
+        """
+        _, arrays = load_artifact(directory, NEIGHBOR_INDEX_KIND, NEIGHBOR_INDEX_SCHEMA, mmap_mode)
+        return cls(**{name: arrays[name] for name in NEIGHBOR_INDEX_FILES})
+
+    def save(self, directory, dataset_hash=None, metadata=None):
+        """
+        Write the index as an artifact directory (see recommender.artifacts.save_artifact).
+
+        Parameters:
+        directory (str): Directory of the index, replaced if it exists.
+        dataset_hash (str, optional): Fingerprint of the ratings the index was built from, see matrix_hash.
+        metadata (dict, optional): Build parameters recorded in the manifest.
+
+        Returns:
+        int: The total size of the written files in bytes.
+        """
+        arrays = {name: getattr(self, name) for name in NEIGHBOR_INDEX_FILES}
+        return save_artifact(directory, NEIGHBOR_INDEX_KIND, NEIGHBOR_INDEX_SCHEMA, arrays, dataset_hash, metadata)
+
+    def score_user(self, movie_ids, deviations):
+        """
+        Aggregate the neighbors of the movies a user has rated.
+
+        Every rated movie j contributes similarity * deviation to each of its
+        neighbors, where deviation is the user's rating of j minus the user's
+        mean rating, so candidates close to many well-liked movies rank first.
+        Only the neighbor lists of the rated movies are read.
+
+        Parameters:
+        movie_ids (array-like): The movieIds rated by the user.
+        deviations (array-like): The user's mean-centered ratings of those movies.
+
+        Returns:
+        tuple: (movieIds, scores) of the candidate movies, excluding the rated ones.
+        """
+        movie_ids = np.asarray(movie_ids)
+        deviations = np.asarray(deviations, dtype=np.float64)
+        if len(self.movie_ids) == 0:
+            return np.zeros(0, dtype=np.int32), np.zeros(0)
+
+        positions = np.searchsorted(self.movie_ids, movie_ids)
+        positions = np.minimum(positions, len(self.movie_ids) - 1)
+        known = self.movie_ids[positions] == movie_ids
+        positions, deviations = positions[known], deviations[known]
+
+        starts = self.offsets[positions]
+        lengths = self.offsets[positions + 1] - starts
+        owner = np.repeat(np.arange(len(positions)), lengths)
+        entries = starts[owner] + np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+
+        neighbors = self.neighbors[entries]
+        similarities = self.scores[entries].astype(np.float64)
+
+        candidates, inverse = np.unique(neighbors, return_inverse=True)
+        scores = np.bincount(inverse, weights=similarities * deviations[owner], minlength=len(candidates))
+
+        unrated = ~np.isin(candidates, positions)
+        return np.asarray(self.movie_ids[candidates[unrated]]), scores[unrated]
+
+
+def build_neighbor_index(matrix, k=50, block_size=512, chunk_size=2 ** 22, shrinkage=10.0):
+    """
+    Compute the top-K item-item neighbors of every movie in a RatingMatrix.
+
+    Similarity is the adjusted cosine: the cosine between two movie columns
+    after centering every rating on its user's mean, damped by n / (n + shrinkage)
+    where n is the number of users who rated both movies. The similarities are
+    computed for block_size movies at a time against the whole catalogue, as
+    sparse products: every rating of a movie in the block is paired with the
+    other ratings of its user, read from the CSR arrays, at most chunk_size
+    pairs at a time. The work is therefore proportional to the number of
+    co-ratings rather than to users x movies, and peak memory is bounded by
+    block_size x movies plus the chunk.
+
+    Parameters:
+    matrix (RatingMatrix): The ratings.
+    k (int, optional): Number of neighbors to keep per movie. Defaults to 50.
+    block_size (int, optional): Number of movies per similarity block. Defaults to 512.
+    chunk_size (int, optional): Number of rating pairs accumulated at once. Defaults to 2 ** 22.
+    shrinkage (float, optional): Damping of similarities with little support. Defaults to 10.0.
+
+    Returns:
+    NeighborIndex: The in-memory index.
+    """
+    matrix = matrix.compacted()
+    n_users, n_movies = matrix.shape
+    rows = np.repeat(np.arange(n_users), matrix.user_counts)
+    centered = (matrix.data - matrix.user_means[rows]).astype(np.float32)
+    csc_centered = (matrix.csc_data - matrix.user_means[matrix.csc_indices]).astype(np.float32)
+
+    norms = np.sqrt(np.bincount(matrix.indices, weights=centered.astype(np.float64) ** 2, minlength=n_movies))
+    norms[norms == 0] = np.inf
+    norms = norms.astype(np.float32)
+
+    k = min(k, max(n_movies - 1, 0))
+    neighbor_lists, score_lists, counts = [], [], np.zeros(n_movies, dtype=np.int64)
+
+    for block_start in range(0, n_movies, block_size):
+        block_end = min(block_start + block_size, n_movies)
+        width = block_end - block_start
+        products = np.zeros(width * n_movies, dtype=np.float32)
+        support = np.zeros_like(products)
+
+        # The ratings of the block's movies, from the CSC arrays, and the length of their users' rows
+        lo, hi = matrix.csc_indptr[block_start], matrix.csc_indptr[block_end]
+        users, weights = matrix.csc_indices[lo:hi], csc_centered[lo:hi]
+        local = np.repeat(np.arange(width), np.diff(matrix.csc_indptr[block_start:block_end + 1]))
+        starts = matrix.indptr[users]
+        lengths = matrix.indptr[users + 1] - starts
+        ends = np.cumsum(lengths)
+
+        first = 0
+        while first < len(users):
+            last = max(int(np.searchsorted(ends, ends[first] - lengths[first] + chunk_size, side='right')), first + 1)
+            owner, positions = _gather(starts[first:last], lengths[first:last])
+            owner += first
+            pairs = local[owner] * n_movies + matrix.indices[positions]
+            products += np.bincount(pairs, weights=weights[owner] * centered[positions], minlength=len(products))
+            support += np.bincount(pairs, minlength=len(support))
+            first = last
+
+        products, support = products.reshape(width, n_movies), support.reshape(width, n_movies)
+        similarities = products / norms[block_start:block_end, None] / norms[None, :]
+        similarities *= support / np.maximum(support + shrinkage, 1e-12)
+        similarities[np.arange(width), np.arange(block_start, block_end)] = 0.0
+
+        if k == 0:
+            continue
+        top = np.argpartition(-similarities, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(similarities, top, axis=1)
+        order = np.argsort(-top_scores, axis=1, kind='stable')
+        top = np.take_along_axis(top, order, axis=1)
+        top_scores = np.take_along_axis(top_scores, order, axis=1)
+
+        keep = top_scores > 0
+        counts[block_start:block_end] = keep.sum(axis=1)
+        neighbor_lists.append(top[keep].astype(np.int32))
+        score_lists.append(top_scores[keep].astype(np.float32))
+
+    offsets = np.zeros(n_movies + 1, dtype=np.int64)
+    np.cumsum(counts, out=offsets[1:])
+    neighbors = np.concatenate(neighbor_lists) if neighbor_lists else np.zeros(0, dtype=np.int32)
+    scores = np.concatenate(score_lists) if score_lists else np.zeros(0, dtype=np.float32)
+
+    return NeighborIndex(matrix.movie_ids.copy(), offsets, neighbors, scores)
@@ -0,0 +1,143 @@
+# recommender/popularity.py
+
+import numpy as np
+
+NO_GENRES = '(no genres listed)'
+
+
+class PopularityRanking:
+    """
+    The catalogue ranked once by Bayesian-average rating, overall and per genre.
+
+    This is the fallback for users the collaborative engines cannot serve:
+    unknown users and users with too few ratings. Answering such a request
+    only reads the head of a precomputed ranking, without touching the model
+    or scoring the catalogue.
+
+    A movie's score is its mean rating shrunk towards the global mean by
+    prior_count phantom ratings, (sum + prior_count * global_mean) /
+    (count + prior_count), so a movie with a handful of perfect ratings does
+    not outrank well-loved movies with hundreds. Movies without ratings rank
+    last, by movieId.
+
+    Attributes:
+    movie_ids (numpy.ndarray): Every movieId of the catalogue, best first (int32).
+    scores (numpy.ndarray): Their Bayesian-average ratings, aligned with movie_ids.
+    genre_ranks (dict): Genre name to the sorted positions in movie_ids of the movies of that genre.
+    """
+
+    def __init__(self, movie_ids, scores, genre_ranks):
+        self.movie_ids = movie_ids
+        self.scores = scores
+        self.genre_ranks = genre_ranks
+
+    def top(self, N=20, genres=None, exclude=None):
+        """
+        Return the N best movies, optionally restricted to genres.
+
+        Parameters:
+        N (int, optional): The number of movies to return. Defaults to 20.
+        genres (iterable, optional): Only return movies of at least one of
+                                     these genres; unknown genres are ignored.
+                                     When they hold fewer than N movies, the
+                                     list is filled from the overall ranking.
+        exclude (array-like, optional): movieIds that must not be returned, e.g. the user's rated movies.
+
+        Returns:
+        numpy.ndarray: Up to N movieIds, best first.
+        """
+        exclude = np.zeros(0, dtype=self.movie_ids.dtype) if exclude is None else np.asarray(exclude)
+        ranked = []
+        if genres:
+            ranks = [self.genre_ranks[genre] for genre in genres if genre in self.genre_ranks]
+            if ranks:
+                ranked.append(self._head(np.unique(np.concatenate(ranks)), N, exclude))
+        ranked.append(self._head(None, N, exclude))
+        # The overall head may repeat genre movies already selected
+        ranked = np.concatenate(ranked)
+        _, first = np.unique(ranked, return_index=True)
+        return ranked[np.sort(first)][:N]
+
+    def _head(self, ranks, N, exclude):
+        # Only the first N + len(exclude) ranked movies can be needed
+        limit = N + len(exclude)
+        movie_ids = self.movie_ids[:limit] if ranks is None else self.movie_ids[ranks[:limit]]
+        if len(exclude):
+            movie_ids = movie_ids[~np.isin(movie_ids, exclude)]
+        return movie_ids[:N]
+
+
+def build_popularity_ranking(matrix, catalog, prior_count=None):
+    """
+    Rank every movie of the catalogue by Bayesian-average rating.
+
+    Parameters:
+    matrix (RatingMatrix): The ratings.
+    catalog (MovieCatalog): The movies, with their genres when loaded.
+    prior_count (float, optional): Weight of the global mean in every score, in
+                                   ratings. Defaults to the 90th percentile of
+                                   the rating counts of the rated movies.
+
+    Returns:
+    PopularityRanking: The ranking.
+    """
+    counts = np.zeros(len(catalog))
+    sums = np.zeros(len(catalog))
+    positions = catalog.positions(matrix.movie_ids)
+    known = positions >= 0
+    counts[positions[known]] = matrix.movie_counts[known]
+    sums[positions[known]] = matrix.movie_counts[known] * matrix.movie_means[known]
+
+    rated = counts > 0
+    global_mean = sums.sum() / counts.sum() if rated.any() else 0.0
+    if prior_count is None:
+        prior_count = float(np.percentile(counts[rated], 90)) if rated.any() else 1.0
+    scores = np.where(rated, (sums + prior_count * global_mean) / (counts + prior_count), -np.inf)
+
+    order = np.lexsort((catalog.movie_ids, -scores))
+    genre_ranks = {}
+    if catalog.genres is not None:
+        rank_of = np.empty(len(order), dtype=np.int32)
+        rank_of[order] = np.arange(len(order), dtype=np.int32)
+        members = {}
+        for position, genres in enumerate(catalog.genres):
+            for genre in str(genres).split('|'):
+                if genre and genre != NO_GENRES:
+                    members.setdefault(genre, []).append(position)
+        genre_ranks = {genre: np.sort(rank_of[positions]) for genre, positions in members.items()}
+
+    return PopularityRanking(catalog.movie_ids[order], scores[order], genre_ranks)
+
+
+def favorite_genres(catalog, movie_ids, ratings, limit=3):
+    """
+    Return the genres a user rates best, from the few ratings they have.
+
+    Every genre is scored by the sum of the user's ratings above their own
+    mean for movies of that genre; genres with a positive score are
+    returned, best first.
+
+    Parameters:
+    catalog (MovieCatalog): The movies, with their genres.
+    movie_ids (array-like): The movieIds the user rated.
+    ratings (array-like): The user's ratings of those movies.
+    limit (int, optional): The number of genres to return at most. Defaults to 3.
+
+    Returns:
+    list: Genre names.
+    """
+    ratings = np.asarray(ratings, dtype=float)
+    if catalog.genres is None or not len(ratings):
+        return []
+    positions = catalog.positions(movie_ids)
+    # With a single rating, or all ratings equal, every rated genre counts as liked
+    deviations = ratings - ratings.mean() if ratings.std() > 0 else np.ones(len(ratings))
+    weights = {}
+    for position, deviation in zip(positions, deviations):
+        if position < 0:
+            continue
+        for genre in str(catalog.genres[position]).split('|'):
+            if genre and genre != NO_GENRES:
+                weights[genre] = weights.get(genre, 0.0) + deviation
+    ranked = sorted((genre for genre, weight in weights.items() if weight > 0), key=lambda genre: -weights[genre])
+    return ranked[:limit]
@@ -0,0 +1,82 @@
+# recommender/precompute.py
+
+import datetime
+import logging
+
+from django.db import DatabaseError
+from django.utils import timezone
+
+from recommender.conf import get_setting, settings_available
+from recommender.metrics import PRECOMPUTED_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+def get_precomputed_movies(user_id, model_version):
+    """
+    Return a user's precomputed ranked list, or None if there is no fresh one.
+
+    A row is fresh when it was computed with the given model version and, if
+    the RECOMMENDER_PRECOMPUTED_MAX_AGE setting is set, at most that many
+    seconds ago. The lookup goes through the unique index on user_id, and is
+    skipped when the RECOMMENDER_USE_PRECOMPUTED setting is False.
+
+    Parameters:
+    user_id (int): The ID of the user.
+    model_version (str): Token identifying the engine and model in use.
+
+    Returns:
+    list or None: The ranked movieIds, best first.
+    """
+    if not settings_available() or not get_setting('RECOMMENDER_USE_PRECOMPUTED', True):
+        return None
+    from recommender.models import PrecomputedRecommendation
+
+    rows = PrecomputedRecommendation.objects.filter(user_id=user_id, model_version=model_version)
+    max_age = get_setting('RECOMMENDER_PRECOMPUTED_MAX_AGE', None)
+    if max_age is not None:
+        rows = rows.filter(computed_at__gte=timezone.now() - datetime.timedelta(seconds=max_age))
+    try:
+        movie_ids = rows.values_list('movie_ids', flat=True).first()
+    except DatabaseError:
+        # e.g. the migrations have not been applied; fall back to computing the list
+        logger.warning("Could not read precomputed recommendations", exc_info=True)
+        return None
+    PRECOMPUTED_REQUESTS.inc(result='miss' if movie_ids is None else 'hit')
+    return movie_ids
+
+
+def store_precomputed_movies(rankings, model_version, batch_size=1000):
+    """
+    Insert or replace the ranked lists of many users.
+
+    Parameters:
+    rankings (dict): Ranked movieIds per user ID.
+    model_version (str): Token identifying the engine and model that produced them.
+    batch_size (int, optional): Number of rows per INSERT statement. Defaults to 1000.
+
+    Returns:
+    int: The number of rows written.
+    """
+    from recommender.models import PrecomputedRecommendation
+
+    computed_at = timezone.now()
+    rows = [PrecomputedRecommendation(user_id=int(user_id), movie_ids=[int(movie_id) for movie_id in movie_ids],
+                                      model_version=model_version, computed_at=computed_at)
+            for user_id, movie_ids in rankings.items()]
+    PrecomputedRecommendation.objects.bulk_create(
+        rows, batch_size=batch_size, update_conflicts=True, unique_fields=['user_id'],
+        update_fields=['movie_ids', 'model_version', 'computed_at'],
+    )
+    return len(rows)
+
+
+def discard_precomputed_movies(user_ids):
+    """
+    Delete the precomputed ranked lists of some users, e.g. after their ratings changed.
+    """
+    if not settings_available():
+        return
+    from recommender.models import PrecomputedRecommendation
+
+    PrecomputedRecommendation.objects.filter(user_id__in=list(user_ids)).delete()
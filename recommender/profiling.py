@@ -0,0 +1,89 @@
+# recommender/profiling.py
+
+import cProfile
+import functools
+import io
+import logging
+import os
+import pstats
+import time
+
+from recommender.conf import get_setting
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = 'X-Profile'
+PROFILE_PARAMETER = 'profile'
+
+
+def profile_request(view):
+    """
+    Run a view under cProfile when the request asks for it.
+
+    Profiling only happens when the RECOMMENDER_PROFILING setting is True and
+    the request has an 'X-Profile: 1' header or a 'profile=1' query parameter;
+    otherwise the view runs untouched. The profile is written as a .prof file
+    to the RECOMMENDER_PROFILE_DIR directory, the functions with the highest
+    cumulative time are logged, and the response carries the file name in an
+    X-Profile-File header and a one-line summary in X-Profile-Summary.
+    """
+    @functools.wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if not _profiling_requested(request):
+            return view(request, *args, **kwargs)
+
+        profiler = cProfile.Profile()
+        response = profiler.runcall(view, request, *args, **kwargs)
+
+        path = _profile_path(view.__name__)
+        profiler.dump_stats(path)
+        stats = pstats.Stats(profiler)
+        limit = get_setting('RECOMMENDER_PROFILE_TOP', 10)
+        logger.info("Profile of %s written to %s\n%s", request.path, path, format_stats(stats, limit))
+
+        response[f'{PROFILE_HEADER}-File'] = os.path.basename(path)
+        response[f'{PROFILE_HEADER}-Summary'] = summarize_stats(stats, limit)
+        return response
+
+    return wrapper
+
+
+def format_stats(stats, limit=10):
+    """
+    Return the pstats report of the limit functions with the highest cumulative time.
+    """
+    stream = io.StringIO()
+    stats.stream = stream
+    stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(limit)
+    return stream.getvalue()
+
+
+def summarize_stats(stats, limit=10):
+    """
+    Summarize the limit functions with the highest cumulative time on one line.
+
+    Returns:
+    str: Entries like 'recommendations.py:321(rank_movies)=12.3ms', separated by '; '.
+    """
+    rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)[:limit]
+    return '; '.join(f'{_function_name(function)}={cumulative * 1000:.1f}ms'
+                     for function, (_, _, _, cumulative, _) in rows)
+
+
+def _function_name(function):
+    filename, line, name = function
+    if filename == '~':
+        return name
+    return f'{os.path.basename(filename)}:{line}({name})'
+
+
+def _profiling_requested(request):
+    if not get_setting('RECOMMENDER_PROFILING', False):
+        return False
+    return request.headers.get(PROFILE_HEADER) == '1' or request.GET.get(PROFILE_PARAMETER) == '1'
+
+
+def _profile_path(name):
+    directory = str(get_setting('RECOMMENDER_PROFILE_DIR', 'profiles'))
+    os.makedirs(directory, exist_ok=True)
+    return os.path.join(directory, f'{name}-{time.time_ns()}-{os.getpid()}.prof')
@@ -0,0 +1,579 @@
+# recommender/rating_matrix.py
+
+import threading
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+Compressed = namedtuple('Compressed', ['indptr', 'indices', 'data'])
+Pending = namedtuple('Pending', ['rows', 'cols', 'values'])
+Storage = namedtuple('Storage', ['csr', 'csc', 'pending'])
+Overrides = namedtuple('Overrides', ['csr_positions', 'csr_values', 'csc_positions', 'csc_values'])
+
+MATRIX_ARRAYS = ('user_ids', 'movie_ids', 'user_positions', 'movie_positions', 'indptr', 'indices', 'data',
+                 'csc_indptr', 'csc_indices', 'csc_data', 'user_counts', 'movie_counts', 'user_means',
+                 'movie_means', 'user_squared_deviations', 'movie_squared_deviations')
+
+
+class RatingMatrix:
+    """
+    A sparse user-movie rating matrix indexed by userId and movieId.
+
+    The ratings are stored twice, once in compressed sparse row (CSR) layout
+    for per-user access and once in compressed sparse column (CSC) layout for
+    per-movie access. Ids are stored as int32, ratings as float32 by default,
+    and dense position tables give O(1) id to row/column lookups without going
+    through pandas.
+
+    Ratings can be added one at a time with add_rating. A rating for an
+    existing (user, movie) pair is overwritten in place; a new pair goes to a
+    small pending buffer that every accessor takes into account and that is
+    merged into the compressed arrays once it holds compact_threshold entries.
+    The per-user and per-movie counts, means and sums of squared deviations
+    are updated incrementally on every rating. Compressed arrays are swapped
+    as a whole, so readers never see half of a merge.
+
+    Attributes:
+    user_ids (numpy.ndarray): userIds, one per row. Sorted, except for users added later.
+    movie_ids (numpy.ndarray): movieIds, one per column. Sorted, except for movies added later.
+    indptr, indices, data (numpy.ndarray): The CSR arrays. indices holds column positions.
+    csc_indptr, csc_indices, csc_data (numpy.ndarray): The CSC arrays. csc_indices holds row positions.
+    user_counts, movie_counts (numpy.ndarray): Number of ratings per row and per column.
+    user_means, movie_means (numpy.ndarray): Mean rating per row and per column (0.0 when empty).
+    user_squared_deviations, movie_squared_deviations (numpy.ndarray): Sum of squared
+        deviations from the mean per row and per column.
+    revision (int): Number of add_rating calls since the matrix was built, so that
+        anything derived from the ratings can tell when they changed.
+    """
+
+    def __init__(self, user_ids, movie_ids, rows, cols, ratings, dtype=np.float32, compact_threshold=None):
+        """
+        Build the matrix from coordinate arrays.
+
+        Parameters:
+        user_ids (array-like): Sorted, unique userIds labelling the rows.
+        movie_ids (array-like): Sorted, unique movieIds labelling the columns.
+        rows (array-like): Row position of every rating.
+        cols (array-like): Column position of every rating.
+        ratings (array-like): The rating values.
+        dtype (numpy.dtype, optional): Storage dtype of the ratings. Defaults to float32.
+        compact_threshold (int, optional): Number of pending new ratings that triggers
+                                           a merge. Defaults to 1% of the ratings, at least 1024.
+        """
+        self.dtype = np.dtype(dtype)
+        self._lock = threading.Lock()
+        self.user_ids = np.asarray(user_ids, dtype=np.int32)
+        self.movie_ids = np.asarray(movie_ids, dtype=np.int32)
+        self._user_positions = _position_table(self.user_ids)
+        self._movie_positions = _position_table(self.movie_ids)
+        self._build(np.asarray(rows, dtype=np.int32), np.asarray(cols, dtype=np.int32),
+                    np.asarray(ratings, dtype=self.dtype))
+        self.compact_threshold = compact_threshold or max(1024, self.nnz // 100)
+        self.revision = 0
+
+    def _build(self, rows, cols, ratings):
+        n_users, n_movies = len(self.user_ids), len(self.movie_ids)
+
+        order = np.lexsort((cols, rows))
+        user_counts = np.bincount(rows, minlength=n_users).astype(np.int32)
+        indptr = np.zeros(n_users + 1, dtype=np.int64)
+        np.cumsum(user_counts, out=indptr[1:])
+        csr = Compressed(indptr, cols[order], ratings[order])
+
+        order = np.lexsort((rows, cols))
+        movie_counts = np.bincount(cols, minlength=n_movies).astype(np.int32)
+        csc_indptr = np.zeros(n_movies + 1, dtype=np.int64)
+        np.cumsum(movie_counts, out=csc_indptr[1:])
+        csc = Compressed(csc_indptr, rows[order], ratings[order])
+
+        self.user_counts = user_counts
+        self.movie_counts = movie_counts
+        self.user_means, self.user_squared_deviations = _moments(rows, ratings, user_counts)
+        self.movie_means, self.movie_squared_deviations = _moments(cols, ratings, movie_counts)
+        self._storage = Storage(csr, csc, Pending(np.zeros(0, np.int32), np.zeros(0, np.int32),
+                                                  np.zeros(0, self.dtype)))
+        self._pending_index = {}
+        self._overrides = _NO_OVERRIDES
+
+    @classmethod
+    def from_ratings(cls, user_ids, movie_ids, ratings, dtype=np.float32):
+        """
+        Build the matrix from parallel arrays of (userId, movieId, rating).
+
+        If the same (userId, movieId) pair appears more than once, the last
+        rating wins.
+        """
+        user_ids = np.asarray(user_ids)
+        movie_ids = np.asarray(movie_ids)
+        ratings = np.asarray(ratings)
+
+        unique_users, rows = np.unique(user_ids, return_inverse=True)
+        unique_movies, cols = np.unique(movie_ids, return_inverse=True)
+
+        # Keep the last occurrence of duplicated pairs
+        keys = rows.astype(np.int64) * len(unique_movies) + cols
+        _, last = np.unique(keys[::-1], return_index=True)
+        keep = len(keys) - 1 - last
+
+        return cls(unique_users, unique_movies, rows[keep], cols[keep], ratings[keep], dtype=dtype)
+
+    @classmethod
+    def from_frame(cls, frame, dtype=np.float32):
+        """
+        Build the matrix from a ratings DataFrame with userId, movieId and rating columns.
+        """
+        return cls.from_ratings(frame['userId'].to_numpy(), frame['movieId'].to_numpy(),
+                                frame['rating'].to_numpy(), dtype=dtype)
+
+    @classmethod
+    def from_pivot(cls, user_item_matrix, dtype=np.float64):
+        """
+        Build the matrix from a dense pivot table (users as rows, movies as columns).
+
+        Missing ratings are NaN. Rows and columns are kept even when they hold
+        no ratings, so the shape matches the pivot table.
+        """
+        index = user_item_matrix.index.to_numpy()
+        columns = user_item_matrix.columns.to_numpy()
+        values = user_item_matrix.to_numpy(dtype=np.float64)
+        rows, cols = np.nonzero(~np.isnan(values))
+
+        user_order = np.argsort(index, kind='stable')
+        movie_order = np.argsort(columns, kind='stable')
+        user_rank = np.empty_like(user_order)
+        user_rank[user_order] = np.arange(len(index))
+        movie_rank = np.empty_like(movie_order)
+        movie_rank[movie_order] = np.arange(len(columns))
+
+        return cls(index[user_order], columns[movie_order], user_rank[rows], movie_rank[cols],
+                   values[rows, cols], dtype=dtype)
+
+    def to_frame(self):
+        """
+        Return the matrix as a dense pivot table, with NaN for missing ratings.
+        """
+        values = np.full(self.shape, np.nan)
+        rows, cols, ratings = self.gather_rows(np.arange(self.shape[0]))
+        values[rows, cols] = ratings
+        return pd.DataFrame(values, index=pd.Index(self.user_ids, name='userId'),
+                            columns=pd.Index(self.movie_ids, name='movieId'))
+
+    @classmethod
+    def from_arrays(cls, arrays, compact_threshold=None):
+        """
+        Wrap the arrays returned by to_arrays, without copying them.
+
+        The arrays may be read-only, e.g. memory-mapped from files shared by
+        several processes. The compressed arrays of such a matrix are never
+        written or copied: add_rating keeps new ratings in the pending buffer
+        and replaced ones in a small table of overrides that every accessor
+        applies, and the pending buffer is not merged automatically. Only the
+        per-user and per-movie statistics are copied, on the first rating.
+
+        Parameters:
+        arrays (dict): One array per name of MATRIX_ARRAYS.
+        compact_threshold (int, optional): See the constructor.
+        """
+        matrix = cls.__new__(cls)
+        matrix.dtype = arrays['data'].dtype
+        matrix._lock = threading.Lock()
+        matrix.user_ids = arrays['user_ids']
+        matrix.movie_ids = arrays['movie_ids']
+        matrix._user_positions = arrays['user_positions']
+        matrix._movie_positions = arrays['movie_positions']
+        for name in ('user_counts', 'movie_counts', 'user_means', 'movie_means', 'user_squared_deviations',
+                     'movie_squared_deviations'):
+            setattr(matrix, name, arrays[name])
+        matrix._storage = Storage(Compressed(arrays['indptr'], arrays['indices'], arrays['data']),
+                                  Compressed(arrays['csc_indptr'], arrays['csc_indices'], arrays['csc_data']),
+                                  Pending(np.zeros(0, np.int32), np.zeros(0, np.int32), np.zeros(0, matrix.dtype)))
+        matrix._pending_index = {}
+        matrix._overrides = _NO_OVERRIDES
+        matrix.compact_threshold = compact_threshold or max(1024, matrix.nnz // 100)
+        matrix.revision = 0
+        return matrix
+
+    def to_arrays(self):
+        """
+        Return every array of the matrix, with the pending ratings merged, keyed by the names of MATRIX_ARRAYS.
+        """
+        matrix = self.compacted()
+        arrays = {name: getattr(matrix, name) for name in MATRIX_ARRAYS if not name.endswith('_positions')}
+        arrays['user_positions'] = matrix._user_positions
+        arrays['movie_positions'] = matrix._movie_positions
+        return arrays
+
+    def compacted(self):
+        """
+        Return a matrix without pending ratings or overrides: self if there are none, else a merged copy.
+        """
+        if not len(self._storage.pending.rows) and not len(self._overrides.csr_positions):
+            return self
+        rows, cols, ratings = self.gather_rows(np.arange(self.shape[0]))
+        return RatingMatrix(self.user_ids, self.movie_ids, rows, cols, ratings, dtype=self.dtype,
+                            compact_threshold=self.compact_threshold)
+
+    @property
+    def indptr(self):
+        return self._storage.csr.indptr
+
+    @property
+    def indices(self):
+        return self._storage.csr.indices
+
+    @property
+    def data(self):
+        return self._storage.csr.data
+
+    @property
+    def csc_indptr(self):
+        return self._storage.csc.indptr
+
+    @property
+    def csc_indices(self):
+        return self._storage.csc.indices
+
+    @property
+    def csc_data(self):
+        return self._storage.csc.data
+
+    @property
+    def shape(self):
+        return len(self.user_ids), len(self.movie_ids)
+
+    @property
+    def nnz(self):
+        return len(self._storage.csr.data) + len(self._storage.pending.rows)
+
+    @property
+    def pending_count(self):
+        """Number of new ratings not merged into the compressed arrays yet."""
+        return len(self._storage.pending.rows)
+
+    @property
+    def nbytes(self):
+        """Total number of bytes held by the matrix arrays."""
+        arrays = [array for array in vars(self).values() if isinstance(array, np.ndarray)]
+        arrays += [array for part in self._storage for array in part]
+        return sum(array.nbytes for array in arrays)
+
+    def has_user(self, user_id):
+        return 0 <= user_id < len(self._user_positions) and self._user_positions[user_id] >= 0
+
+    def user_row(self, user_id):
+        """Return the row position of a userId, raising KeyError if it is unknown."""
+        if not self.has_user(user_id):
+            raise KeyError(user_id)
+        return int(self._user_positions[user_id])
+
+    def movie_column(self, movie_id):
+        """Return the column position of a movieId, raising KeyError if it is unknown."""
+        if not 0 <= movie_id < len(self._movie_positions) or self._movie_positions[movie_id] < 0:
+            raise KeyError(movie_id)
+        return int(self._movie_positions[movie_id])
+
+    def user_rows(self, user_ids):
+        """Vectorized userId to row lookup. Unknown ids map to -1."""
+        return _lookup(self._user_positions, user_ids)
+
+    def movie_columns(self, movie_ids):
+        """Vectorized movieId to column lookup. Unknown ids map to -1."""
+        return _lookup(self._movie_positions, movie_ids)
+
+    def row(self, user_id):
+        """
+        Return the ratings of a user.
+
+        Returns:
+        tuple: (column positions, ratings) of the movies rated by the user. These
+               are views of the CSR arrays unless the user has pending ratings.
+        """
+        position = self.user_row(user_id)
+        csr, _, pending = self._storage
+        start, end = csr.indptr[position], csr.indptr[position + 1]
+        cols, values = csr.indices[start:end], csr.data[start:end]
+        overrides = self._overrides
+        if len(overrides.csr_positions):
+            values = _apply_overrides(np.arange(start, end), values, overrides.csr_positions, overrides.csr_values)
+
+        extra = np.flatnonzero(pending.rows == position)
+        if len(extra):
+            cols = np.concatenate([cols, pending.cols[extra]])
+            values = np.concatenate([values, pending.values[extra]])
+            order = np.argsort(cols, kind='stable')
+            cols, values = cols[order], values[order]
+        return cols, values
+
+    def column(self, movie_id):
+        """
+        Return the ratings of a movie.
+
+        Returns:
+        tuple: (row positions, ratings) of the users who rated the movie. These
+               are views of the CSC arrays unless the movie has pending ratings.
+        """
+        position = self.movie_column(movie_id)
+        _, csc, pending = self._storage
+        start, end = csc.indptr[position], csc.indptr[position + 1]
+        rows, values = csc.indices[start:end], csc.data[start:end]
+        overrides = self._overrides
+        if len(overrides.csc_positions):
+            values = _apply_overrides(np.arange(start, end), values, overrides.csc_positions, overrides.csc_values)
+
+        extra = np.flatnonzero(pending.cols == position)
+        if len(extra):
+            rows = np.concatenate([rows, pending.rows[extra]])
+            values = np.concatenate([values, pending.values[extra]])
+            order = np.argsort(rows, kind='stable')
+            rows, values = rows[order], values[order]
+        return rows, values
+
+    def gather_rows(self, rows):
+        """
+        Collect the ratings of several rows at once, pending ratings included.
+
+        Parameters:
+        rows (array-like): Row positions.
+
+        Returns:
+        tuple: (owner, column positions, ratings), where owner[i] is the index
+               into rows that the i-th rating belongs to.
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        csr, _, pending = self._storage
+
+        starts = csr.indptr[rows]
+        owner, positions = _gather(starts, csr.indptr[rows + 1] - starts)
+        cols, values = csr.indices[positions], csr.data[positions]
+        overrides = self._overrides
+        if len(overrides.csr_positions):
+            values = _apply_overrides(positions, values, overrides.csr_positions, overrides.csr_values)
+
+        if len(pending.rows):
+            order = np.argsort(pending.rows, kind='stable')
+            sorted_rows = pending.rows[order]
+            starts = np.searchsorted(sorted_rows, rows, side='left')
+            extra_owner, extra = _gather(starts, np.searchsorted(sorted_rows, rows, side='right') - starts)
+            extra = order[extra]
+            owner = np.concatenate([owner, extra_owner])
+            cols = np.concatenate([cols, pending.cols[extra]])
+            values = np.concatenate([values, pending.values[extra]])
+
+        return owner, cols, values
+
+    def add_rating(self, user_id, movie_id, rating):
+        """
+        Add or replace one rating, updating the statistics incrementally.
+
+        Unknown users and movies get a new row or column. Replacing a rating
+        costs O(log n) for the lookup in the user's row and the movie's column;
+        a new rating is appended to the pending buffer, which is merged into
+        the compressed arrays when it reaches compact_threshold entries, unless
+        those are read-only (see from_arrays).
+
+        Parameters:
+        user_id (int): The ID of the user.
+        movie_id (int): The ID of the movie.
+        rating (float): The rating.
+
+        Returns:
+        float or None: The rating that was replaced, or None for a new rating.
+        """
+        rating = self.dtype.type(rating)
+        with self._lock:
+            self._ensure_writable_statistics()
+            row = self._ensure_row(int(user_id))
+            col = self._ensure_column(int(movie_id))
+
+            previous = self._replace(row, col, rating)
+            if previous is None:
+                csr, csc, pending = self._storage
+                self._pending_index[row, col] = len(pending.rows)
+                pending = Pending(np.append(pending.rows, np.int32(row)), np.append(pending.cols, np.int32(col)),
+                                  np.append(pending.values, rating))
+                self._storage = Storage(csr, csc, pending)
+                _add_observation(self.user_counts, self.user_means, self.user_squared_deviations, row, rating)
+                _add_observation(self.movie_counts, self.movie_means, self.movie_squared_deviations, col, rating)
+            else:
+                _replace_observation(self.user_means, self.user_squared_deviations, self.user_counts,
+                                     row, previous, rating)
+                _replace_observation(self.movie_means, self.movie_squared_deviations, self.movie_counts,
+                                     col, previous, rating)
+
+            if len(self._storage.pending.rows) >= self.compact_threshold and self._storage.csr.data.flags.writeable:
+                self._compact()
+            self.revision += 1
+
+        return None if previous is None else float(previous)
+
+    def compact(self):
+        """
+        Merge the pending ratings into the compressed arrays now.
+        """
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        if not len(self._storage.pending.rows):
+            return
+        owner, cols, ratings = self.gather_rows(np.arange(self.shape[0]))
+        self._build(owner.astype(np.int32), cols.astype(np.int32), ratings)
+        self.compact_threshold = max(self.compact_threshold, self.nnz // 100)
+
+    def _replace(self, row, col, rating):
+        index = self._pending_index.get((row, col))
+        if index is not None:
+            pending = self._storage.pending
+            previous = pending.values[index]
+            pending.values[index] = rating
+            return previous
+
+        csr, csc, _ = self._storage
+        start, end = csr.indptr[row], csr.indptr[row + 1]
+        position = start + np.searchsorted(csr.indices[start:end], col)
+        if position == end or csr.indices[position] != col:
+            return None
+        start, end = csc.indptr[col], csc.indptr[col + 1]
+        csc_position = start + np.searchsorted(csc.indices[start:end], row)
+
+        if csr.data.flags.writeable:
+            previous = csr.data[position]
+            csr.data[position] = rating
+            csc.data[csc_position] = rating
+            return previous
+
+        # Read-only compressed arrays: record the new value as an override instead
+        overrides = self._overrides
+        found = np.flatnonzero(overrides.csr_positions == position)
+        previous = overrides.csr_values[found[0]] if len(found) else csr.data[position]
+        self._overrides = _add_override(overrides, position, csc_position, rating)
+        return previous
+
+    def _ensure_writable_statistics(self):
+        # The statistics of a matrix attached read-only (see from_arrays) are small enough to copy
+        for name in ('user_counts', 'movie_counts', 'user_means', 'movie_means', 'user_squared_deviations',
+                     'movie_squared_deviations'):
+            array = getattr(self, name)
+            if not array.flags.writeable:
+                setattr(self, name, np.array(array))
+
+    def _ensure_row(self, user_id):
+        if self.has_user(user_id):
+            return int(self._user_positions[user_id])
+        position = len(self.user_ids)
+        self._user_positions = _extend_position_table(self._user_positions, user_id, position)
+        self.user_counts = np.append(self.user_counts, np.int32(0))
+        self.user_means = np.append(self.user_means, 0.0)
+        self.user_squared_deviations = np.append(self.user_squared_deviations, 0.0)
+        csr, csc, pending = self._storage
+        self._storage = Storage(Compressed(np.append(csr.indptr, csr.indptr[-1]), csr.indices, csr.data),
+                                csc, pending)
+        self.user_ids = np.append(self.user_ids, np.int32(user_id))
+        return position
+
+    def _ensure_column(self, movie_id):
+        if 0 <= movie_id < len(self._movie_positions) and self._movie_positions[movie_id] >= 0:
+            return int(self._movie_positions[movie_id])
+        position = len(self.movie_ids)
+        self._movie_positions = _extend_position_table(self._movie_positions, movie_id, position)
+        self.movie_counts = np.append(self.movie_counts, np.int32(0))
+        self.movie_means = np.append(self.movie_means, 0.0)
+        self.movie_squared_deviations = np.append(self.movie_squared_deviations, 0.0)
+        csr, csc, pending = self._storage
+        self._storage = Storage(csr, Compressed(np.append(csc.indptr, csc.indptr[-1]), csc.indices, csc.data),
+                                pending)
+        self.movie_ids = np.append(self.movie_ids, np.int32(movie_id))
+        return position
+
+
+def as_rating_matrix(user_item_matrix):
+    """
+    Accept either a RatingMatrix or a dense pivot DataFrame and return a RatingMatrix.
+    """
+    if isinstance(user_item_matrix, RatingMatrix):
+        return user_item_matrix
+    return RatingMatrix.from_pivot(user_item_matrix)
+
+
+def _moments(positions, ratings, counts):
+    ratings = ratings.astype(np.float64)
+    sums = np.bincount(positions, weights=ratings, minlength=len(counts))
+    means = np.divide(sums, counts, out=np.zeros(len(counts)), where=counts > 0)
+    deviations = np.bincount(positions, weights=(ratings - means[positions]) ** 2, minlength=len(counts))
+    return means, deviations
+
+
+def _add_observation(counts, means, squared_deviations, position, value):
+    # Welford's online update of the mean and the sum of squared deviations
+    counts[position] += 1
+    delta = float(value) - means[position]
+    means[position] += delta / counts[position]
+    squared_deviations[position] += delta * (float(value) - means[position])
+
+
+def _replace_observation(means, squared_deviations, counts, position, old, new):
+    n = counts[position]
+    old, new = float(old), float(new)
+    mean = means[position] + (new - old) / n
+    squared_deviations[position] += (new - old) * (new - mean + old - means[position])
+    means[position] = mean
+
+
+def _position_table(ids):
+    size = int(ids.max()) + 1 if len(ids) else 0
+    table = np.full(size, -1, dtype=np.int32)
+    table[ids] = np.arange(len(ids), dtype=np.int32)
+    return table
+
+
+def _extend_position_table(table, new_id, position):
+    if new_id < 0:
+        raise KeyError(new_id)
+    if new_id >= len(table):
+        table = np.concatenate([table, np.full(max(new_id + 1 - len(table), len(table) // 4), -1, np.int32)])
+    else:
+        table = table.copy()
+    table[new_id] = position
+    return table
+
+
+def _lookup(table, ids):
+    ids = np.asarray(ids, dtype=np.int64)
+    inside = (ids >= 0) & (ids < len(table))
+    positions = np.full(ids.shape, -1, dtype=np.int32)
+    positions[inside] = table[ids[inside]]
+    return positions
+
+
+_NO_OVERRIDES = Overrides(np.zeros(0, np.int64), np.zeros(0, np.float32), np.zeros(0, np.int64),
+                          np.zeros(0, np.float32))
+
+
+def _add_override(overrides, csr_position, csc_position, value):
+    # Keep both position arrays sorted, with at most one entry per position
+    def update(positions, values, position):
+        keep = positions != position
+        positions, values = np.append(positions[keep], position), np.append(values[keep], value)
+        order = np.argsort(positions, kind='stable')
+        return positions[order], values[order]
+
+    csr_positions, csr_values = update(overrides.csr_positions, overrides.csr_values, csr_position)
+    csc_positions, csc_values = update(overrides.csc_positions, overrides.csc_values, csc_position)
+    return Overrides(csr_positions, csr_values, csc_positions, csc_values)
+
+
+def _apply_overrides(positions, values, override_positions, override_values):
+    found = np.minimum(np.searchsorted(override_positions, positions), len(override_positions) - 1)
+    hit = override_positions[found] == positions
+    if not hit.any():
+        return values
+    values = np.array(values)
+    values[hit] = override_values[found[hit]]
+    return values
+
+
+def _gather(starts, lengths):
+    owner = np.repeat(np.arange(len(starts)), lengths)
+    offsets = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    return owner, starts[owner] + offsets
@@ -0,0 +1,99 @@
+# recommender/registry.py
+
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+import joblib
+
+logger = logging.getLogger(__name__)
+
+LoadedModel = namedtuple('LoadedModel', ['version', 'model', 'loaded_at'])
+
+
+class ModelRegistry:
+    """
+    Process-wide holder for a model artifact.
+
+    The artifact is loaded once and the same object is handed out to every
+    caller. On access, at most once per check_interval seconds, the file's
+    modification time and size are compared with the loaded version; when
+    they differ the artifact is loaded again and swapped in with a single
+    reference assignment, so readers always see either the old or the new
+    model, never a partially loaded one.
+
+    Parameters:
+    path (str): Path of the model artifact.
+    loader (callable, optional): Function that loads the artifact from a path.
+                                 Defaults to joblib.load.
+    check_interval (float, optional): Minimum number of seconds between two
+                                      checks of the artifact on disk. Defaults to 1.0.
+    """
+
+    def __init__(self, path, loader=joblib.load, check_interval=1.0):
+        self.path = path
+        self.loader = loader
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._loaded = None
+        self._last_check = None
+
+    def get(self):
+        """
+        Return the loaded model, loading or reloading it if needed.
+        """
+        return self._current().model
+
+    @property
+    def version(self):
+        """
+        The version token of the loaded model, derived from the artifact's mtime and size.
+        """
+        return self._current().version
+
+    def reload(self):
+        """
+        Force a check of the artifact on disk, reloading it if it changed.
+        """
+        with self._lock:
+            return self._refresh()
+
+    def _current(self):
+        loaded = self._loaded
+        last_check = self._last_check
+        if loaded is not None and time.monotonic() - last_check < self.check_interval:
+            return loaded
+
+        with self._lock:
+            # Another thread may have refreshed while we waited for the lock
+            if self._loaded is not None and time.monotonic() - self._last_check < self.check_interval:
+                return self._loaded
+            return self._refresh()
+
+    def _refresh(self):
+        self._last_check = time.monotonic()
+        version = self._artifact_version()
+        if self._loaded is not None and self._loaded.version == version:
+            return self._loaded
+
+        try:
+            model = self.loader(self.path)
+        except Exception:
+            if self._loaded is None:
+                raise
+            logger.exception("Failed to reload model from %s, keeping version %s", self.path, self._loaded.version)
+            return self._loaded
+
+        # If the file changed while it was being read, serve it but check again next time
+        if self._artifact_version() != version:
+            version = None
+
+        self._loaded = LoadedModel(version, model, time.time())
+        logger.info("Loaded model from %s (version %s)", self.path, version)
+        return self._loaded
+
+    def _artifact_version(self):
+        stat = os.stat(self.path)
+        return f"{stat.st_mtime_ns:x}-{stat.st_size:x}"
@@ -0,0 +1,118 @@
+# recommender/shared.py
+
+import os
+import shutil
+from collections import namedtuple
+
+import numpy as np
+
+from recommender.artifacts import replace_directory
+from recommender.dataset import MovieLensDataset, decode_movie_arrays, encode_movie_arrays
+from recommender.rating_matrix import MATRIX_ARRAYS, RatingMatrix
+
+CURRENT_FILE = 'CURRENT'
+GENERATION_PREFIX = 'generation-'
+
+SharedDataset = namedtuple('SharedDataset', ['generation', 'dataset'])
+
+
+def publish_dataset(dataset, root, keep=2):
+    """
+    Write a dataset as a new generation of memory-mappable arrays under root.
+
+    Every array of the compacted rating matrix is saved as a .npy file in
+    root/generation-NNNNNN/, next to the movie and link columns (titles and
+    genres as UTF-8 bytes plus offsets). The generation is written to a
+    temporary directory, renamed into place, and only then named in the
+    CURRENT file, which is itself replaced atomically; so a process
+    attaching at any moment sees a complete generation. With root on a
+    tmpfs such as /dev/shm the files never touch the disk, and every worker
+    that attaches maps the same physical pages.
+
+    Parameters:
+    dataset (MovieLensDataset): The dataset to publish.
+    root (str): Directory holding the generations.
+    keep (int, optional): Number of generations kept, the new one included. Older ones
+                          are deleted; processes still mapping them keep their pages. Defaults to 2.
+
+    Returns:
+    int: The number of the published generation.
+    """
+    os.makedirs(root, exist_ok=True)
+    generations = list_generations(root)
+    generation = generations[-1] + 1 if generations else 1
+    directory = os.path.join(root, f'{GENERATION_PREFIX}{generation:06d}')
+
+    arrays = {f'matrix_{name}': array for name, array in dataset.matrix.to_arrays().items()}
+    arrays.update(encode_movie_arrays(dataset.movies, dataset.links))
+    arrays['rating_event_id'] = np.array(dataset.rating_event_id, dtype=np.int64)
+
+    def write(temporary):
+        for name, array in arrays.items():
+            np.save(os.path.join(temporary, f'{name}.npy'), array)
+
+    replace_directory(directory, write)
+
+    current = os.path.join(root, CURRENT_FILE)
+    with open(f'{current}.tmp-{os.getpid()}', 'w') as file:
+        file.write(f'{os.path.basename(directory)}\n')
+    os.replace(f'{current}.tmp-{os.getpid()}', current)
+
+    for old in generations[:max(len(generations) + 1 - keep, 0)]:
+        shutil.rmtree(os.path.join(root, f'{GENERATION_PREFIX}{old:06d}'), ignore_errors=True)
+    return generation
+
+
+def attach_dataset(root, compact_threshold=None):
+    """
+    Open the current generation published under root.
+
+    The rating matrix wraps the memory-mapped arrays read-only, without
+    copying them; ratings added afterwards with RatingMatrix.add_rating are
+    kept on top of them in the process (see RatingMatrix.from_arrays). The
+    movie columns are small and are decoded into the process. The dataset
+    remembers the last rating event it includes, so only later events are
+    applied on top, and its source is the name of the generation.
+
+    Returns:
+    SharedDataset: The generation number and the dataset.
+
+    Raises:
+    FileNotFoundError: If nothing was published under root.
+    """
+    generation = current_generation(root)
+    if generation is None:
+        raise FileNotFoundError(os.path.join(root, CURRENT_FILE))
+    directory = os.path.join(root, f'{GENERATION_PREFIX}{generation:06d}')
+
+    arrays = {name[:-len('.npy')]: np.load(os.path.join(directory, name), mmap_mode='r')
+              for name in os.listdir(directory) if name.endswith('.npy')}
+    matrix = RatingMatrix.from_arrays({name: arrays[f'matrix_{name}'] for name in MATRIX_ARRAYS}, compact_threshold)
+    movies, links = decode_movie_arrays(arrays)
+    dataset = MovieLensDataset(movies, None, links, matrix=matrix)
+    dataset.rating_event_id = int(arrays['rating_event_id'])
+    dataset.source = os.path.basename(directory)
+    return SharedDataset(generation, dataset)
+
+
+def current_generation(root):
+    """
+    Return the number of the generation named in root/CURRENT, or None if nothing was published.
+    """
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as file:
+            name = file.read().strip()
+    except FileNotFoundError:
+        return None
+    return int(name[len(GENERATION_PREFIX):])
+
+
+def list_generations(root):
+    """
+    Return the numbers of the complete generations under root, in increasing order.
+    """
+    if not os.path.isdir(root):
+        return []
+    return sorted(int(name[len(GENERATION_PREFIX):]) for name in os.listdir(root)
+                  if name.startswith(GENERATION_PREFIX) and name[len(GENERATION_PREFIX):].isdigit())
+
@@ -0,0 +1,88 @@
+import io
+import json
+import os
+import tempfile
+from unittest.mock import patch
+
+import numpy as np
+from django.core.management import CommandError, call_command
+from django.test import TestCase
+
+import recommendations
+from recommender.benchmarks import compare_reports, run_benchmarks, synthetic_dataset
+
+
+class SyntheticDatasetTest(TestCase):
+
+    def test_scaled_dataset_keeps_rating_profile(self):
+        base = recommendations.get_dataset()
+
+        dataset = synthetic_dataset(base, 4, seed=1)
+
+        matrix = dataset.matrix
+        self.assertEqual(matrix.shape[0], 4 * base.matrix.shape[0])
+        self.assertEqual(len(dataset.catalog), 2 * base.matrix.shape[1])
+        self.assertFalse(dataset.ratings.duplicated(['userId', 'movieId']).any())
+        self.assertTrue(dataset.ratings['rating'].between(0.5, 5.0).all())
+        self.assertTrue(np.all(dataset.ratings['rating'] * 2 == np.round(dataset.ratings['rating'] * 2)))
+        # Same ratings per user on average, up to the duplicates drawn for popular movies
+        self.assertAlmostEqual(matrix.user_counts.mean() / base.matrix.user_counts.mean(), 1.0, delta=0.15)
+        self.assertEqual(synthetic_dataset(base, 4, seed=1).matrix.nnz, matrix.nnz)
+
+
+class BenchmarkReportTest(TestCase):
+
+    def test_report_covers_every_case(self):
+        dataset = synthetic_dataset(recommendations.get_dataset(), 0.2, seed=2)
+
+        report = run_benchmarks({'tiny': dataset}, repeat=2)
+
+        cases = report['datasets']['tiny']['cases']
+        self.assertEqual(set(cases), {'hybrid_recommendation_score', 'hybrid_recommendation_scores',
+                                      'hybrid_recommend_movies', 'make_hybrid_recommendations', 'recommend_view'})
+        self.assertTrue(all(result['calls'] == 2 and result['median_ms'] > 0 for result in cases.values()))
+        json.dumps(report)
+        self.assertIsNot(recommendations.get_dataset(), dataset)
+
+        report = run_benchmarks({'tiny': dataset}, cases=['hybrid_recommendation_score'], repeat=1,
+                                max_dense_cells=10)
+        self.assertIn('skipped', report['datasets']['tiny']['cases']['hybrid_recommendation_score'])
+
+    def test_view_requests_the_sampled_users(self):
+        dataset = synthetic_dataset(recommendations.get_dataset(), 0.2, seed=2)
+
+        with patch('recommender.views.make_hybrid_recommendations',
+                   wraps=recommendations.make_hybrid_recommendations) as make_hybrid_recommendations:
+            run_benchmarks({'tiny': dataset}, cases=['recommend_view'], repeat=3)
+
+        requested = [call.args[0] for call in make_hybrid_recommendations.call_args_list]
+        self.assertEqual(len(requested), 4)
+        self.assertTrue(all(dataset.matrix.has_user(user_id) for user_id in requested))
+
+    def test_compare_flags_regressions(self):
+        baseline = {'datasets': {'d': {'cases': {'fast': {'median_ms': 10.0}, 'slow': {'median_ms': 10.0}}}}}
+        report = {'datasets': {'d': {'cases': {'fast': {'median_ms': 11.0}, 'slow': {'median_ms': 13.0},
+                                               'new': {'median_ms': 1.0}}}}}
+
+        comparisons = {comparison['case']: comparison for comparison in compare_reports(report, baseline, 0.2)}
+
+        self.assertEqual(set(comparisons), {'fast', 'slow'})
+        self.assertFalse(comparisons['fast']['regression'])
+        self.assertTrue(comparisons['slow']['regression'])
+
+    def test_command_writes_report_and_fails_on_regression(self):
+        with tempfile.TemporaryDirectory() as directory:
+            output = os.path.join(directory, 'report.json')
+            call_command('benchmark', scales=[0.2], cases=['hybrid_recommend_movies'], repeat=1,
+                         output=output, stdout=io.StringIO())
+            with open(output) as file:
+                report = json.load(file)
+            self.assertIn('synthetic-0.2x', report['datasets'])
+
+            report['datasets']['synthetic-0.2x']['cases']['hybrid_recommend_movies']['median_ms'] = 1e-6
+            baseline = os.path.join(directory, 'baseline.json')
+            with open(baseline, 'w') as file:
+                json.dump(report, file)
+            with self.assertRaises(CommandError):
+                call_command('benchmark', scales=[0.2], cases=['hybrid_recommend_movies'], repeat=1,
+                             baseline=baseline, stdout=io.StringIO())
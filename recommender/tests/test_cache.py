@@ -0,0 +1,91 @@
+from unittest.mock import Mock, patch
+
+import pandas as pd
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+
+import recommendations
+from recommender.cache import get_ranked_movies, invalidate_user
+
+TEST_CACHES = {
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'recommendations': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'recommendations-tests',
+        'TIMEOUT': 60,
+        'OPTIONS': {'MAX_ENTRIES': 100},
+    },
+}
+
+
+@override_settings(CACHES=TEST_CACHES, RECOMMENDER_CACHE_ALIAS='recommendations')
+class RecommendationCacheTest(TestCase):
+
+    def setUp(self):
+        caches['recommendations'].clear()
+
+    def test_second_request_is_served_from_cache(self):
+        compute = Mock(return_value=[3, 1, 2])
+
+        first = get_ranked_movies(7, 'hybrid:v1', compute)
+        second = get_ranked_movies(7, 'hybrid:v1', compute)
+
+        self.assertEqual(first, [3, 1, 2])
+        self.assertEqual(second, [3, 1, 2])
+        compute.assert_called_once_with()
+
+    def test_model_version_change_recomputes(self):
+        get_ranked_movies(7, 'hybrid:v1', Mock(return_value=[1]))
+
+        result = get_ranked_movies(7, 'hybrid:v2', Mock(return_value=[2]))
+
+        self.assertEqual(result, [2])
+        self.assertEqual(get_ranked_movies(7, 'hybrid:v2', Mock(return_value=[3])), [2])
+
+    def test_invalidate_user(self):
+        get_ranked_movies(7, 'hybrid:v1', Mock(return_value=[1]))
+        get_ranked_movies(8, 'hybrid:v1', Mock(return_value=[1]))
+
+        invalidate_user(7)
+
+        self.assertEqual(get_ranked_movies(7, 'hybrid:v1', Mock(return_value=[5])), [5])
+        self.assertEqual(get_ranked_movies(8, 'hybrid:v1', Mock(return_value=[5])), [1])
+
+    def test_sampling_runs_per_request_on_cached_list(self):
+        with patch('recommendations.rank_movies', wraps=recommendations.rank_movies) as rank_movies:
+            first = recommendations.make_hybrid_recommendations(1, seed=1)
+            second = recommendations.make_hybrid_recommendations(1, seed=2)
+            third = recommendations.make_hybrid_recommendations(1, seed=1)
+
+        rank_movies.assert_called_once()
+        self.assertEqual(first, third)
+        self.assertNotEqual(first, second)
+        self.assertEqual(first, recommendations.hybrid_recommend_movies(1, recommendations.user_item_matrix, seed=1))
+
+
+class ModelVersionTest(TestCase):
+
+    def setUp(self):
+        dataset = recommendations.MovieLensDataset(
+            pd.DataFrame({'movieId': [1, 2], 'title': ['A', 'B'], 'genres': ['Comedy', 'Drama']}),
+            pd.DataFrame({'userId': [1, 2], 'movieId': [1, 2], 'rating': [4.0, 3.0]}))
+        for name, value in (('_dataset', dataset), ('_dataset_fingerprint', None)):
+            patcher = patch(f'recommendations.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.dataset = dataset
+
+    def test_version_follows_settings_n_and_dataset_source(self):
+        version = recommendations.model_version('hybrid')
+
+        self.assertEqual(recommendations.model_version('hybrid'), version)
+        self.assertLessEqual(len(version), 64)
+        self.assertNotEqual(recommendations.model_version('hybrid', N=50), version)
+        with override_settings(RECOMMENDER_CONTENT_WEIGHT=0.3):
+            self.assertNotEqual(recommendations.model_version('hybrid'), version)
+        # New ratings only invalidate the lists of their users (see recommendations.add_ratings)
+        self.dataset.matrix.add_rating(1, 2, 5.0)
+        self.assertEqual(recommendations.model_version('hybrid'), version)
+        self.dataset.source = 'generation-000002'
+        with patch('recommendations._dataset_fingerprint', None):
+            self.assertNotEqual(recommendations.model_version('hybrid'), version)
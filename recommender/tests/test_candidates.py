@@ -0,0 +1,96 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from django.test import override_settings
+
+import recommendations
+from recommendations import hybrid_rank_movies, hybrid_recommendation_score_matrix
+from recommender import metrics
+from recommender.candidates import candidate_columns, genre_columns
+from recommender.catalog import MovieCatalog
+from recommender.rating_matrix import RatingMatrix
+
+
+class CandidateColumnsTest(unittest.TestCase):
+
+    def setUp(self):
+        ratings = pd.DataFrame({
+            'userId': [1, 1, 2, 2, 3, 3, 3],
+            'movieId': [10, 20, 10, 30, 10, 20, 40],
+            'rating': [4.0, 3.0, 5.0, 2.0, 3.0, 4.0, 1.0],
+        })
+        self.matrix = RatingMatrix.from_frame(ratings)
+        movies = pd.DataFrame({'movieId': [10, 20, 30, 40], 'title': ['A', 'B', 'C', 'D'],
+                               'genres': ['Comedy', 'Drama|Comedy', 'Horror', '(no genres listed)']})
+        self.catalog = MovieCatalog.from_frames(movies)
+
+    def test_minimum_rating_count(self):
+        columns = candidate_columns(self.matrix, min_ratings=2)
+
+        np.testing.assert_array_equal(self.matrix.movie_ids[columns], [10, 20])
+
+    def test_genre_restriction(self):
+        mask = genre_columns(self.matrix, self.catalog, ['Comedy', 'Western'])
+
+        np.testing.assert_array_equal(self.matrix.movie_ids[mask], [10, 20])
+        columns = candidate_columns(self.matrix, genre_mask=genre_columns(self.matrix, self.catalog, ['Horror']))
+        np.testing.assert_array_equal(self.matrix.movie_ids[columns], [30])
+
+
+class CandidateScoringTest(unittest.TestCase):
+
+    def setUp(self):
+        self.matrix = recommendations.user_item_matrix
+
+    def test_candidate_scores_match_full_scores(self):
+        user_ids = self.matrix.user_ids[:5]
+        candidates = candidate_columns(self.matrix, min_ratings=5)
+
+        scores = hybrid_recommendation_score_matrix(user_ids, self.matrix, candidates)
+
+        np.testing.assert_array_equal(scores, hybrid_recommendation_score_matrix(user_ids, self.matrix)[:, candidates])
+
+    def test_minimum_common_entries(self):
+        full = hybrid_recommendation_score_matrix([1], self.matrix)[0]
+        scores = hybrid_recommendation_score_matrix([1], self.matrix, min_common=3)[0]
+
+        # A single common entry always correlates at exactly +1 or -1
+        self.assertTrue(np.isin(full[(full != 0) & (scores == 0)], [-1.0, 1.0]).any())
+        np.testing.assert_array_equal(scores[scores != 0], full[scores != 0])
+
+    def test_ranking_is_restricted_to_candidates(self):
+        candidates = candidate_columns(self.matrix, min_ratings=20)
+
+        ranked = hybrid_rank_movies(1, self.matrix, N=20, candidates=candidates)
+
+        self.assertTrue(np.isin(ranked, self.matrix.movie_ids[candidates]).all())
+        self.assertEqual(len(ranked), 20)
+
+    @override_settings(RECOMMENDER_MIN_MOVIE_RATINGS=3, RECOMMENDER_MIN_COMMON_RATINGS=2,
+                       RECOMMENDER_CANDIDATE_GENRES=['Comedy'])
+    def test_batch_and_single_rankings_use_the_pool(self):
+        observed = metrics.CANDIDATE_MOVIES.count()
+        pool = recommendations.candidate_pool()
+
+        ranked = dict(recommendations.rank_users([1, 3], 'hybrid'))
+
+        for user_id in (1, 3):
+            np.testing.assert_array_equal(ranked[user_id], recommendations.rank_movies(user_id))
+        self.assertTrue(np.isin(ranked[1], self.matrix.movie_ids[pool]).all())
+        self.assertLess(len(pool), self.matrix.shape[1])
+        self.assertEqual(metrics.CANDIDATE_MOVIES.count(), observed + 4)
+
+    def test_no_pool_by_default(self):
+        self.assertIsNone(recommendations.candidate_pool())
+
+    @override_settings(RECOMMENDER_CANDIDATE_GENRES=['Comedy'])
+    def test_genre_mask_is_computed_once(self):
+        with patch('recommendations._genre_mask', None), \
+                patch('recommendations.genre_columns', wraps=recommendations.genre_columns) as genre_columns:
+            first = recommendations.candidate_pool()
+            second = recommendations.candidate_pool()
+
+        self.assertEqual(genre_columns.call_count, 1)
+        np.testing.assert_array_equal(first, second)
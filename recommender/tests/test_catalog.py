@@ -0,0 +1,48 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from recommender.catalog import MovieCatalog
+
+
+class MovieCatalogTest(unittest.TestCase):
+
+    def setUp(self):
+        movies = pd.DataFrame({
+            'movieId': [1, 5, 193609],
+            'title': ['Movie A', 'Movie B', 'Movie C'],
+            'genres': ['Comedy', 'Drama|Romance', '(no genres listed)']
+        })
+        links = pd.DataFrame({
+            'movieId': [5, 1],
+            'imdbId': [113497, 114709],
+            'tmdbId': [8844.0, np.nan]
+        })
+        self.catalog = MovieCatalog.from_frames(movies, links)
+
+    def test_title_lookup(self):
+        self.assertEqual(self.catalog.title(193609), 'Movie C')
+        self.assertIn(5, self.catalog)
+        self.assertNotIn(2, self.catalog)
+        with self.assertRaises(KeyError):
+            self.catalog.title(2)
+
+    def test_titles_for_keeps_order_and_skips_unknown_ids(self):
+        titles = self.catalog.titles_for(np.array([5, 2, 1, 10 ** 6, -3]))
+
+        self.assertEqual(titles, ['Movie B', 'Movie A'])
+
+    def test_records_include_genres_and_links(self):
+        records = self.catalog.records_for([5, 1, 193609])
+
+        self.assertEqual(records[0], {'movieId': 5, 'title': 'Movie B', 'genres': 'Drama|Romance',
+                                      'imdbId': 113497, 'tmdbId': 8844})
+        self.assertEqual(records[1]['tmdbId'], -1)
+        self.assertEqual(records[2]['imdbId'], -1)
+
+    def test_empty_catalog(self):
+        catalog = MovieCatalog.from_frames(pd.DataFrame(columns=['movieId', 'title']))
+
+        self.assertEqual(len(catalog), 0)
+        self.assertEqual(catalog.titles_for([1, 2]), [])
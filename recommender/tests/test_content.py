@@ -0,0 +1,116 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+import recommendations
+from recommendations import blend_content_scores, content_scores, has_common_entries, hybrid_rank_movies
+from recommender.catalog import MovieCatalog
+from recommender.content import build_content_features
+from recommender.rating_matrix import RatingMatrix
+
+
+class ContentFeaturesTest(unittest.TestCase):
+
+    def setUp(self):
+        movies = pd.DataFrame({
+            'movieId': [30, 10, 20, 40],
+            'title': ['C', 'A', 'B', 'D'],
+            'genres': ['Comedy|Drama', 'Comedy', 'Drama', '(no genres listed)'],
+        })
+        self.catalog = MovieCatalog.from_frames(movies)
+        self.tags = pd.DataFrame({
+            'movieId': [10, 10, 20, 30, 40, 99],
+            'tag': ['Funny', 'funny ', 'funny', 'dark', 'odd', 'funny'],
+        })
+
+    def test_tf_idf_rows_are_normalized(self):
+        content = build_content_features(self.catalog, self.tags)
+
+        self.assertEqual(list(content.feature_names), ['genre:Comedy', 'genre:Drama', 'tag:funny'])
+        rows = np.repeat(np.arange(4), np.diff(content.indptr))
+        norms = np.sqrt(np.bincount(rows, weights=content.data.astype(float) ** 2, minlength=4))
+        np.testing.assert_allclose(norms, [1.0, 1.0, 1.0, 0.0], rtol=1e-6)
+
+        # Movie 10: Comedy (idf log 2) and 'funny' applied twice (tf 1 + log 2, idf log 2)
+        start, end = content.indptr[1], content.indptr[2]
+        expected = np.array([1.0, 1.0 + np.log(2)])
+        np.testing.assert_allclose(content.data[start:end], expected / np.linalg.norm(expected), rtol=1e-6)
+
+    def test_positions(self):
+        content = build_content_features(self.catalog)
+
+        np.testing.assert_array_equal(content.positions([20, 30, 5, 40]), [2, 0, -1, 3])
+
+    def test_scores_are_cosine_similarities_to_profile(self):
+        content = build_content_features(self.catalog, self.tags)
+        dense = np.zeros(content.shape)
+        for row in range(content.shape[0]):
+            start, end = content.indptr[row], content.indptr[row + 1]
+            dense[row, content.indices[start:end]] = content.data[start:end]
+
+        profile = content.profile(np.array([1, 2]), np.array([1.0, -0.5]))
+
+        expected = dense[1] - 0.5 * dense[2]
+        np.testing.assert_allclose(profile, expected / np.linalg.norm(expected), rtol=1e-6)
+        np.testing.assert_allclose(content.scores(profile), dense @ profile, rtol=1e-6)
+
+
+class ContentRankingTest(unittest.TestCase):
+
+    def setUp(self):
+        movies = pd.DataFrame({
+            'movieId': [101, 102, 103, 104, 1],
+            'title': ['A', 'B', 'C', 'D', 'E'],
+            'genres': ['Comedy', 'Comedy', 'Horror', 'Horror', 'Drama'],
+        })
+        self.content = build_content_features(MovieCatalog.from_frames(movies))
+        # No movieId rated by user 1 is a userId, so all their correlations are 0.0
+        ratings = pd.DataFrame({
+            'userId': [1, 1, 2, 2, 2],
+            'movieId': [101, 103, 101, 102, 1],
+            'rating': [5.0, 1.0, 4.0, 4.0, 2.0],
+        })
+        self.matrix = RatingMatrix.from_frame(ratings)
+
+    def test_content_scores_follow_liked_genres(self):
+        scores = content_scores(1, self.matrix, self.content)
+
+        columns = dict(zip(self.matrix.movie_ids.tolist(), scores))
+        # The profile is Comedy minus Horror, and movie 1 is a Drama
+        self.assertAlmostEqual(columns[102], np.sqrt(0.5))
+        self.assertAlmostEqual(columns[103], -np.sqrt(0.5))
+        self.assertEqual(columns[1], 0.0)
+
+    def test_users_without_common_entries_are_ranked_by_content(self):
+        self.assertFalse(has_common_entries(1, self.matrix))
+        self.assertTrue(has_common_entries(2, self.matrix))
+
+        with patch('recommendations.hybrid_recommendation_scores') as scores:
+            ranked = hybrid_rank_movies(1, self.matrix, N=2, content=self.content)
+
+        scores.assert_not_called()
+        np.testing.assert_array_equal(ranked, [102, 1])
+
+    def test_blend(self):
+        scores = np.array([0.5, -0.5, 0.0, 1.0])
+        similarities = np.array([1.0, 0.0, 0.5, 0.0])
+
+        with patch('recommendations.content_scores', return_value=similarities) as content:
+            np.testing.assert_array_equal(blend_content_scores(1, self.matrix, scores, self.content, 0.0), scores)
+            content.assert_not_called()
+            np.testing.assert_allclose(blend_content_scores(1, self.matrix, scores, self.content, 0.25),
+                                       0.75 * scores + 0.25 * similarities)
+            np.testing.assert_array_equal(
+                blend_content_scores(1, self.matrix, np.zeros(4), self.content, 0.0), similarities)
+
+    def test_content_features_are_built_once_per_dataset(self):
+        dataset = recommendations.MovieLensDataset(
+            pd.DataFrame({'movieId': [1], 'title': ['A'], 'genres': ['Drama']}),
+            pd.DataFrame({'userId': [1], 'movieId': [1], 'rating': [4.0]}))
+
+        with patch('recommendations._dataset', dataset), patch('recommendations._content', None):
+            first = recommendations.content_features()
+            self.assertIs(recommendations.content_features(), first)
+            self.assertEqual(list(first.feature_names), ['genre:Drama'])
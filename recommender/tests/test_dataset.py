@@ -0,0 +1,150 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+
+from recommender.dataset import CACHE_FILE, MovieLensDataset, iter_rating_chunks, read_rating_matrix
+from recommender.rating_matrix import RatingMatrix
+
+
+class MovieLensDatasetCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = self.directory.name
+        pd.DataFrame({
+            'movieId': [1, 2, 10],
+            'title': ['Toy Story (1995)', 'Amélie (2001)', 'Heat (1995)'],
+            'genres': ['Animation|Comedy', 'Comedy|Romance', 'Action|Crime'],
+        }).to_csv(os.path.join(self.path, 'movies.csv'), index=False)
+        pd.DataFrame({
+            'userId': [1, 1, 2, 3],
+            'movieId': [1, 10, 2, 1],
+            'rating': [4.0, 3.5, 5.0, 2.0],
+            'timestamp': [964982703, 964981247, 1445714994, 1445714996],
+        }).to_csv(os.path.join(self.path, 'ratings.csv'), index=False)
+        pd.DataFrame({
+            'movieId': [1, 2, 10],
+            'imdbId': [114709, 211915, 113277],
+            'tmdbId': [862, 194, None],
+        }).to_csv(os.path.join(self.path, 'links.csv'), index=False)
+        self.cache_path = os.path.join(self.path, CACHE_FILE)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def test_cache_round_trip(self):
+        dataset = MovieLensDataset.from_csv(self.path)
+        dataset.save_cache(self.cache_path)
+
+        cached = MovieLensDataset.from_cache(self.cache_path)
+
+        pd.testing.assert_frame_equal(cached.ratings, dataset.ratings, check_dtype=False)
+        self.assertEqual(cached.ratings['userId'].dtype, np.int32)
+        self.assertEqual(cached.ratings['rating'].dtype, np.float32)
+        self.assertEqual(cached.movies['title'].tolist(), dataset.movies['title'].tolist())
+        self.assertEqual(cached.movies['genres'].tolist(), dataset.movies['genres'].tolist())
+        self.assertEqual(cached.catalog.records_for([2, 10]), dataset.catalog.records_for([2, 10]))
+        np.testing.assert_array_equal(cached.matrix.data, dataset.matrix.data)
+
+    def test_cache_keeps_added_ratings(self):
+        dataset = MovieLensDataset.from_csv(self.path)
+        dataset.matrix.add_rating(4, 2, 3.0)
+        dataset.matrix.add_rating(1, 1, 5.0)
+
+        dataset.save_cache(self.cache_path)
+        cached = MovieLensDataset.from_cache(self.cache_path)
+
+        pd.testing.assert_frame_equal(cached.matrix.to_frame(), dataset.matrix.to_frame())
+        self.assertEqual(cached.matrix.nnz, 5)
+        self.assertNotIn('timestamp', cached.ratings)
+
+    def test_cache_round_trip_without_timestamps(self):
+        ratings_path = os.path.join(self.path, 'ratings.csv')
+        pd.read_csv(ratings_path).drop(columns='timestamp').to_csv(ratings_path, index=False)
+        dataset = MovieLensDataset.from_csv(self.path)
+
+        dataset.save_cache(self.cache_path)
+        cached = MovieLensDataset.from_cache(self.cache_path)
+
+        self.assertNotIn('timestamp', cached.ratings)
+        pd.testing.assert_frame_equal(cached.ratings, dataset.ratings, check_dtype=False)
+
+    def test_load_uses_cache_only_when_newer_than_csv(self):
+        MovieLensDataset.from_csv(self.path).save_cache(self.cache_path)
+        ratings_path = os.path.join(self.path, 'ratings.csv')
+        cache_mtime = os.path.getmtime(self.cache_path)
+
+        os.utime(ratings_path, (cache_mtime - 10, cache_mtime - 10))
+        with patch.object(MovieLensDataset, 'from_csv') as from_csv:
+            MovieLensDataset.load(self.path)
+        from_csv.assert_not_called()
+
+        os.utime(ratings_path, (cache_mtime + 10, cache_mtime + 10))
+        with patch.object(MovieLensDataset, 'from_cache') as from_cache:
+            MovieLensDataset.load(self.path)
+        from_cache.assert_not_called()
+
+    def test_load_without_cache_reads_csv(self):
+        dataset = MovieLensDataset.load(self.path)
+
+        self.assertEqual(dataset.matrix.nnz, 4)
+        self.assertEqual([part.split(':')[0] for part in dataset.source.split('|')],
+                         ['movies.csv', 'ratings.csv', 'links.csv'])
+        self.assertFalse(os.path.exists(self.cache_path))
+
+
+class StreamingRatingsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        rng = np.random.default_rng(3)
+        pairs = rng.choice(300 * 80, size=2000, replace=False)
+        self.ratings = pd.DataFrame({
+            'userId': (pairs // 80 * 7 + 1).astype(np.int32),
+            'movieId': (pairs % 80 * 13 + 2).astype(np.int32),
+            'rating': (rng.integers(1, 11, size=2000) / 2).astype(np.float32),
+            'timestamp': rng.integers(0, 10 ** 9, size=2000),
+        })
+        self.ratings_path = os.path.join(self.directory.name, 'ratings.csv')
+        self.ratings.to_csv(self.ratings_path, index=False)
+
+    def assert_same_matrix(self, matrix, expected):
+        for name in ('user_ids', 'movie_ids', 'indptr', 'indices', 'data', 'csc_indptr', 'csc_indices',
+                     'csc_data', 'user_counts', 'movie_counts'):
+            np.testing.assert_array_equal(getattr(matrix, name), getattr(expected, name), err_msg=name)
+        np.testing.assert_allclose(matrix.user_means, expected.user_means)
+        np.testing.assert_allclose(matrix.movie_means, expected.movie_means)
+
+    def test_streamed_matrix_matches_full_read(self):
+        expected = RatingMatrix.from_frame(self.ratings)
+
+        for chunk_size in (1, 7, 333, 5000):
+            self.assert_same_matrix(read_rating_matrix(self.ratings_path, chunk_size), expected)
+
+    def test_chunks_are_bounded(self):
+        sizes = [len(ratings) for _, _, ratings in iter_rating_chunks(self.ratings_path, 300)]
+
+        self.assertEqual(sizes, [300] * 6 + [200])
+
+    def test_streamed_dataset_round_trips_through_cache(self):
+        pd.DataFrame({'movieId': [2, 15], 'title': ['A', 'B'], 'genres': ['Drama', 'Comedy']}).to_csv(
+            os.path.join(self.directory.name, 'movies.csv'), index=False)
+
+        dataset = MovieLensDataset.from_csv(self.directory.name, chunk_size=500)
+        self.assertIsNone(dataset.ratings)
+
+        cache_path = os.path.join(self.directory.name, CACHE_FILE)
+        dataset.save_cache(cache_path)
+        cached = MovieLensDataset.from_cache(cache_path)
+
+        self.assert_same_matrix(cached.matrix, dataset.matrix)
+        self.assertNotIn('timestamp', cached.ratings)
+
+        # A dataset read back from that cache can be cached again
+        cached.save_cache(cache_path)
+        self.assert_same_matrix(MovieLensDataset.from_cache(cache_path).matrix, dataset.matrix)
@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import unittest
+from unittest.mock import patch
+
+from recommender.executor import BoundedExecutor, ExecutorBusy
+
+
+class BoundedExecutorTest(unittest.TestCase):
+
+    def setUp(self):
+        self.executor = BoundedExecutor(max_workers=1, max_queue=1)
+        self.release = threading.Event()
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(self.release.set)
+
+    def test_rejects_tasks_beyond_workers_and_queue(self):
+        running = self.executor.submit(self.release.wait)
+        queued = self.executor.submit(lambda: 'queued')
+
+        with self.assertRaises(ExecutorBusy):
+            self.executor.submit(lambda: 'rejected')
+
+        self.release.set()
+        self.assertEqual(queued.result(timeout=5), 'queued')
+        self.assertTrue(running.result(timeout=5))
+        self.assertEqual(self.executor.submit(lambda: 'accepted').result(timeout=5), 'accepted')
+
+    def test_run_returns_result(self):
+        result = asyncio.run(self.executor.run(lambda a, b=0: a + b, 1, b=2, timeout=5))
+
+        self.assertEqual(result, 3)
+
+    def test_run_times_out_and_cancels_queued_task(self):
+        self.executor.submit(self.release.wait)
+        ran = threading.Event()
+
+        with self.assertRaises(asyncio.TimeoutError):
+            asyncio.run(self.executor.run(ran.set, timeout=0.05))
+
+        # The cancelled task gave its queue slot back
+        self.executor.submit(lambda: None)
+        self.release.set()
+        self.executor.shutdown()
+        self.assertFalse(ran.is_set())
+
+    def test_tasks_close_old_database_connections(self):
+        with patch('recommender.executor.close_old_connections') as close_old_connections:
+            self.assertEqual(self.executor.submit(lambda: 'done').result(timeout=5), 'done')
+            with self.assertRaises(ZeroDivisionError):
+                self.executor.submit(lambda: 1 / 0).result(timeout=5)
+
+        self.assertEqual(close_old_connections.call_count, 4)
@@ -0,0 +1,106 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from recommendations import mf_rank_movies
+from recommender.artifacts import matrix_hash, read_manifest
+from recommender.factorization import FactorModel, rmse, train_factor_model
+from recommender.rating_matrix import RatingMatrix
+
+
+class FactorModelTest(unittest.TestCase):
+
+    def setUp(self):
+        # Ratings generated from two latent tastes, so a rank-2 model can fit them
+        rng = np.random.default_rng(7)
+        user_tastes = rng.normal(size=(60, 2))
+        movie_traits = rng.normal(size=(90, 2))
+        users = rng.integers(0, 60, size=2500)
+        movies = rng.integers(0, 90, size=2500)
+        ratings = np.clip(3 + np.einsum('ij,ij->i', user_tastes[users], movie_traits[movies]), 0.5, 5.0)
+        frame = pd.DataFrame({'userId': users + 1, 'movieId': (movies + 1) * 10, 'rating': ratings})
+        self.frame = frame.drop_duplicates(['userId', 'movieId'])
+        self.matrix = RatingMatrix.from_frame(self.frame)
+
+    def test_factors_fit_better_than_biases(self):
+        args = self.frame.userId.values, self.frame.movieId.values, self.frame.rating.values
+        biases = train_factor_model(self.matrix, k=2, iterations=0, regularization=0.01)
+        model = train_factor_model(self.matrix, k=2, iterations=10, regularization=0.01)
+
+        self.assertLess(rmse(model, *args), rmse(biases, *args) / 2)
+
+    def test_blocked_solve_matches_single_block(self):
+        whole = train_factor_model(self.matrix, k=3, iterations=2)
+        blocked = train_factor_model(self.matrix, k=3, iterations=2, block_size=7)
+
+        np.testing.assert_allclose(blocked.item_factors, whole.item_factors, rtol=1e-3, atol=1e-4)
+
+    def test_score_user_is_the_prediction_up_to_a_constant(self):
+        model = train_factor_model(self.matrix, k=2, iterations=3)
+        factors, bias = model.user_vector(5)
+
+        predictions = model.global_mean + bias + model.item_bias + model.item_factors @ model.user_factors[4]
+        np.testing.assert_allclose(model.score_user(factors) + model.global_mean + bias, predictions, rtol=1e-5)
+
+    def test_fold_in_recovers_trained_user(self):
+        model = train_factor_model(self.matrix, k=2, iterations=10)
+        cols, values = self.matrix.row(5)
+
+        factors, _ = model.fold_in(self.matrix.movie_ids[cols], values)
+
+        # One more ALS step for a trained user lands close to its converged factors
+        np.testing.assert_allclose(factors, model.user_factors[4], atol=0.05)
+
+    def test_fold_in_without_known_movies(self):
+        model = train_factor_model(self.matrix, k=2, iterations=1)
+
+        factors, bias = model.fold_in(np.array([5, 15]), np.array([4.0, 2.0]))
+
+        np.testing.assert_array_equal(factors, np.zeros(2))
+        self.assertEqual(bias, 0.0)
+
+    def test_save_and_load(self):
+        model = train_factor_model(self.matrix, k=2, iterations=1)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'mf_model')
+            model.save(path, matrix_hash(self.matrix))
+            loaded = FactorModel.load(path)
+            self.assertEqual(read_manifest(path)['dataset_hash'], matrix_hash(self.matrix))
+
+        np.testing.assert_array_equal(loaded.item_factors, model.item_factors)
+        np.testing.assert_array_equal(loaded.user_ids, model.user_ids)
+        self.assertEqual(loaded.global_mean, model.global_mean)
+        self.assertEqual(loaded.regularization, model.regularization)
+
+    def test_ids_added_after_build_are_looked_up(self):
+        self.matrix.add_rating(0, 10, 4.0)
+        model = train_factor_model(self.matrix, k=2, iterations=1)
+
+        self.assertTrue(np.all(np.diff(model.user_ids) > 0))
+        np.testing.assert_array_equal(model.user_vector(0)[0], model.user_factors[0])
+
+    def test_rank_movies_excludes_rated_and_follows_scores(self):
+        model = train_factor_model(self.matrix, k=2, iterations=3)
+        rated = self.matrix.movie_ids[self.matrix.row(5)[0]]
+
+        ranked = mf_rank_movies(5, self.matrix, model, N=5)
+
+        self.assertFalse(np.isin(ranked, rated).any())
+        scores = model.score_user(model.user_vector(5)[0])
+        expected = [movie_id for movie_id in model.movie_ids[np.argsort(-scores, kind='stable')]
+                    if movie_id not in rated][:5]
+        np.testing.assert_array_equal(ranked, expected)
+
+    def test_rank_movies_folds_in_new_users(self):
+        model = train_factor_model(self.matrix, k=2, iterations=3)
+        self.matrix.add_rating(1000, 10, 5.0)
+        self.matrix.add_rating(1000, 20, 1.0)
+
+        ranked = mf_rank_movies(1000, self.matrix, model, N=5)
+
+        self.assertEqual(len(ranked), 5)
+        self.assertFalse(np.isin(ranked, [10, 20]).any())
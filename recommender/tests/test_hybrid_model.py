@@ -0,0 +1,113 @@
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from django.test import override_settings
+
+import recommendations
+from recommender.artifacts import ArtifactError, dataset_hash
+from recommender.content import content_hash
+from recommender.dataset import MovieLensDataset
+from recommender.hybrid_model import HYBRID_MODEL_SCHEMA, HybridModel, build_hybrid_model
+from recommender.registry import ModelRegistry
+
+
+class HybridModelTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, 'hybrid_model')
+        movies = pd.DataFrame({'movieId': [1, 2, 3], 'title': ['A', 'B', 'C'],
+                               'genres': ['Comedy', 'Drama', 'Comedy|Drama']})
+        ratings = pd.DataFrame({'userId': [1, 1, 2], 'movieId': [1, 2, 3], 'rating': [4.0, 3.0, 5.0]})
+        self.dataset = MovieLensDataset(movies, ratings)
+        self.tags = pd.DataFrame({'movieId': [1, 3], 'tag': ['witty', 'Witty']})
+        self.model = build_hybrid_model(self.dataset, self.tags)
+
+    def test_round_trip_is_memory_mapped(self):
+        self.model.save(self.path, metadata={'min_tag_movies': 2})
+
+        loaded = HybridModel.load(self.path)
+
+        self.assertEqual(list(loaded.content.feature_names), ['genre:Comedy', 'genre:Drama', 'tag:witty'])
+        np.testing.assert_array_equal(loaded.content.data, self.model.content.data)
+        self.assertIsInstance(loaded.content.indices, np.memmap)
+        self.assertEqual(loaded.content_hash, content_hash(self.dataset.movies, self.tags))
+        with open(os.path.join(self.path, 'manifest.json')) as file:
+            manifest = json.load(file)
+        self.assertEqual(manifest['schema_version'], HYBRID_MODEL_SCHEMA)
+        self.assertEqual(manifest['metadata'], {'min_tag_movies': 2})
+        self.assertEqual(manifest['built_at'], loaded.built_at)
+
+    def test_other_schema_version_is_rejected(self):
+        self.model.save(self.path)
+
+        with patch('recommender.hybrid_model.HYBRID_MODEL_SCHEMA', HYBRID_MODEL_SCHEMA + 1):
+            with self.assertRaisesRegex(ArtifactError, 'rebuild'):
+                HybridModel.load(self.path)
+
+    def test_incomplete_artifact_is_rejected(self):
+        self.model.save(self.path)
+        np.save(os.path.join(self.path, 'data.npy'), np.zeros(1, dtype=np.float32))
+
+        with self.assertRaisesRegex(ArtifactError, 'does not match'):
+            HybridModel.load(self.path)
+        with self.assertRaisesRegex(ArtifactError, 'manifest'):
+            HybridModel.load(self.directory.name)
+
+    def test_dataset_hash_follows_the_ratings(self):
+        before = dataset_hash(self.dataset)
+        self.dataset.matrix.add_rating(2, 1, 3.0)
+
+        self.assertNotEqual(dataset_hash(self.dataset), before)
+
+    def test_content_features_come_from_the_model_of_the_movies_and_tags(self):
+        with patch('recommendations._dataset', self.dataset), patch('recommendations._content', None), \
+                patch('recommendations.read_tags', return_value=self.tags), \
+                patch('recommendations.model_registry') as registry:
+            registry.get.return_value = self.model
+            self.assertIs(recommendations.content_features(), self.model.content)
+            # Ratings do not make the model stale
+            self.dataset.matrix.add_rating(2, 1, 3.0)
+            with patch('recommendations._content', None):
+                self.assertIs(recommendations.content_features(), self.model.content)
+
+            registry.get.return_value = HybridModel(self.model.content, 'other movies')
+            with self.assertLogs('recommendations', 'WARNING'):
+                rebuilt = recommendations.content_features()
+        self.assertIsNot(rebuilt, self.model.content)
+        self.assertEqual(list(rebuilt.feature_names), ['genre:Comedy', 'genre:Drama', 'tag:witty'])
+
+    def test_content_features_are_built_without_a_usable_model(self):
+        self.model.save(self.path)
+        for registry in (ModelRegistry(os.path.join(self.directory.name, 'missing'), loader=HybridModel.load),
+                         ModelRegistry(self.path, loader=HybridModel.load)):
+            with patch('recommendations._dataset', self.dataset), patch('recommendations._content', None), \
+                    patch('recommendations.read_tags', return_value=None), \
+                    patch('recommendations.model_registry', registry), \
+                    patch('recommender.hybrid_model.HYBRID_MODEL_SCHEMA', HYBRID_MODEL_SCHEMA + 1), \
+                    self.assertLogs('recommendations', 'WARNING'):
+                features = recommendations.content_features()
+                self.assertTrue(recommendations.model_version('hybrid').startswith('hybrid:none/'))
+            self.assertEqual(list(features.feature_names), ['genre:Comedy', 'genre:Drama'])
+
+    def test_missing_model_is_only_needed_to_blend_content(self):
+        matrix = recommendations.user_item_matrix
+        user_id = next(user_id for user_id in matrix.user_ids.tolist()
+                       if recommendations.has_common_entries(user_id, matrix))
+        missing = ModelRegistry(os.path.join(self.directory.name, 'missing'), loader=HybridModel.load)
+
+        with patch('recommendations.model_registry', missing), patch('recommendations._content', None), \
+                patch('recommendations.content_features', wraps=recommendations.content_features) as features:
+            self.assertTrue(recommendations.model_version('hybrid').startswith('hybrid:none/'))
+            self.assertEqual(len(recommendations.rank_movies(user_id, 'hybrid', N=5)), 5)
+            features.assert_not_called()
+
+            with override_settings(RECOMMENDER_CONTENT_WEIGHT=0.5), self.assertLogs('recommendations', 'WARNING'):
+                self.assertEqual(len(recommendations.rank_movies(user_id, 'hybrid', N=5)), 5)
+            features.assert_called_once_with()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from recommendations import lsh_rank_movies
+from recommender.lsh import UserLSHIndex, build_lsh_index, recall_at_k, similar_users
+from recommender.rating_matrix import RatingMatrix
+
+
+class UserLSHIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(4)
+        users = rng.integers(1, 80, size=1500)
+        movies = rng.integers(1, 120, size=1500)
+        ratings = rng.integers(1, 11, size=1500) / 2
+        frame = pd.DataFrame({'userId': users, 'movieId': movies, 'rating': ratings})
+        self.matrix = RatingMatrix.from_frame(frame.drop_duplicates(['userId', 'movieId']))
+
+    def test_exact_search_matches_brute_force(self):
+        pivot = self.matrix.to_frame()
+        centered = pivot.sub(pivot.mean(axis=1), axis=0).fillna(0.0).to_numpy()
+        norms = np.linalg.norm(centered, axis=1)
+        user_id = int(self.matrix.user_ids[3])
+
+        rows, similarities = similar_users(user_id, self.matrix, K=10)
+
+        expected = centered @ centered[3] / (norms * norms[3])
+        expected[3] = -np.inf
+        np.testing.assert_allclose(similarities, np.sort(expected)[::-1][:len(similarities)])
+        np.testing.assert_allclose(similarities, expected[rows])
+
+    def test_query_signature_matches_indexed_keys(self):
+        index = build_lsh_index(self.matrix, n_tables=4, bits=5, block_size=7)
+
+        for position, user_id in enumerate(index.user_ids[:20]):
+            cols, values = self.matrix.row(user_id)
+            keys = index.signature(self.matrix.movie_ids[cols], values - self.matrix.user_means[position])
+            for table in range(index.n_tables):
+                slot = np.flatnonzero(index.order[table] == position)[0]
+                self.assertEqual(index.keys[table, slot], keys[table])
+
+    def test_recall_is_perfect_when_probing_every_bucket(self):
+        index = build_lsh_index(self.matrix, n_tables=2, bits=1)
+
+        result = recall_at_k(self.matrix, index, self.matrix.user_ids[:10].tolist(), K=5,
+                             min_candidates=self.matrix.shape[0])
+
+        self.assertEqual(result['recall'], 1.0)
+
+    def test_save_and_load(self):
+        index = build_lsh_index(self.matrix, n_tables=3, bits=4)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'lsh')
+            index.save(path)
+            loaded = UserLSHIndex.load(path)
+
+            for name in ('user_ids', 'movie_ids', 'planes', 'keys', 'order'):
+                np.testing.assert_array_equal(getattr(loaded, name), getattr(index, name))
+            self.assertEqual((loaded.n_tables, loaded.bits), (3, 4))
+
+    def test_candidates_come_from_neighbors_ratings(self):
+        index = build_lsh_index(self.matrix, n_tables=4, bits=3)
+        user_id = int(self.matrix.user_ids[0])
+
+        ranked = lsh_rank_movies(user_id, self.matrix, index, N=10, K=5)
+
+        neighbors, _ = similar_users(user_id, self.matrix, index, K=5)
+        _, cols, _ = self.matrix.gather_rows(neighbors)
+        allowed = set(self.matrix.movie_ids[cols]) - set(self.matrix.movie_ids[self.matrix.row(user_id)[0]])
+        self.assertTrue(len(ranked) > 0)
+        self.assertTrue(set(ranked.tolist()) <= allowed)
@@ -0,0 +1,97 @@
+import unittest
+from unittest.mock import patch
+
+from django.core.cache import caches
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from recommender import metrics
+from test_cache import TEST_CACHES
+
+
+class MetricTypesTest(unittest.TestCase):
+
+    def setUp(self):
+        registry = list(metrics.REGISTRY)
+        self.addCleanup(lambda: metrics.REGISTRY.__setitem__(slice(None), registry))
+
+    def test_counter(self):
+        counter = metrics.Counter('test_events_total', 'Events.', ['kind'])
+        counter.inc(kind='a')
+        counter.inc(2, kind='a')
+        counter.inc(kind='b"c')
+
+        self.assertEqual(counter.value(kind='a'), 3)
+        text = metrics.render()
+        self.assertIn('# TYPE test_events_total counter\n', text)
+        self.assertIn('test_events_total{kind="a"} 3\n', text)
+        self.assertIn('test_events_total{kind="b\\"c"} 1\n', text)
+        with self.assertRaises(ValueError):
+            counter.inc(other='a')
+
+    def test_histogram(self):
+        histogram = metrics.Histogram('test_seconds', 'Durations.', buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 3.0):
+            histogram.observe(value)
+        with histogram.time():
+            pass
+
+        self.assertEqual(histogram.count(), 5)
+        text = metrics.render()
+        self.assertIn('test_seconds_bucket{le="0.1"} 2\n', text)
+        self.assertIn('test_seconds_bucket{le="1.0"} 4\n', text)
+        self.assertIn('test_seconds_bucket{le="+Inf"} 5\n', text)
+        self.assertIn('test_seconds_count 5\n', text)
+
+
+@override_settings(CACHES=TEST_CACHES, RECOMMENDER_CACHE_ALIAS='recommendations')
+class MetricsEndpointTest(TestCase):
+
+    def setUp(self):
+        caches['recommendations'].clear()
+
+    @patch('recommender.views.random.randint', return_value=1)
+    def test_recommend_request_is_instrumented(self, mock_randint):
+        requests = metrics.REQUESTS.value(view='recommend_movies', status='200')
+        misses = metrics.CACHE_REQUESTS.value(result='miss')
+        hits = metrics.CACHE_REQUESTS.value(result='hit')
+        stages = {stage: metrics.STAGE_SECONDS.count(stage=stage)
+                  for stage in ('model_load', 'scoring', 'ranking', 'title_lookup')}
+
+        self.client.get(reverse('recommend_movies'))
+        self.client.get(reverse('recommend_movies'))
+
+        self.assertEqual(metrics.REQUESTS.value(view='recommend_movies', status='200'), requests + 2)
+        self.assertEqual(metrics.CACHE_REQUESTS.value(result='miss'), misses + 1)
+        self.assertEqual(metrics.CACHE_REQUESTS.value(result='hit'), hits + 1)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage='model_load'), stages['model_load'] + 2)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage='scoring'), stages['scoring'] + 1)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage='ranking'), stages['ranking'] + 1)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage='title_lookup'), stages['title_lookup'] + 2)
+
+        response = self.client.get(reverse('metrics'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain; version=0.0.4'))
+        text = response.content.decode()
+        self.assertIn('recommender_stage_seconds_bucket{stage="scoring",le="+Inf"}', text)
+        self.assertIn('recommender_requests_total{view="recommend_movies",status="200"}', text)
+
+    @patch('recommender.views.make_hybrid_recommendations', side_effect=KeyError(5000))
+    def test_user_not_found_is_counted(self, mock_make_hybrid_recommendations):
+        not_found = metrics.USERS_NOT_FOUND.value(view='recommend_movies')
+
+        response = self.client.get(reverse('recommend_movies'))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(metrics.USERS_NOT_FOUND.value(view='recommend_movies'), not_found + 1)
+        self.assertGreater(metrics.REQUESTS.value(view='recommend_movies', status='404'), 0)
+
+    @patch('recommender.views.random.randint', return_value=5000)
+    def test_fallback_is_counted(self, mock_randint):
+        fallbacks = metrics.FALLBACK_REQUESTS.value(reason='unknown_user')
+
+        response = self.client.get(reverse('recommend_movies'))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(metrics.FALLBACK_REQUESTS.value(reason='unknown_user'), fallbacks + 1)
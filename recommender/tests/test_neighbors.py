@@ -0,0 +1,96 @@
+import json
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from recommender.artifacts import MANIFEST_FILE, ArtifactError, read_manifest
+from recommender.lsh import UserLSHIndex
+from recommender.neighbors import NEIGHBOR_INDEX_SCHEMA, NeighborIndex, build_neighbor_index
+from recommender.rating_matrix import RatingMatrix
+
+
+def adjusted_cosine(pivot, shrinkage):
+    """Brute-force adjusted cosine between every pair of movie columns."""
+    centered = pivot.sub(pivot.mean(axis=1), axis=0).fillna(0.0).to_numpy()
+    present = pivot.notna().to_numpy().astype(float)
+    norms = np.sqrt((centered ** 2).sum(axis=0))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        similarities = (centered.T @ centered) / np.outer(norms, norms)
+    support = present.T @ present
+    similarities = np.nan_to_num(similarities) * support / (support + shrinkage)
+    np.fill_diagonal(similarities, 0.0)
+    return similarities
+
+
+class NeighborIndexTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        users = rng.integers(1, 40, size=600)
+        movies = rng.integers(1, 60, size=600)
+        ratings = rng.integers(1, 11, size=600) / 2
+        self.frame = pd.DataFrame({'userId': users, 'movieId': movies, 'rating': ratings})
+        self.frame = self.frame.drop_duplicates(['userId', 'movieId'])
+        self.matrix = RatingMatrix.from_frame(self.frame)
+
+    def test_blocks_match_brute_force_top_k(self):
+        pivot = self.matrix.to_frame()
+        expected = adjusted_cosine(pivot, shrinkage=5.0)
+
+        index = build_neighbor_index(self.matrix, k=5, block_size=7, chunk_size=50, shrinkage=5.0)
+
+        self.assertEqual(len(index.offsets), len(self.matrix.movie_ids) + 1)
+        for position in range(len(index.movie_ids)):
+            start, end = index.offsets[position], index.offsets[position + 1]
+            neighbors, scores = index.neighbors[start:end], index.scores[start:end]
+            positive = np.sort(expected[position][expected[position] > 0])[::-1][:5]
+
+            np.testing.assert_allclose(scores, positive, rtol=1e-4, atol=1e-6)
+            np.testing.assert_allclose(expected[position, neighbors], scores, rtol=1e-4, atol=1e-6)
+            self.assertNotIn(position, neighbors)
+
+    def test_save_and_load_memory_mapped(self):
+        index = build_neighbor_index(self.matrix, k=4)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index')
+            size = index.save(path)
+            loaded = NeighborIndex.load(path)
+
+            self.assertGreater(size, 0)
+            self.assertIsInstance(loaded.scores, np.memmap)
+            np.testing.assert_array_equal(loaded.neighbors, index.neighbors)
+            np.testing.assert_array_equal(loaded.offsets, index.offsets)
+            del loaded
+
+    def test_load_rejects_other_kinds_and_schema_versions(self):
+        index = build_neighbor_index(self.matrix, k=4)
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'index')
+            index.save(path)
+            with self.assertRaises(ArtifactError):
+                UserLSHIndex.load(path)
+
+            manifest = read_manifest(path)
+            manifest['schema_version'] = NEIGHBOR_INDEX_SCHEMA + 1
+            with open(os.path.join(path, MANIFEST_FILE), 'w') as file:
+                json.dump(manifest, file)
+            with self.assertRaises(ArtifactError):
+                NeighborIndex.load(path)
+
+    def test_score_user_aggregates_neighbors_of_rated_movies(self):
+        index = NeighborIndex(
+            movie_ids=np.array([10, 20, 30, 40], dtype=np.int32),
+            offsets=np.array([0, 2, 3, 4, 4], dtype=np.int64),
+            neighbors=np.array([2, 3, 2, 0], dtype=np.int32),
+            scores=np.array([0.5, 0.25, 1.0, 0.5], dtype=np.float32),
+        )
+
+        movie_ids, scores = index.score_user([10, 20, 99], [1.0, -2.0, 5.0])
+
+        np.testing.assert_array_equal(movie_ids, [30, 40])
+        np.testing.assert_allclose(scores, [0.5 * 1.0 + 1.0 * -2.0, 0.25 * 1.0])
@@ -0,0 +1,101 @@
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from django.test import TestCase, override_settings
+
+import recommendations
+from recommender.catalog import MovieCatalog
+from recommender.popularity import build_popularity_ranking, favorite_genres
+from recommender.rating_matrix import RatingMatrix
+
+
+class PopularityRankingTest(unittest.TestCase):
+
+    def setUp(self):
+        self.movies = pd.DataFrame({
+            'movieId': [1, 2, 3, 4, 5],
+            'title': ['A', 'B', 'C', 'D', 'E'],
+            'genres': ['Comedy', 'Drama|Comedy', 'Drama', 'Horror', '(no genres listed)'],
+        })
+        self.catalog = MovieCatalog.from_frames(self.movies)
+        # Movie 3 has a single perfect rating, movie 2 many good ones, movie 5 none
+        ratings = pd.DataFrame({
+            'userId': [1, 2, 3, 4, 1, 2, 3, 4, 1, 1, 2],
+            'movieId': [2, 2, 2, 2, 1, 1, 1, 1, 3, 4, 4],
+            'rating': [4.5, 4.5, 4.0, 5.0, 3.0, 3.5, 3.0, 2.5, 5.0, 1.0, 2.0],
+        })
+        self.matrix = RatingMatrix.from_frame(ratings)
+
+    def test_bayesian_average_shrinks_rarely_rated_movies(self):
+        ranking = build_popularity_ranking(self.matrix, self.catalog, prior_count=4)
+
+        np.testing.assert_array_equal(ranking.movie_ids, [2, 3, 1, 4, 5])
+        global_mean = 38.0 / 11
+        self.assertAlmostEqual(ranking.scores[1], (5.0 + 4 * global_mean) / 5)
+        self.assertEqual(ranking.scores[-1], -np.inf)
+
+    def test_top_excludes_rated_movies(self):
+        ranking = build_popularity_ranking(self.matrix, self.catalog, prior_count=4)
+
+        np.testing.assert_array_equal(ranking.top(2, exclude=[2]), [3, 1])
+
+    def test_top_by_genre_is_filled_from_overall_ranking(self):
+        ranking = build_popularity_ranking(self.matrix, self.catalog, prior_count=4)
+
+        np.testing.assert_array_equal(ranking.top(2, genres=['Comedy']), [2, 1])
+        np.testing.assert_array_equal(ranking.top(3, genres=['Horror', 'Unknown']), [4, 2, 3])
+        self.assertNotIn('(no genres listed)', ranking.genre_ranks)
+
+    def test_favorite_genres(self):
+        genres = favorite_genres(self.catalog, [1, 3, 4], [4.0, 5.0, 1.0])
+
+        self.assertEqual(genres, ['Drama', 'Comedy'])
+        self.assertEqual(favorite_genres(self.catalog, [4], [2.0]), ['Horror'])
+
+
+class FallbackRecommendationsTest(TestCase):
+
+    def setUp(self):
+        movies = pd.DataFrame({
+            'movieId': [1, 2, 3, 4],
+            'title': ['A', 'B', 'C', 'D'],
+            'genres': ['Comedy', 'Drama', 'Drama|Comedy', 'Horror'],
+        })
+        ratings = pd.DataFrame({
+            'userId': [1, 1, 1, 2, 2, 3],
+            'movieId': [1, 2, 3, 2, 4, 3],
+            'rating': [4.0, 5.0, 3.0, 4.5, 1.0, 5.0],
+        })
+        self.dataset = recommendations.MovieLensDataset(movies, ratings)
+        for name, value in (('_dataset', self.dataset), ('_popularity', None)):
+            patcher = patch(f'recommendations.{name}', value)
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    @override_settings(RECOMMENDER_MIN_USER_RATINGS=3)
+    def test_fallback_reason(self):
+        self.assertEqual(recommendations.fallback_reason(99), 'unknown_user')
+        self.assertEqual(recommendations.fallback_reason(2), 'cold_start')
+        self.assertIsNone(recommendations.fallback_reason(1))
+
+    @override_settings(RECOMMENDER_MIN_USER_RATINGS=3)
+    @patch('recommendations.model_version')
+    def test_unknown_user_is_served_without_the_model(self, model_version):
+        titles = recommendations.make_hybrid_recommendations(99, seed=0)
+
+        self.assertEqual(sorted(titles), ['A', 'B', 'C', 'D'])
+        model_version.assert_not_called()
+
+    def test_cold_start_user_gets_unrated_movies_of_liked_genres_first(self):
+        ranked = recommendations.popular_movies(2, N=2)
+
+        self.assertEqual(ranked[0], 3)
+        self.assertFalse(np.isin(ranked, [2, 4]).any())
+
+    def test_ranking_is_rebuilt_after_new_ratings(self):
+        before = recommendations.popularity_ranking()
+        recommendations.add_ratings([(3, 4, 5.0)])
+
+        self.assertIsNot(recommendations.popularity_ranking(), before)
@@ -0,0 +1,59 @@
+import datetime
+import io
+from unittest.mock import patch
+
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+import recommendations
+from recommender.models import PrecomputedRecommendation
+from recommender.precompute import discard_precomputed_movies, get_precomputed_movies, store_precomputed_movies
+
+
+@override_settings(RECOMMENDER_CACHE_ALIAS='no-such-cache')
+class PrecomputedRecommendationsTest(TestCase):
+
+    def test_store_and_get(self):
+        self.assertEqual(store_precomputed_movies({1: [10, 20], 2: [30]}, 'hybrid:v1'), 2)
+        store_precomputed_movies({1: [40, 50]}, 'hybrid:v1')
+
+        self.assertEqual(get_precomputed_movies(1, 'hybrid:v1'), [40, 50])
+        self.assertEqual(get_precomputed_movies(2, 'hybrid:v1'), [30])
+        self.assertEqual(PrecomputedRecommendation.objects.count(), 2)
+
+    def test_stale_rows_are_not_served(self):
+        store_precomputed_movies({1: [10, 20]}, 'hybrid:v1')
+
+        self.assertIsNone(get_precomputed_movies(1, 'hybrid:v2'))
+        self.assertIsNone(get_precomputed_movies(3, 'hybrid:v1'))
+
+        PrecomputedRecommendation.objects.update(computed_at=timezone.now() - datetime.timedelta(hours=2))
+        with override_settings(RECOMMENDER_PRECOMPUTED_MAX_AGE=3600):
+            self.assertIsNone(get_precomputed_movies(1, 'hybrid:v1'))
+        with override_settings(RECOMMENDER_PRECOMPUTED_MAX_AGE=3 * 3600):
+            self.assertEqual(get_precomputed_movies(1, 'hybrid:v1'), [10, 20])
+
+        discard_precomputed_movies([1])
+        self.assertIsNone(get_precomputed_movies(1, 'hybrid:v1'))
+
+    def test_recommendations_are_served_from_table(self):
+        ranked = recommendations.rank_movies(1).tolist()
+        store_precomputed_movies({1: ranked}, recommendations.model_version('hybrid'))
+
+        with patch('recommendations.rank_movies') as rank_movies:
+            served = recommendations.make_hybrid_recommendations(1, seed=3)
+
+        rank_movies.assert_not_called()
+        self.assertEqual(served, recommendations.hybrid_recommend_movies(1, recommendations.user_item_matrix, seed=3))
+
+    def test_command_matches_direct_ranking(self):
+        for workers in (1, 2):
+            PrecomputedRecommendation.objects.all().delete()
+            call_command('precompute_recommendations', workers=workers, chunk_size=100, stdout=io.StringIO())
+
+            version = recommendations.model_version('hybrid')
+            self.assertEqual(PrecomputedRecommendation.objects.count(), 610)
+            for user_id in (1, 300, 610):
+                self.assertEqual(get_precomputed_movies(user_id, version),
+                                 recommendations.rank_movies(user_id).tolist())
@@ -0,0 +1,41 @@
+import os
+import pstats
+import tempfile
+from unittest.mock import patch
+
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+
+@patch('recommender.views.random.randint', return_value=1)
+class ProfileRequestTest(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+
+    def test_profiles_when_enabled_and_requested(self, mock_randint):
+        with override_settings(RECOMMENDER_PROFILING=True, RECOMMENDER_PROFILE_DIR=self.directory), \
+                self.assertLogs('recommender.profiling', 'INFO') as logs:
+            by_parameter = self.client.get(reverse('recommend_movies'), {'profile': '1', 'seed': '1'})
+            by_header = self.client.get(reverse('recommend_movies'), HTTP_X_PROFILE='1')
+
+        for response in (by_parameter, by_header):
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(len(response.json()['recommendations']), 10)
+            self.assertIn('make_hybrid_recommendations', response['X-Profile-Summary'])
+            path = os.path.join(self.directory, response['X-Profile-File'])
+            self.assertGreater(pstats.Stats(path).total_calls, 0)
+        self.assertIn('cumulative', logs.output[0])
+
+    def test_not_profiled_unless_enabled_and_requested(self, mock_randint):
+        with override_settings(RECOMMENDER_PROFILING=False, RECOMMENDER_PROFILE_DIR=self.directory):
+            disabled = self.client.get(reverse('recommend_movies'), {'profile': '1'})
+        with override_settings(RECOMMENDER_PROFILING=True, RECOMMENDER_PROFILE_DIR=self.directory):
+            not_requested = self.client.get(reverse('recommend_movies'))
+
+        for response in (disabled, not_requested):
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn('X-Profile-File', response)
+        self.assertEqual(os.listdir(self.directory), [])
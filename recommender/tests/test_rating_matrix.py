@@ -0,0 +1,150 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from recommender.rating_matrix import RatingMatrix, as_rating_matrix
+
+
+class RatingMatrixTest(unittest.TestCase):
+
+    def setUp(self):
+        self.ratings = pd.DataFrame({
+            'userId': [7, 3, 7, 3, 12, 7],
+            'movieId': [50, 10, 10, 20, 50, 20],
+            'rating': [4.0, 3.5, 2.0, 5.0, 1.0, 4.5]
+        })
+        self.matrix = RatingMatrix.from_frame(self.ratings)
+
+    def test_ids_are_sorted_and_compact(self):
+        np.testing.assert_array_equal(self.matrix.user_ids, [3, 7, 12])
+        np.testing.assert_array_equal(self.matrix.movie_ids, [10, 20, 50])
+        self.assertEqual(self.matrix.user_ids.dtype, np.int32)
+        self.assertEqual(self.matrix.indices.dtype, np.int32)
+        self.assertEqual(self.matrix.data.dtype, np.float32)
+        self.assertEqual(self.matrix.shape, (3, 3))
+        self.assertEqual(self.matrix.nnz, 6)
+
+    def test_id_lookups(self):
+        self.assertEqual(self.matrix.user_row(12), 2)
+        self.assertEqual(self.matrix.movie_column(20), 1)
+        self.assertTrue(self.matrix.has_user(7))
+        self.assertFalse(self.matrix.has_user(8))
+        np.testing.assert_array_equal(self.matrix.movie_columns([50, 11, 10, 10_000]), [2, -1, 0, -1])
+
+        with self.assertRaises(KeyError):
+            self.matrix.user_row(999)
+        with self.assertRaises(KeyError):
+            self.matrix.movie_column(-1)
+
+    def test_row_and_column_accessors(self):
+        cols, values = self.matrix.row(7)
+        np.testing.assert_array_equal(self.matrix.movie_ids[cols], [10, 20, 50])
+        np.testing.assert_array_equal(values, [2.0, 4.5, 4.0])
+
+        rows, values = self.matrix.column(50)
+        np.testing.assert_array_equal(self.matrix.user_ids[rows], [7, 12])
+        np.testing.assert_array_equal(values, [4.0, 1.0])
+
+    def test_means(self):
+        self.assertAlmostEqual(self.matrix.user_means[self.matrix.user_row(7)], 3.5)
+        self.assertAlmostEqual(self.matrix.movie_means[self.matrix.movie_column(10)], 2.75)
+
+    def test_duplicate_pairs_keep_last_rating(self):
+        matrix = RatingMatrix.from_ratings([1, 1, 2], [5, 5, 5], [1.0, 3.0, 4.0])
+
+        np.testing.assert_array_equal(matrix.row(1)[1], [3.0])
+        self.assertEqual(matrix.nnz, 2)
+
+    def test_round_trip_with_pivot_table(self):
+        pivot = self.ratings.pivot(index='userId', columns='movieId', values='rating')
+
+        matrix = as_rating_matrix(pivot)
+
+        pd.testing.assert_frame_equal(matrix.to_frame(), pivot, check_names=False, check_dtype=False,
+                                      check_index_type=False, check_column_type=False)
+        pd.testing.assert_frame_equal(self.matrix.to_frame(), pivot, check_names=False, check_dtype=False,
+                                      check_index_type=False, check_column_type=False)
+
+    def test_is_much_smaller_than_dense_pivot(self):
+        rng = np.random.default_rng(0)
+        users = rng.integers(1, 600, size=20_000)
+        movies = rng.integers(1, 9_000, size=20_000)
+        ratings = rng.integers(1, 11, size=20_000) / 2
+        frame = pd.DataFrame({'userId': users, 'movieId': movies, 'rating': ratings})
+        frame = frame.drop_duplicates(['userId', 'movieId'])
+
+        pivot = frame.pivot(index='userId', columns='movieId', values='rating')
+        matrix = RatingMatrix.from_frame(frame)
+
+        self.assertLess(matrix.nbytes * 10, pivot.memory_usage(deep=True).sum())
+
+
+class IncrementalRatingTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(1)
+        frame = pd.DataFrame({
+            'userId': rng.integers(1, 40, size=400),
+            'movieId': rng.integers(1, 60, size=400),
+            'rating': rng.integers(1, 11, size=400) / 2,
+        })
+        self.base = frame.drop_duplicates(['userId', 'movieId'], keep='last').iloc[:250]
+        self.events = pd.DataFrame({
+            'userId': rng.integers(1, 50, size=200),
+            'movieId': rng.integers(1, 70, size=200),
+            'rating': rng.integers(1, 11, size=200) / 2,
+        })
+
+    def assert_matches_rebuilt(self, matrix, frame):
+        expected = RatingMatrix.from_frame(frame)
+
+        pd.testing.assert_frame_equal(matrix.to_frame().sort_index().sort_index(axis=1), expected.to_frame(),
+                                      check_dtype=False, check_index_type=False, check_column_type=False)
+        self.assertEqual(matrix.nnz, expected.nnz)
+
+        rows = matrix.user_rows(expected.user_ids)
+        cols = matrix.movie_columns(expected.movie_ids)
+        np.testing.assert_array_equal(matrix.user_counts[rows], expected.user_counts)
+        np.testing.assert_allclose(matrix.user_means[rows], expected.user_means)
+        np.testing.assert_allclose(matrix.user_squared_deviations[rows], expected.user_squared_deviations, atol=1e-9)
+        np.testing.assert_array_equal(matrix.movie_counts[cols], expected.movie_counts)
+        np.testing.assert_allclose(matrix.movie_means[cols], expected.movie_means)
+        np.testing.assert_allclose(matrix.movie_squared_deviations[cols], expected.movie_squared_deviations,
+                                   atol=1e-9)
+
+    def test_add_rating_matches_rebuilt_matrix(self):
+        for compact_threshold in (10_000, 16):
+            matrix = RatingMatrix.from_frame(self.base)
+            matrix.compact_threshold = compact_threshold
+            for user_id, movie_id, rating in self.events.itertuples(index=False):
+                matrix.add_rating(user_id, movie_id, rating)
+
+            self.assert_matches_rebuilt(matrix, pd.concat([self.base, self.events]))
+
+    def test_compact_keeps_ratings(self):
+        matrix = RatingMatrix.from_frame(self.base)
+        for user_id, movie_id, rating in self.events.itertuples(index=False):
+            matrix.add_rating(user_id, movie_id, rating)
+        self.assertGreater(matrix.pending_count, 0)
+
+        compacted = matrix.compacted()
+        matrix.compact()
+
+        self.assertEqual(matrix.pending_count, 0)
+        self.assertIs(matrix.compacted(), matrix)
+        frame = pd.concat([self.base, self.events])
+        self.assert_matches_rebuilt(matrix, frame)
+        self.assert_matches_rebuilt(compacted, frame)
+
+    def test_add_rating_returns_replaced_rating(self):
+        matrix = RatingMatrix.from_frame(self.base)
+        user_id, movie_id, rating = next(self.base.itertuples(index=False))
+
+        self.assertEqual(matrix.add_rating(user_id, movie_id, 0.5), rating)
+        self.assertIsNone(matrix.add_rating(1000, movie_id, 3.0))
+        self.assertEqual(matrix.add_rating(1000, movie_id, 4.0), 3.0)
+
+        np.testing.assert_array_equal(matrix.row(1000)[1], [4.0])
+        self.assertEqual(matrix.user_ids[-1], 1000)
+        self.assertAlmostEqual(matrix.user_means[matrix.user_row(1000)], 4.0)
@@ -1,12 +1,25 @@
 import random
+import subprocess
+import sys
+import threading
 import unittest
+from types import SimpleNamespace
 from unittest.mock import patch
 
 import pandas as pd
 import numpy as np
+from django.core.cache import caches
+from django.test import TestCase, override_settings
 
 import recommendations
-from recommendations import hybrid_recommendation_score, hybrid_recommend_movies
+from recommendations import (hybrid_recommendation_score, hybrid_recommendation_scores, hybrid_recommend_movies,
+                             hybrid_recommendation_score_matrix, make_batch_recommendations,
+                             make_hybrid_recommendations, popular_movies, sample_titles, top_n_movies)
+from recommender import metrics
+from recommender.cache import get_ranked_movies
+from recommender.models import RatingEvent
+from recommender.precompute import get_precomputed_movies, store_precomputed_movies
+from test_cache import TEST_CACHES
 
 
 def test_hybrid_recommend_movies_excludes_rated_movies(self):
@@ -307,4 +320,269 @@ def test_hybrid_recommendation_score_with_non_numeric_ratings(self):
     movie_id = 2
 
     with self.assertRaises(TypeError):
-        hybrid_recommendation_score(user_id, movie_id, user_item_matrix)
\ No newline at end of file
+        hybrid_recommendation_score(user_id, movie_id, user_item_matrix)
+
+
+class HybridRecommendationScoresTest(unittest.TestCase):
+    """The batched scorer must reproduce hybrid_recommendation_score for every movie."""
+
+    def assert_matches_reference(self, user_id, user_item_matrix, movie_ids=None, rating_matrix=None):
+        scores = hybrid_recommendation_scores(user_id, rating_matrix if rating_matrix is not None else user_item_matrix)
+        movie_ids = user_item_matrix.columns if movie_ids is None else movie_ids
+        for movie_id in movie_ids:
+            with np.errstate(divide='ignore', invalid='ignore'):
+                expected = hybrid_recommendation_score(user_id, movie_id, user_item_matrix)
+            actual = scores[user_item_matrix.columns.get_loc(movie_id)]
+            if np.isnan(expected):
+                self.assertTrue(np.isnan(actual), f"movie {movie_id}: expected NaN, got {actual}")
+            else:
+                self.assertAlmostEqual(actual, expected, places=10, msg=f"movie {movie_id}")
+
+    def test_matches_reference_with_missing_ratings(self):
+        user_item_matrix = pd.DataFrame({
+            1: [4.0, np.nan, 2.0, 5.0],
+            2: [np.nan, 3.0, 1.0, 4.0],
+            3: [5.0, 2.0, np.nan, 1.0],
+            4: [3.0, np.nan, 4.0, np.nan],
+            5: [np.nan, 4.0, 5.0, 2.0]
+        }, index=[1, 2, 3, 4])
+
+        for user_id in user_item_matrix.index:
+            self.assert_matches_reference(user_id, user_item_matrix)
+
+    def test_matches_reference_with_negative_ratings(self):
+        user_item_matrix = pd.DataFrame({
+            1: [4.0, -3.0, 2.0, -1.0],
+            2: [-2.0, 3.0, -1.0, 4.0],
+            3: [1.0, -2.0, 3.0, -4.0],
+            4: [-3.0, 2.0, -4.0, 1.0]
+        }, index=[1, 2, 3, 4])
+
+        for user_id in user_item_matrix.index:
+            self.assert_matches_reference(user_id, user_item_matrix)
+
+    def test_no_common_entries_scores_zero(self):
+        user_item_matrix = pd.DataFrame({
+            10: [4.0, 3.0],
+            20: [2.0, 5.0]
+        }, index=[1, 2])
+
+        scores = hybrid_recommendation_scores(1, user_item_matrix)
+
+        np.testing.assert_array_equal(scores, [0.0, 0.0])
+
+    def test_unknown_user_raises_key_error(self):
+        user_item_matrix = pd.DataFrame({1: [4.0, 3.0]}, index=[1, 2])
+
+        with self.assertRaises(KeyError):
+            hybrid_recommendation_scores(999, user_item_matrix)
+
+    def test_matches_reference_on_movielens_sample(self):
+        rating_matrix = recommendations.user_item_matrix
+        user_item_matrix = rating_matrix.to_frame()
+        sample = user_item_matrix.columns[::97]
+
+        for user_id in (1, 414):
+            self.assert_matches_reference(user_id, user_item_matrix, sample, rating_matrix)
+
+
+class TopNSelectionTest(unittest.TestCase):
+
+    def test_top_n_movies_keeps_score_order(self):
+        movie_ids = np.array([10, 20, 30, 40, 50, 60])
+        scores = np.array([0.1, 0.9, np.nan, 0.5, 0.9, -0.2])
+
+        np.testing.assert_array_equal(top_n_movies(scores, movie_ids, 3), [20, 50, 40])
+        np.testing.assert_array_equal(top_n_movies(scores, movie_ids, 10), [20, 50, 40, 10, 60, 30])
+
+    def test_top_n_movies_excludes_rated_movies(self):
+        movie_ids = np.array([10, 20, 30, 40])
+        scores = np.array([0.4, 0.9, 0.1, 0.5])
+        exclude = np.array([False, True, False, False])
+
+        np.testing.assert_array_equal(top_n_movies(scores, movie_ids, 2, exclude=exclude), [40, 10])
+        self.assertEqual(len(top_n_movies(scores, movie_ids, 0, exclude=exclude)), 0)
+
+    def test_sample_titles_is_seedable_and_keeps_rank_order(self):
+        top_N = recommendations.user_item_matrix.movie_ids[:20]
+        titles = recommendations.movie_catalog.titles_for(top_N)
+
+        first = sample_titles(top_N, seed=3)
+        second = sample_titles(top_N, seed=3)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(first), 10)
+        self.assertEqual(first, sorted(first, key=titles.index))
+
+    def test_sample_titles_with_fewer_than_ten_candidates(self):
+        top_N = recommendations.user_item_matrix.movie_ids[:4]
+
+        self.assertEqual(sample_titles(top_N, seed=1), recommendations.movie_catalog.titles_for(top_N))
+        self.assertEqual(sample_titles([], seed=1), [])
+
+    def test_hybrid_recommend_movies_returns_top_ranked_unrated_titles(self):
+        matrix = recommendations.user_item_matrix
+        scores = hybrid_recommendation_scores(1, matrix)
+        rated = set(matrix.movie_ids[matrix.row(1)[0]])
+        ranked = sorted((movie_id for movie_id in matrix.movie_ids if movie_id not in rated),
+                        key=lambda movie_id: (-np.nan_to_num(scores[matrix.movie_column(movie_id)], nan=-np.inf),
+                                              movie_id))
+        expected = recommendations.movie_catalog.titles_for(ranked[:10])
+
+        self.assertEqual(hybrid_recommend_movies(1, matrix, N=10, seed=0), expected)
+
+
+class BatchRecommendationsTest(unittest.TestCase):
+
+    def test_score_matrix_matches_single_user_scores(self):
+        matrix = recommendations.user_item_matrix
+        user_ids = matrix.user_ids[::61]
+
+        scores = hybrid_recommendation_score_matrix(user_ids, matrix)
+
+        self.assertEqual(scores.shape, (len(user_ids), matrix.shape[1]))
+        for user_id, row in zip(user_ids, scores):
+            np.testing.assert_array_equal(row, hybrid_recommendation_scores(user_id, matrix))
+
+    def test_batch_recommendations_match_single_user_recommendations(self):
+        matrix = recommendations.user_item_matrix
+
+        result = make_batch_recommendations([3, 1, 123456, 3], seed=11)
+
+        self.assertEqual(list(result), [3, 1, 123456])
+        for user_id in (3, 1):
+            self.assertEqual(result[user_id], hybrid_recommend_movies(user_id, matrix, N=20,
+                                                                      seed=np.random.SeedSequence([11, user_id])))
+
+    def test_every_user_gets_its_own_seed(self):
+        with patch('recommendations.sample_titles', return_value=[]) as sample_titles:
+            make_batch_recommendations([3, 1, 123456], seed=11)
+
+        seeds = [call.kwargs['seed'] for call in sample_titles.call_args_list]
+        self.assertEqual(len({tuple(seed.generate_state(4)) for seed in seeds}), 3)
+        self.assertEqual(seeds[0].generate_state(4).tolist(),
+                         np.random.SeedSequence([11, 123456]).generate_state(4).tolist())
+
+    def test_unknown_and_cold_start_users_get_popular_movies(self):
+        fallbacks = metrics.FALLBACK_REQUESTS.value(reason='unknown_user')
+
+        with override_settings(RECOMMENDER_MIN_USER_RATINGS=10 ** 6):
+            result = make_batch_recommendations([123456, 1], seed=11)
+
+        self.assertEqual(result[123456], make_hybrid_recommendations(123456, seed=np.random.SeedSequence([11, 123456])))
+        self.assertEqual(result[1], sample_titles(popular_movies(1), seed=np.random.SeedSequence([11, 1])))
+        self.assertEqual(metrics.FALLBACK_REQUESTS.value(reason='unknown_user'), fallbacks + 2)
+
+
+class LazyDatasetTest(unittest.TestCase):
+
+    def test_import_does_no_io(self):
+        code = ("import pandas, recommendations\n"
+                "pandas.read_csv = None\n"
+                "print(recommendations._dataset is None)")
+
+        result = subprocess.run([sys.executable, '-c', code], cwd=recommendations.BASE_DIR,
+                                capture_output=True, text=True, check=True)
+
+        self.assertEqual(result.stdout.strip(), 'True')
+
+    def test_dataset_is_loaded_once(self):
+        loaded = SimpleNamespace(rating_event_id=0)
+
+        with patch('recommendations._dataset', None), \
+                patch('recommendations.MovieLensDataset.load', return_value=loaded) as load:
+            results = []
+            threads = [threading.Thread(target=lambda: results.append(recommendations.get_dataset()))
+                       for _ in range(8)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        load.assert_called_once()
+        self.assertTrue(all(result is loaded for result in results))
+
+    def test_module_attributes_come_from_dataset(self):
+        dataset = recommendations.get_dataset()
+
+        self.assertIs(recommendations.user_item_matrix, dataset.matrix)
+        self.assertIs(recommendations.movies_data, dataset.movies)
+        with self.assertRaises(AttributeError):
+            recommendations.not_a_dataset_attribute
+
+
+class AddRatingsTest(TestCase):
+
+    def setUp(self):
+        movies = pd.DataFrame({'movieId': [1, 2, 3], 'title': ['A', 'B', 'C']})
+        ratings = pd.DataFrame({'userId': [1, 1, 2], 'movieId': [1, 2, 1], 'rating': [4.0, 3.0, 2.0]})
+        self.dataset = recommendations.MovieLensDataset(movies, ratings)
+        patcher = patch('recommendations._dataset', self.dataset)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_ratings_update_matrix(self):
+        recorded = recommendations.add_ratings([(2, 3, 5.0), (3, 1, 1.0), (2, 1, 4.0)])
+
+        matrix = self.dataset.matrix
+        self.assertEqual(recorded, 3)
+        self.assertEqual(matrix.nnz, 5)
+        self.assertAlmostEqual(matrix.user_means[matrix.user_row(2)], 4.5)
+        self.assertAlmostEqual(matrix.movie_means[matrix.movie_column(1)], 3.0)
+
+    @override_settings(CACHES=TEST_CACHES, RECOMMENDER_CACHE_ALIAS='recommendations')
+    def test_ratings_invalidate_the_lists_of_their_users_only(self):
+        caches['recommendations'].clear()
+        version = recommendations.model_version('hybrid')
+        for user_id in (1, 2):
+            get_ranked_movies(user_id, version, lambda: [3])
+        store_precomputed_movies({1: [3], 2: [3]}, version)
+
+        # Changing an existing rating keeps the version but drops that user's lists
+        recommendations.add_ratings([(1, 1, 2.0)])
+
+        self.assertEqual(recommendations.model_version('hybrid'), version)
+        self.assertEqual(get_ranked_movies(1, version, lambda: [2]), [2])
+        self.assertEqual(get_ranked_movies(2, version, lambda: [2]), [3])
+        self.assertIsNone(get_precomputed_movies(1, version))
+        self.assertEqual(get_precomputed_movies(2, version), [3])
+
+    def test_ratings_are_logged_and_replayed(self):
+        recommendations.add_ratings([(2, 3, 5.0), (2, 3, 4.0)])
+
+        self.assertEqual(list(RatingEvent.objects.values_list('user_id', 'movie_id', 'rating')),
+                         [(2, 3, 5.0), (2, 3, 4.0)])
+        self.assertEqual(self.dataset.rating_event_id, RatingEvent.objects.latest('id').id)
+        reloaded = recommendations.MovieLensDataset(self.dataset.movies, self.dataset.ratings)
+        self.assertEqual(recommendations.sync_ratings(reloaded), 2)
+        self.assertEqual(reloaded.matrix.row(2)[1].tolist(), [2.0, 4.0])
+
+    def test_ratings_of_other_processes_are_synced(self):
+        RatingEvent.objects.create(user_id=4, movie_id=2, rating=3.5)
+
+        with override_settings(RECOMMENDER_RATINGS_SYNC_INTERVAL=0):
+            dataset = recommendations.get_dataset()
+
+        self.assertTrue(dataset.matrix.has_user(4))
+        self.assertEqual(recommendations.sync_ratings(dataset), 0)
+
+    def test_invalid_event_leaves_matrix_unchanged(self):
+        for event in ((1, 99, 4.0), (1, 3, 5.5), (0, 3, 4.0), (2 ** 31, 1, 4.0), (10 ** 8, 1, 4.0)):
+            with self.assertRaises(ValueError):
+                recommendations.add_ratings([(1, 3, 4.0), event])
+
+        self.assertEqual(self.dataset.matrix.nnz, 3)
+        self.assertFalse(RatingEvent.objects.exists())
+        recommendations.add_ratings([(100_002, 1, 4.0)])
+        self.assertTrue(self.dataset.matrix.has_user(100_002))
+
+    def test_replay_skips_events_that_cannot_be_applied(self):
+        RatingEvent.objects.create(user_id=2 ** 31, movie_id=1, rating=4.0)
+        RatingEvent.objects.create(user_id=4, movie_id=2, rating=3.5)
+
+        with self.assertLogs('recommendations', 'WARNING'):
+            self.assertEqual(recommendations.sync_ratings(self.dataset), 2)
+
+        self.assertTrue(self.dataset.matrix.has_user(4))
+        self.assertFalse(self.dataset.matrix.has_user(2 ** 31))
+        self.assertEqual(self.dataset.rating_event_id, RatingEvent.objects.latest('id').id)
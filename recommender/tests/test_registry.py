@@ -0,0 +1,83 @@
+import os
+import tempfile
+import threading
+import unittest
+
+import joblib
+
+from recommender.registry import ModelRegistry
+
+
+class ModelRegistryTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.directory.name, 'model.joblib')
+        joblib.dump({'name': 'first'}, self.path)
+        self.loads = []
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def loader(self, path):
+        self.loads.append(path)
+        return joblib.load(path)
+
+    def replace_artifact(self, model):
+        joblib.dump(model, self.path)
+        stat = os.stat(self.path)
+        # Make sure the new artifact gets a different mtime even on coarse filesystems
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+    def test_loads_once_and_shares_the_model(self):
+        registry = ModelRegistry(self.path, loader=self.loader, check_interval=0)
+
+        first = registry.get()
+        second = registry.get()
+
+        self.assertIs(first, second)
+        self.assertEqual(len(self.loads), 1)
+
+    def test_reloads_when_artifact_changes(self):
+        registry = ModelRegistry(self.path, loader=self.loader, check_interval=0)
+        old_version = registry.version
+
+        self.replace_artifact({'name': 'second'})
+
+        self.assertEqual(registry.get(), {'name': 'second'})
+        self.assertNotEqual(registry.version, old_version)
+        self.assertEqual(len(self.loads), 2)
+
+    def test_check_interval_delays_reload(self):
+        registry = ModelRegistry(self.path, loader=self.loader, check_interval=3600)
+        registry.get()
+
+        self.replace_artifact({'name': 'second'})
+
+        self.assertEqual(registry.get(), {'name': 'first'})
+        self.assertEqual(registry.reload().model, {'name': 'second'})
+
+    def test_failed_reload_keeps_previous_model(self):
+        registry = ModelRegistry(self.path, check_interval=0)
+        registry.get()
+
+        with open(self.path, 'wb') as artifact:
+            artifact.write(b'not a pickle')
+        stat = os.stat(self.path)
+        os.utime(self.path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+
+        with self.assertLogs('recommender.registry', level='ERROR'):
+            self.assertEqual(registry.get(), {'name': 'first'})
+
+    def test_concurrent_access_loads_once(self):
+        registry = ModelRegistry(self.path, loader=self.loader, check_interval=60)
+        results = []
+
+        threads = [threading.Thread(target=lambda: results.append(registry.get())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(self.loads), 1)
+        self.assertTrue(all(result is results[0] for result in results))
@@ -0,0 +1,101 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+from django.test import override_settings
+
+import recommendations
+from recommender.dataset import MovieLensDataset
+from recommender.shared import attach_dataset, current_generation, list_generations, publish_dataset
+
+
+class SharedDatasetTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.root = self.directory.name
+        movies = pd.DataFrame({'movieId': [1, 2, 3], 'title': ['A', 'B', 'Ç'],
+                               'genres': ['Comedy', 'Drama', 'Comedy|Drama']})
+        ratings = pd.DataFrame({'userId': [1, 1, 2, 3], 'movieId': [1, 2, 2, 3], 'rating': [4.0, 3.0, 5.0, 2.5]})
+        links = pd.DataFrame({'movieId': [1, 2, 3], 'imdbId': [11, 22, 33], 'tmdbId': [101.0, np.nan, 303.0]})
+        self.dataset = MovieLensDataset(movies, ratings, links)
+
+    def test_round_trip(self):
+        publish_dataset(self.dataset, self.root)
+
+        generation, attached = attach_dataset(self.root)
+
+        self.assertEqual(generation, 1)
+        self.assertEqual(attached.source, 'generation-000001')
+        pd.testing.assert_frame_equal(attached.matrix.to_frame(), self.dataset.matrix.to_frame())
+        np.testing.assert_array_equal(attached.matrix.user_means, self.dataset.matrix.user_means)
+        self.assertEqual(attached.catalog.title(3), 'Ç')
+        self.assertEqual(attached.catalog.records_for([2]), self.dataset.catalog.records_for([2]))
+
+    def test_arrays_are_mapped_read_only(self):
+        publish_dataset(self.dataset, self.root)
+
+        matrix = attach_dataset(self.root).dataset.matrix
+
+        for array in (matrix.indptr, matrix.data, matrix.csc_data, matrix.user_counts, matrix.movie_means):
+            self.assertIsInstance(array, np.memmap)
+            self.assertFalse(array.flags.writeable)
+
+    def test_new_ratings_leave_the_mapped_arrays_alone(self):
+        publish_dataset(self.dataset, self.root)
+        matrix = attach_dataset(self.root).dataset.matrix
+
+        matrix.add_rating(1, 1, 1.0)
+        matrix.add_rating(3, 1, 5.0)
+        matrix.add_rating(1, 1, 2.0)
+
+        for array in (matrix.data, matrix.csc_data):
+            self.assertIsInstance(array, np.memmap)
+            self.assertFalse(array.flags.writeable)
+        np.testing.assert_array_equal(matrix.row(1)[1], [2.0, 3.0])
+        np.testing.assert_array_equal(matrix.column(1)[1], [2.0, 5.0])
+        self.assertEqual(sorted(matrix.gather_rows([0])[2]), [2.0, 3.0])
+        self.assertEqual(matrix.user_counts[matrix.user_row(3)], 2)
+        self.assertAlmostEqual(matrix.user_means[matrix.user_row(1)], 2.5)
+        compacted = matrix.compacted()
+        self.assertIsNot(compacted, matrix)
+        self.assertEqual(compacted.to_frame().loc[1, 1], 2.0)
+        self.assertEqual(compacted.to_frame().loc[3, 1], 5.0)
+        # The published files are untouched
+        other = attach_dataset(self.root).dataset.matrix
+        np.testing.assert_array_equal(other.row(1)[1], [4.0, 3.0])
+        self.assertEqual(other.user_counts[other.user_row(3)], 1)
+
+    def test_generations_are_swapped_and_pruned(self):
+        for _ in range(3):
+            publish_dataset(self.dataset, self.root, keep=2)
+
+        self.assertEqual(current_generation(self.root), 3)
+        self.assertEqual(list_generations(self.root), [2, 3])
+        self.assertEqual(attach_dataset(self.root).generation, 3)
+
+    def test_nothing_published(self):
+        self.assertIsNone(current_generation(self.root))
+        with self.assertRaises(FileNotFoundError):
+            attach_dataset(self.root)
+
+    def test_recommender_attaches_to_published_dataset(self):
+        publish_dataset(self.dataset, self.root)
+
+        with override_settings(RECOMMENDER_SHARED_DATASET_DIR=self.root), \
+                patch('recommendations._dataset', None), patch('recommendations._shared_dataset_registry', None), \
+                patch('recommendations.load_dataset') as load_dataset:
+            dataset = recommendations.get_dataset()
+            registry = recommendations.shared_dataset_registry()
+            publish_dataset(self.dataset, self.root)
+            registry.reload()
+            swapped = recommendations.get_dataset()
+
+        load_dataset.assert_not_called()
+        self.assertIsInstance(dataset.matrix.data, np.memmap)
+        self.assertIsNot(swapped, dataset)
+        self.assertTrue(os.path.exists(os.path.join(self.root, 'generation-000002')))
@@ -1,7 +1,10 @@
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.urls import reverse
 from unittest.mock import patch
+from recommender.executor import ExecutorBusy
 from recommender.views import recommend_movies
+import asyncio
+import json
 
 
 class RecommendMoviesViewTest(TestCase):
@@ -129,3 +132,149 @@ class RecommendMoviesViewTest(TestCase):
         })
         mock_randint.assert_called_once_with(1, 1000)
         mock_make_hybrid_recommendations.assert_called_once_with(1000)
+
+    @patch('recommender.views.random.randint')
+    @patch('recommender.views.make_hybrid_recommendations')
+    def test_recommend_movies_passes_seed(self, mock_make_hybrid_recommendations, mock_randint):
+        mock_randint.return_value = 7
+        mock_make_hybrid_recommendations.return_value = ['Movie1']
+
+        response = self.client.get(reverse('recommend_movies'), {'seed': '42'})
+
+        self.assertEqual(response.status_code, 200)
+        mock_make_hybrid_recommendations.assert_called_once_with(7, seed=42)
+
+    @patch('recommender.views.make_hybrid_recommendations')
+    def test_recommend_movies_invalid_seed(self, mock_make_hybrid_recommendations):
+        response = self.client.get(reverse('recommend_movies'), {'seed': 'abc'})
+
+        self.assertEqual(response.status_code, 400)
+        mock_make_hybrid_recommendations.assert_not_called()
+
+
+class RecommendMoviesBatchViewTest(TestCase):
+
+    def post(self, payload):
+        return self.client.post(reverse('recommend_movies_batch'), data=json.dumps(payload),
+                                content_type='application/json')
+
+    @patch('recommender.views.make_batch_recommendations')
+    def test_batch_returns_recommendations_per_user(self, mock_make_batch_recommendations):
+        mock_make_batch_recommendations.return_value = {1: ['Movie1'], 2: ['Movie2'], 5000: ['Movie3']}
+
+        response = self.post({'user_ids': [1, 2, 5000], 'seed': 3})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {
+            'recommendations': {'1': ['Movie1'], '2': ['Movie2'], '5000': ['Movie3']},
+        })
+        mock_make_batch_recommendations.assert_called_once_with([1, 2, 5000], seed=3)
+
+    def test_batch_scores_real_users(self):
+        response = self.post({'user_ids': [1, 2, 99999], 'seed': 0})
+
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(set(data['recommendations']), {'1', '2', '99999'})
+        self.assertTrue(all(len(movies) == 10 for movies in data['recommendations'].values()))
+
+    @override_settings(RECOMMENDER_ENGINE='neighbors', RECOMMENDER_NEIGHBOR_INDEX_DIR='/nonexistent/neighbor_index')
+    def test_batch_returns_json_error_when_the_engine_fails(self):
+        with patch('recommendations._neighbor_index_registry', None), self.assertLogs('recommender.views', 'ERROR'):
+            response = self.post({'user_ids': [1, 2]})
+
+        self.assertEqual(response.status_code, 503)
+        self.assertIn('error', response.json())
+
+    def test_batch_rejects_malformed_body(self):
+        for payload in ({}, {'user_ids': 'all'}, {'user_ids': [1, 'two']}, {'user_ids': [1], 'seed': 'x'}, [],
+                        {'user_ids': [-1]}, {'user_ids': [1], 'seed': -3}):
+            response = self.post(payload)
+            self.assertEqual(response.status_code, 400, payload)
+
+        response = self.client.post(reverse('recommend_movies_batch'), data='not json',
+                                    content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+
+    def test_batch_requires_post(self):
+        response = self.client.get(reverse('recommend_movies_batch'))
+
+        self.assertEqual(response.status_code, 405)
+
+
+class RecordRatingsViewTest(TestCase):
+
+    def post(self, payload):
+        return self.client.post(reverse('record_ratings'), data=json.dumps(payload),
+                                content_type='application/json')
+
+    @patch('recommender.views.add_ratings')
+    def test_records_one_or_many_ratings(self, mock_add_ratings):
+        mock_add_ratings.side_effect = len
+
+        response = self.post({'user_id': 1, 'movie_id': 2, 'rating': 4.5})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'recorded': 1})
+        mock_add_ratings.assert_called_with([(1, 2, 4.5)])
+
+        response = self.post({'ratings': [{'user_id': 1, 'movie_id': 2, 'rating': 4},
+                                          {'user_id': 3, 'movie_id': 4, 'rating': 1.5}]})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.json(), {'recorded': 2})
+        mock_add_ratings.assert_called_with([(1, 2, 4), (3, 4, 1.5)])
+
+    @patch('recommender.views.add_ratings')
+    def test_rejects_malformed_body(self, mock_add_ratings):
+        for payload in ({}, {'user_id': 1, 'movie_id': 2}, {'user_id': '1', 'movie_id': 2, 'rating': 4},
+                        {'ratings': 'none'}, []):
+            response = self.post(payload)
+            self.assertEqual(response.status_code, 400, payload)
+        mock_add_ratings.assert_not_called()
+
+    @patch('recommender.views.add_ratings')
+    def test_rejects_invalid_rating(self, mock_add_ratings):
+        mock_add_ratings.side_effect = ValueError('Unknown movie ID: 0')
+
+        response = self.post({'user_id': 1, 'movie_id': 0, 'rating': 4.0})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json(), {'error': 'Unknown movie ID: 0'})
+
+
+class RecommendMoviesAsyncViewTest(TestCase):
+
+    @patch('recommender.views.random.randint', return_value=42)
+    @patch('recommender.views.make_hybrid_recommendations')
+    async def test_returns_recommendations(self, mock_make_hybrid_recommendations, mock_randint):
+        mock_make_hybrid_recommendations.return_value = ['Movie1', 'Movie2']
+
+        response = await self.async_client.get(reverse('recommend_movies_async'), {'seed': '5'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'user_id': 42, 'recommendations': ['Movie1', 'Movie2']})
+        mock_make_hybrid_recommendations.assert_called_once_with(42, seed=5)
+
+    @patch('recommender.views.get_executor')
+    async def test_saturated_pool_returns_503(self, mock_get_executor):
+        mock_get_executor.return_value.run.side_effect = ExecutorBusy()
+
+        response = await self.async_client.get(reverse('recommend_movies_async'))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '1')
+
+    @patch('recommender.views.get_executor')
+    async def test_timeout_returns_504(self, mock_get_executor):
+        mock_get_executor.return_value.run.side_effect = asyncio.TimeoutError()
+
+        response = await self.async_client.get(reverse('recommend_movies_async'))
+
+        self.assertEqual(response.status_code, 504)
+
+    @patch('recommender.views.make_hybrid_recommendations')
+    async def test_unknown_user_returns_404(self, mock_make_hybrid_recommendations):
+        mock_make_hybrid_recommendations.side_effect = KeyError(5)
+
+        response = await self.async_client.get(reverse('recommend_movies_async'))
+
+        self.assertEqual(response.status_code, 404)
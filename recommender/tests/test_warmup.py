@@ -0,0 +1,144 @@
+import threading
+import unittest
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+from django.urls import reverse
+
+import recommendations
+from recommender import metrics, warmup
+from recommender.hybrid_model import HYBRID_MODEL_SCHEMA
+
+
+def fresh_state(test):
+    state = {'status': warmup.PENDING, 'started_at': None, 'seconds': None, 'users': None, 'error': None}
+    patcher = patch('recommender.warmup._state', state)
+    patcher.start()
+    test.addCleanup(patcher.stop)
+    return state
+
+
+class ShouldWarmUpTest(unittest.TestCase):
+
+    def test_serving_processes_warm_up(self):
+        self.assertTrue(warmup.should_warm_up(['/usr/bin/gunicorn', 'movie_recommender.wsgi']))
+        self.assertTrue(warmup.should_warm_up(['/venv/lib/python3.11/site-packages/uvicorn/__main__.py',
+                                               'movie_recommender.asgi:application']))
+        self.assertTrue(warmup.should_warm_up(['manage.py', 'runserver', '--noreload']))
+        with patch.dict('os.environ', {'RUN_MAIN': 'true'}):
+            self.assertTrue(warmup.should_warm_up(['manage.py', 'runserver']))
+
+    def test_tests_and_other_commands_do_not(self):
+        self.assertFalse(warmup.should_warm_up(['manage.py', 'test', 'recommender/tests']))
+        self.assertFalse(warmup.should_warm_up(['manage.py', 'migrate']))
+        self.assertFalse(warmup.should_warm_up(['/venv/bin/pytest', '-q']))
+        self.assertFalse(warmup.should_warm_up(['/venv/lib/python3.11/site-packages/django/__main__.py', 'shell']))
+        self.assertFalse(warmup.should_warm_up(['manage.py', 'shell']))
+        self.assertFalse(warmup.should_warm_up(['-c']))
+        self.assertFalse(warmup.should_warm_up(['/srv/scripts/export_recommendations.py']))
+        self.assertFalse(warmup.should_warm_up(['/venv/bin/celery', '-A', 'movie_recommender', 'worker']))
+        self.assertFalse(warmup.should_warm_up([]))
+        with patch.dict('os.environ', {'RUN_MAIN': ''}):
+            # The autoreloader's parent process only watches files
+            self.assertFalse(warmup.should_warm_up(['manage.py', 'runserver']))
+
+    @override_settings(RECOMMENDER_WARM_UP='always')
+    def test_setting_enables_it_everywhere(self):
+        self.assertTrue(warmup.should_warm_up(['/venv/bin/daphne', 'movie_recommender.asgi:application']))
+
+    @override_settings(RECOMMENDER_WARM_UP=False)
+    def test_setting_disables_it(self):
+        self.assertFalse(warmup.should_warm_up(['/usr/bin/gunicorn', 'movie_recommender.wsgi']))
+
+
+class RunWarmUpTest(unittest.TestCase):
+
+    def setUp(self):
+        self.state = fresh_state(self)
+
+    @override_settings(RECOMMENDER_WARM_UP_USERS=3)
+    @patch('recommendations.warm_up', return_value=3)
+    def test_background_warm_up_makes_the_worker_ready(self, warm_up):
+        self.assertFalse(warmup.is_ready())
+
+        thread = warmup.start_warm_up()
+        thread.join()
+
+        warm_up.assert_called_once_with(3)
+        self.assertTrue(warmup.is_ready())
+        self.assertEqual(warmup.warm_up_status()['users'], 3)
+        self.assertIsNone(warmup.start_warm_up())
+
+    @patch('recommendations.warm_up', side_effect=FileNotFoundError('models/hybrid_model'))
+    def test_failure_leaves_the_worker_not_ready(self, warm_up):
+        with self.assertLogs('recommender.warmup', 'ERROR'):
+            self.assertFalse(warmup.run_warm_up())
+
+        self.assertEqual(self.state['status'], warmup.FAILED)
+        self.assertIn('hybrid_model', self.state['error'])
+        self.assertFalse(warmup.is_ready())
+
+    @override_settings(RECOMMENDER_WARM_UP=False)
+    def test_ready_when_disabled(self):
+        self.assertTrue(warmup.is_ready())
+
+    def test_warm_up_ranks_sample_users(self):
+        observed = metrics.STAGE_SECONDS.count(stage='warm_up')
+        with patch('recommendations.rank_movies', wraps=recommendations.rank_movies) as rank_movies:
+            self.assertTrue(warmup.run_warm_up())
+
+        users = self.state['users']
+        self.assertGreater(users, 0)
+        self.assertEqual(rank_movies.call_count, users)
+        self.assertEqual(metrics.STAGE_SECONDS.count(stage='warm_up'), observed + 1)
+
+
+class ReadyViewTest(SimpleTestCase):
+
+    def setUp(self):
+        self.state = fresh_state(self)
+
+    def test_not_ready_until_warm_up_finishes(self):
+        self.state.update(status=warmup.RUNNING)
+        response = self.client.get(reverse('ready'))
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['status'], 'running')
+
+        self.state.update(status=warmup.READY, seconds=1.5, users=8)
+        response = self.client.get(reverse('ready'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['users'], 8)
+
+    def test_first_check_starts_a_warm_up_that_was_not_scheduled(self):
+        release = threading.Event()
+        with patch('recommendations.warm_up', side_effect=lambda users: release.wait() and 8) as warm_up:
+            response = self.client.get(reverse('ready'))
+            self.assertEqual(response.status_code, 503)
+            self.assertEqual(response.json()['status'], 'running')
+
+            release.set()
+            warmup._thread.join()
+            response = self.client.get(reverse('ready'))
+
+        warm_up.assert_called_once()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['users'], 8)
+
+    @override_settings(RECOMMENDER_WARM_UP=False)
+    def test_ready_without_warm_up_when_disabled(self):
+        with patch('recommender.views.start_warm_up') as start_warm_up:
+            response = self.client.get(reverse('ready'))
+
+        start_warm_up.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['status'], 'pending')
+
+    def test_model_schema_mismatch_is_not_ready(self):
+        self.state.update(status=warmup.READY, seconds=1.5, users=8)
+
+        with patch('recommender.warmup.read_manifest', return_value={'schema_version': HYBRID_MODEL_SCHEMA + 1}):
+            response = self.client.get(reverse('ready'))
+
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['model_schema'], {'code': HYBRID_MODEL_SCHEMA,
+                                                          'artifact': HYBRID_MODEL_SCHEMA + 1, 'compatible': False})
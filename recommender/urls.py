@@ -5,4 +5,9 @@ from . import views
 
 urlpatterns = [
     path('recommend/', views.recommend_movies, name='recommend_movies'),
+    path('recommend/async', views.recommend_movies_async, name='recommend_movies_async'),
+    path('recommend/batch', views.recommend_movies_batch, name='recommend_movies_batch'),
+    path('ratings', views.record_ratings, name='record_ratings'),
+    path('metrics', views.metrics, name='metrics'),
+    path('ready', views.ready, name='ready'),
 ]
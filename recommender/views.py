@@ -1,13 +1,27 @@
 # recommender/views.py
 
-from django.http import JsonResponse
+import asyncio
+import json
+import logging
+
+from django.http import HttpResponse, JsonResponse
+from django.views.decorators.csrf import csrf_exempt
+from django.views.decorators.http import require_POST
 from recommendations import make_hybrid_recommendations, hybrid_recommendation_score, hybrid_recommend_movies
+from recommendations import add_ratings, make_batch_recommendations
+from recommender.conf import get_setting
+from recommender.executor import ExecutorBusy, get_executor
+from recommender.metrics import USERS_NOT_FOUND, render
+from recommender.profiling import profile_request
+from recommender.warmup import is_ready, model_schema, start_warm_up, warm_up_status
 import random
 
 
+logger = logging.getLogger(__name__)
 random = random.Random()
 
 
+@profile_request
 def recommend_movies(request):
     """
     Generate movie recommendations for a randomly selected user.
@@ -17,20 +31,219 @@ def recommend_movies(request):
     results as a JSON response.
 
     Parameters:
-    request (HttpRequest): The HTTP request object from Django.
-                           Not used in the current implementation.
+    request (HttpRequest): The HTTP request object from Django. An optional
+                           'seed' query parameter makes the random selection
+                           of the recommended movies reproducible. With the
+                           RECOMMENDER_PROFILING setting on, 'profile=1' or an
+                           'X-Profile: 1' header profiles the request (see
+                           recommender.profiling).
 
     Returns:
     JsonResponse: A JSON object containing:
                   - 'user_id': The randomly generated user ID.
                   - 'recommendations': A list of recommended movies.
                   If an error occurs, it returns a JSON object with an error message
-                  and a 404 status code.
+                  and a 404 status code. An invalid seed returns a 400 status code.
     """
     user_id = random.randint(1, 1000)  # Get the user ID from the request
 
+    options, error = _seed_options(request)
+    if error is not None:
+        return error
+
+    try:
+        recommendations = make_hybrid_recommendations(int(user_id), **options)
+        return JsonResponse({'user_id': user_id, 'recommendations': recommendations})
+    except Exception:
+        USERS_NOT_FOUND.inc(view='recommend_movies')
+        return JsonResponse({'recommendations': 'User not found'}, status=404)
+
+
+def _seed_options(request):
+    """
+    Read the optional 'seed' query parameter of the recommendation views.
+
+    Returns:
+    tuple: (options, error) where options holds the keyword arguments for
+           make_hybrid_recommendations and error is a JSON error message with a
+           400 status code when the seed is not an integer, or None.
+    """
+    if 'seed' not in request.GET:
+        return {}, None
+    try:
+        return {'seed': int(request.GET['seed'])}, None
+    except ValueError:
+        return {}, JsonResponse({'error': 'seed must be an integer'}, status=400)
+
+
+async def recommend_movies_async(request):
+    """
+    Asynchronous version of recommend_movies for ASGI servers.
+
+    The scoring runs in the bounded executor pool (see recommender.executor),
+    so the event loop keeps serving other requests meanwhile. When every
+    worker is busy and the queue is full the request is rejected at once,
+    and a request whose recommendations are not ready within the
+    RECOMMENDER_REQUEST_TIMEOUT setting is abandoned.
+
+    Parameters:
+    request (HttpRequest): The HTTP request object from Django. An optional
+                           'seed' query parameter makes the random selection
+                           of the recommended movies reproducible.
+
+    Returns:
+    JsonResponse: The same JSON object as recommend_movies, or a JSON error
+                  message with a 503 status code when the pool is saturated
+                  and a 504 status code on timeout.
+    """
+    user_id = random.randint(1, 1000)
+
+    options, error = _seed_options(request)
+    if error is not None:
+        return error
+
     try:
-        recommendations = make_hybrid_recommendations(int(user_id))
+        recommendations = await get_executor().run(make_hybrid_recommendations, user_id,
+                                                   timeout=get_setting('RECOMMENDER_REQUEST_TIMEOUT', 10.0),
+                                                   **options)
         return JsonResponse({'user_id': user_id, 'recommendations': recommendations})
+    except ExecutorBusy:
+        return JsonResponse({'error': 'Too many pending requests, try again later'}, status=503,
+                            headers={'Retry-After': '1'})
+    except asyncio.TimeoutError:
+        return JsonResponse({'error': 'Timed out while computing recommendations'}, status=504)
     except Exception:
+        USERS_NOT_FOUND.inc(view='recommend_movies_async')
         return JsonResponse({'recommendations': 'User not found'}, status=404)
+
+
+@csrf_exempt
+@require_POST
+def recommend_movies_batch(request):
+    """
+    Generate movie recommendations for a list of users in one request.
+
+    The request body is a JSON object with a 'user_ids' list and an optional
+    non-negative integer 'seed', from which every user's seed is derived. All
+    users are scored together (see recommendations.make_batch_recommendations)
+    instead of one request and one model pass per user.
+
+    Parameters:
+    request (HttpRequest): The HTTP POST request object from Django.
+
+    Returns:
+    JsonResponse: A JSON object containing:
+                  - 'recommendations': A mapping from user ID to its list of recommended movies.
+                    Users who are not in the dataset get popular movies, as in recommend_movies.
+                  A malformed body returns a JSON error message with a 400 status code, and a
+                  failure of the recommender engine (e.g. a missing or incompatible model) one
+                  with a 503 status code.
+    """
+    try:
+        payload = json.loads(request.body)
+        user_ids = payload['user_ids']
+        seed = payload.get('seed')
+        if not isinstance(user_ids, list) or not all(type(user_id) is int and user_id >= 0 for user_id in user_ids):
+            raise ValueError
+        if seed is not None and (type(seed) is not int or seed < 0):
+            raise ValueError
+    except (ValueError, KeyError, TypeError, AttributeError):
+        return JsonResponse({'error': "Expected a JSON object with a 'user_ids' list of non-negative integers "
+                                      "and an optional non-negative integer 'seed'"}, status=400)
+
+    max_users = get_setting('RECOMMENDER_BATCH_MAX_USERS', 10000)
+    if len(user_ids) > max_users:
+        return JsonResponse({'error': f'At most {max_users} user IDs per request'}, status=400)
+
+    try:
+        recommendations = make_batch_recommendations(user_ids, seed=seed)
+    except Exception:
+        logger.exception("Batch recommendations for %d users failed", len(user_ids))
+        return JsonResponse({'error': 'Could not compute recommendations, try again later'}, status=503)
+    return JsonResponse({
+        'recommendations': {str(user_id): movies for user_id, movies in recommendations.items()},
+    })
+
+
+@csrf_exempt
+@require_POST
+def record_ratings(request):
+    """
+    Record new ratings.
+
+    The request body is either one rating, {"user_id": 1, "movie_id": 2, "rating": 4.5},
+    or a JSON object with a 'ratings' list of them. recommendations.add_ratings
+    stores them in the RatingEvent log and applies them to this worker's
+    rating matrix at once; the other workers apply them at their next sync,
+    within RECOMMENDER_RATINGS_SYNC_INTERVAL seconds.
+
+    Parameters:
+    request (HttpRequest): The HTTP POST request object from Django.
+
+    Returns:
+    JsonResponse: A JSON object with the number of 'recorded' ratings and a 201
+                  status code. A malformed body or an invalid rating returns a
+                  JSON error message with a 400 status code.
+    """
+    try:
+        payload = json.loads(request.body)
+        events = payload['ratings'] if 'ratings' in payload else [payload]
+        if not isinstance(events, list):
+            raise ValueError
+        events = [(event['user_id'], event['movie_id'], event['rating']) for event in events]
+        for user_id, movie_id, rating in events:
+            if type(user_id) is not int or type(movie_id) is not int or type(rating) not in (int, float):
+                raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': "Expected 'user_id', 'movie_id' and 'rating' for every rating"}, status=400)
+
+    try:
+        recorded = add_ratings(events)
+    except ValueError as error:
+        return JsonResponse({'error': str(error)}, status=400)
+    return JsonResponse({'recorded': recorded}, status=201)
+
+
+def metrics(request):
+    """
+    Expose the recommender's counters and latency histograms.
+
+    The metrics are kept in memory by each worker process (see
+    recommender.metrics), so every process reports its own values and a
+    Prometheus server scrapes them like any other target.
+
+    Parameters:
+    request (HttpRequest): The HTTP request object from Django.
+
+    Returns:
+    HttpResponse: The metrics in the Prometheus text exposition format.
+    """
+    return HttpResponse(render(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def ready(request):
+    """
+    Report whether this worker finished warming up (see recommender.warmup).
+
+    Point the load balancer's readiness check here, so it only routes
+    requests to workers whose data and models are loaded. The schema version
+    of the hybrid model on disk is checked against the one this code reads
+    (see recommender.warmup.model_schema); with the hybrid engine, a
+    mismatch keeps the worker out of rotation. Under a server that
+    recommender.warmup.should_warm_up does not recognize, nothing started the
+    warm-up with the app, so the first check starts it.
+
+    Parameters:
+    request (HttpRequest): The HTTP request object from Django.
+
+    Returns:
+    JsonResponse: The warm-up state ('status', and once finished 'seconds',
+                  'users' ranked or 'error') and the 'model_schema' check, with a
+                  200 status code when the worker is ready and a 503 status code otherwise.
+    """
+    if get_setting('RECOMMENDER_WARM_UP', True):
+        start_warm_up()
+    state = warm_up_status()
+    state['model_schema'] = schema = model_schema()
+    ready = is_ready() and (schema['compatible'] or get_setting('RECOMMENDER_ENGINE', 'hybrid') != 'hybrid')
+    return JsonResponse(state, status=200 if ready else 503)
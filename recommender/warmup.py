@@ -0,0 +1,140 @@
+# recommender/warmup.py
+
+import logging
+import os
+import sys
+import threading
+import time
+
+import recommendations
+from recommender.artifacts import ArtifactError, read_manifest
+from recommender.conf import get_setting
+from recommender.hybrid_model import HYBRID_MODEL_SCHEMA
+from recommender.metrics import STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+PENDING = 'pending'
+RUNNING = 'running'
+READY = 'ready'
+FAILED = 'failed'
+
+_lock = threading.Lock()
+_state = {'status': PENDING, 'started_at': None, 'seconds': None, 'users': None, 'error': None}
+_thread = None
+
+
+SERVER_PROGRAMS = ('gunicorn', 'uvicorn')
+
+
+def should_warm_up(argv=None):
+    """
+    Tell whether the app should warm up when it starts in this process.
+
+    Warming up is for processes that serve requests, so by default it only
+    happens under a known server: gunicorn, uvicorn, or the runserver command
+    (in the process that serves, not the file-watching parent of its
+    autoreloader). Scripts, `python -c`, Celery, the shell, tests and every
+    other command do not warm up; under another server the first readiness
+    check starts it (see recommender.views.ready). The RECOMMENDER_WARM_UP
+    setting turns it off (False), or on in every process ('always').
+    """
+    argv = sys.argv if argv is None else argv
+    setting = get_setting('RECOMMENDER_WARM_UP', True)
+    if not setting:
+        return False
+    if setting == 'always':
+        return True
+    program = os.path.basename(argv[0]) if argv else ''
+    if program == '__main__.py':
+        # python -m <package>
+        program = os.path.basename(os.path.dirname(argv[0]))
+    if program.startswith(SERVER_PROGRAMS):
+        return True
+    if program in ('manage.py', 'django-admin', 'django') and len(argv) > 1 and argv[1] == 'runserver':
+        return '--noreload' in argv or os.environ.get('RUN_MAIN') == 'true'
+    return False
+
+
+def start_warm_up():
+    """
+    Run the warm-up in a background thread, unless it already started in this process.
+
+    Returns:
+    threading.Thread or None: The new thread, or None if the warm-up had already started.
+    """
+    global _thread
+    with _lock:
+        if _state['status'] != PENDING:
+            return None
+        _state.update(status=RUNNING, started_at=time.time())
+        _thread = threading.Thread(target=run_warm_up, name='recommender-warm-up', daemon=True)
+    _thread.start()
+    return _thread
+
+
+def run_warm_up():
+    """
+    Warm up in the calling thread (see recommendations.warm_up) and record the outcome.
+
+    Use this as an explicit start-up step, e.g. from a gunicorn post_fork
+    hook when the application is preloaded in the master process and
+    RECOMMENDER_WARM_UP is off. A failure is logged and leaves the process
+    not ready.
+
+    Returns:
+    bool: True if the warm-up succeeded.
+    """
+    with _lock:
+        _state.update(status=RUNNING, started_at=_state['started_at'] or time.time(), error=None)
+    started = time.perf_counter()
+    try:
+        with STAGE_SECONDS.time(stage='warm_up'):
+            users = recommendations.warm_up(get_setting('RECOMMENDER_WARM_UP_USERS', 8))
+    except Exception as error:
+        logger.exception("Warm-up failed")
+        with _lock:
+            _state.update(status=FAILED, seconds=time.perf_counter() - started, error=repr(error))
+        return False
+
+    seconds = time.perf_counter() - started
+    with _lock:
+        _state.update(status=READY, seconds=seconds, users=users)
+    logger.info("Warm-up done in %.2fs (%d users ranked)", seconds, users)
+    return True
+
+
+def warm_up_status():
+    """
+    Return a copy of the warm-up state: its status and, once finished, its duration, users ranked or error.
+    """
+    with _lock:
+        return dict(_state)
+
+
+def is_ready():
+    """
+    Return True once the warm-up succeeded, or at once when warming up is disabled by RECOMMENDER_WARM_UP.
+    """
+    status = warm_up_status()['status']
+    return status == READY or (status == PENDING and not get_setting('RECOMMENDER_WARM_UP', True))
+
+
+def model_schema():
+    """
+    Compare the schema version of the hybrid model on disk with the one this code reads.
+
+    A mismatch makes HybridModel.load fail, so it is reported before the
+    worker serves requests rather than on the first request that blends
+    content scores. Only the manifest is read.
+
+    Returns:
+    dict: 'code', the version this code reads, 'artifact', the version of the
+          model on disk (None if there is none), and 'compatible', False on a mismatch.
+    """
+    try:
+        artifact = read_manifest(recommendations.model_registry.path).get('schema_version')
+    except ArtifactError:
+        artifact = None
+    return {'code': HYBRID_MODEL_SCHEMA, 'artifact': artifact,
+            'compatible': artifact is None or artifact == HYBRID_MODEL_SCHEMA}